@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""Bin -> band table generator for fft_core.
+
+Writes the $readmemh file fft_core loads as BAND_MAP (band_map.mem by
+default): one entry per FFT bin from 0 to BAND_BINS - 1, 0 for bins outside
+every band and b + 1 for bins in band b. Band b covers the bins whose
+centre frequency k * SAMPLE_RATE / POINTS lies in [edges[b], edges[b+1]).
+
+    python data/band_gen.py                                  # the LOW/MID/HIGH bands, data/band_map.mem
+    python data/band_gen.py --edges 0 250 500 1000 2000 4000 8000 12000 16000 -o data/band_map_8.mem
+
+The default edges reproduce the bands fft_core always had: bins 0-5, 6-40
+and 41-100 at 48 kHz and 512 points. Pass the printed NUM_BANDS and
+BAND_BINS to fft_core along with the file.
+"""
+import argparse
+from pathlib import Path
+
+import numpy as np
+
+POINTS = 512
+SAMPLE_RATE = 48000
+EDGES_HZ = (0, 500, 3800, 9400)
+
+data_dir = Path(__file__).resolve().parent
+
+
+def band_map(edges=EDGES_HZ, sample_rate=SAMPLE_RATE, N=POINTS):
+    """Table entries for bins 0 .. BAND_BINS-1, as ints (0 = no band, b + 1 = band b)."""
+    edges = np.asarray(edges, dtype=np.float64)
+    if len(edges) < 2 or np.any(np.diff(edges) <= 0):
+        raise ValueError(f"need at least two strictly increasing edges, got {edges.tolist()}")
+    if edges[-1] > sample_rate / 2 + sample_rate / N:
+        raise ValueError(f"top edge {edges[-1]:g} Hz is past Nyquist ({sample_rate / 2:g} Hz)")
+
+    freqs = np.arange(N // 2 + 1) * sample_rate / N
+    band = np.searchsorted(edges, freqs, side="right")
+    entries = np.where(band < len(edges), band, 0)
+
+    counts = np.bincount(entries, minlength=len(edges))[1:]
+    if np.any(counts == 0):
+        empty = np.flatnonzero(counts == 0).tolist()
+        raise ValueError(f"band(s) {empty} contain no bins at {sample_rate:g} Hz / {N} points")
+    return entries[:np.flatnonzero(entries)[-1] + 1]
+
+
+def band_ranges(entries):
+    """(first bin, last bin) per band; bands from band_map() are contiguous."""
+    entries = np.asarray(entries)
+    ranges = []
+    for b in range(1, int(entries.max()) + 1):
+        bins = np.flatnonzero(entries == b)
+        if len(bins) == 0 or bins[-1] - bins[0] + 1 != len(bins):
+            raise ValueError(f"band {b - 1} isn't a contiguous run of bins")
+        ranges.append((int(bins[0]), int(bins[-1])))
+    return tuple(ranges)
+
+
+def map_text(entries):
+    digits = max(1, (int(np.max(entries)).bit_length() + 3) // 4)
+    return "".join(f"{v:0{digits}x}\n" for v in np.asarray(entries).tolist())
+
+
+def gen_band_map(edges=EDGES_HZ, sample_rate=SAMPLE_RATE, N=POINTS, outfile=data_dir / "band_map.mem",
+                 quiet=False):
+    """Write the table to `outfile`; returns the fft_core parameters it needs."""
+    entries = band_map(edges, sample_rate, N)
+    outfile = Path(outfile)
+    outfile.parent.mkdir(parents=True, exist_ok=True)
+    outfile.write_text(map_text(entries))
+    params = {"NUM_BANDS": int(entries.max()), "BAND_BINS": len(entries)}
+    if not quiet:
+        print(f"Generated {outfile} with {len(entries)} entries.")
+        bin_hz = sample_rate / N
+        for b, (start, end) in enumerate(band_ranges(entries)):
+            print(f"  band {b}: bins {start}-{end} ({start * bin_hz:.1f} - {end * bin_hz:.1f} Hz)")
+        print("  fft_core: " + ", ".join(f".{k}({v})" for k, v in params.items()))
+    return params
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate fft_core's bin -> band table from band edges in Hz")
+    parser.add_argument("--edges", type=float, nargs="+", default=list(EDGES_HZ),
+                        help="band edges in Hz; N + 1 edges give N bands")
+    parser.add_argument("--rate", type=float, default=SAMPLE_RATE, help="sample rate in Hz")
+    parser.add_argument("-n", "--points", type=int, default=POINTS, help="FFT size")
+    parser.add_argument("-o", "--output", default=data_dir / "band_map.mem", help="output .mem file")
+    args = parser.parse_args()
+
+    gen_band_map(args.edges, args.rate, args.points, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,32 +1,164 @@
+#!/usr/bin/env python3
+"""Twiddle ROM generator for fft_core.
+
+Writes the $readmemh file fft_core loads as twiddle_rom.mem: one packed
+{re, im} word per line, W_k = exp(-2 pi i k / N) in TWIDDLE_WIDTH-bit two's
+complement with TWIDDLE_FRAC_BITS fraction bits.
+
+    python data/twiddle_gen.py                              # N=512, 5/3 bits, data/twiddle_rom.mem
+    python data/twiddle_gen.py -n 1024 --width 12 --frac 10 -o /tmp/tw.mem --report
+    python data/twiddle_gen.py --table quarter --report
+
+--table picks how much of the circle is stored:
+    full     k = 0 .. N/2-1, what fft_core addresses today
+    quarter  k = 0 .. N/4-1; W[k + N/4] = -j W[k]
+    eighth   k = 0 .. N/8;   W[N/4 - k] = -j conj(W[k])
+The symmetric tables only negate and swap quantized values, so unfolding
+them (fft_model.expand_twiddles) gives back the full table bit for bit.
+
+Generated tables are cached by content key under sim_build/twiddle_cache,
+so sweeps that ask for the same ROM again just copy it.
+"""
+import argparse
+import hashlib
+import os
+import shutil
+from pathlib import Path
+
 import numpy as np
 
 POINTS = 512
 TWIDDLE_WIDTH = 5
 TWIDDLE_FRAC_BITS = 3
 
+TABLES = ("full", "quarter", "eighth")
+
+data_dir = Path(__file__).resolve().parent
+CACHE_DIR = data_dir.parent / "sim_build" / "twiddle_cache"
+# bump when the generated contents change for the same arguments
+GENERATOR_VERSION = 2
+
+
+def table_depth(N, table="full"):
+    if N < 8 or N & (N - 1):
+        raise ValueError(f"N must be a power of two >= 8, got {N}")
+    return {"full": N // 2, "quarter": N // 4, "eighth": N // 8 + 1}[table]
+
+
 def float_to_fixed(num, width, frac_bits):
-    fixed = int(round(num * (2**frac_bits)))
+    """Round to frac_bits and wrap to a width-bit two's complement bit pattern (array or scalar)."""
+    fixed = np.round(np.asarray(num, dtype=np.float64) * (1 << frac_bits)).astype(np.int64)
     return fixed & ((1 << width) - 1)
 
-def gen_twiddle_rom(N=POINTS, width=TWIDDLE_WIDTH, frac_bits=TWIDDLE_FRAC_BITS, outfile="twiddle_rom.mem"):
-    entries = []
 
-    for k in range(N//2):
-        angle = -2 * np.pi * k / N
-        w = np.exp(1j * angle)
+def to_signed(packed, width):
+    half = 1 << (width - 1)
+    return ((np.asarray(packed, dtype=np.int64) + half) & ((half << 1) - 1)) - half
+
+
+def twiddle_values(N=POINTS, width=TWIDDLE_WIDTH, frac_bits=TWIDDLE_FRAC_BITS, table="full"):
+    """Stored (re, im) entries as signed ints, plus the exact complex twiddles they stand for."""
+    k = np.arange(table_depth(N, table))
+    w = np.exp(-2j * np.pi * k / N)
+    re = to_signed(float_to_fixed(w.real, width, frac_bits), width)
+    im = to_signed(float_to_fixed(w.imag, width, frac_bits), width)
+    return re, im, w
+
+
+def pack(re, im, width):
+    mask = (1 << width) - 1
+    return ((np.asarray(re) & mask) << width) | (np.asarray(im) & mask)
+
+
+def rom_text(re, im, width):
+    digits = (2 * width + 3) // 4
+    return "".join(f"{v:0{digits}x}\n" for v in pack(re, im, width).tolist())
+
+
+def cache_key(N, width, frac_bits, table):
+    desc = f"twiddle v{GENERATOR_VERSION} N={N} width={width} frac={frac_bits} table={table}"
+    return hashlib.sha256(desc.encode()).hexdigest()[:16]
+
+
+def gen_twiddle_rom(N=POINTS, width=TWIDDLE_WIDTH, frac_bits=TWIDDLE_FRAC_BITS, outfile=data_dir / "twiddle_rom.mem",
+                    table="full", cache=True, quiet=False):
+    """Write the ROM to `outfile` (from the cache when it's there) and return its path."""
+    outfile = Path(outfile)
+    outfile.parent.mkdir(parents=True, exist_ok=True)
+    cached = CACHE_DIR / f"{cache_key(N, width, frac_bits, table)}.mem"
+    hit = cache and cached.is_file()
+    if not hit:
+        re, im, _ = twiddle_values(N, width, frac_bits, table)
+        text = rom_text(re, im, width)
+        if cache:
+            CACHE_DIR.mkdir(parents=True, exist_ok=True)
+            # write-then-rename so parallel sweeps never see a half-written entry
+            tmp = cached.with_suffix(f".{os.getpid()}.tmp")
+            tmp.write_text(text)
+            tmp.replace(cached)
+    if cache:
+        shutil.copyfile(cached, outfile)
+    else:
+        outfile.write_text(text)
+    if not quiet:
+        print(f"Generated {outfile} with {table_depth(N, table)} entries{' (cached)' if hit else ''}.")
+    return outfile
+
+
+def error_report(N=POINTS, width=TWIDDLE_WIDTH, frac_bits=TWIDDLE_FRAC_BITS, table="full", data_width=24):
+    """Quantization error of every stored entry, and what it costs one butterfly.
+
+    Returns a dict with the per-entry error |W_q - W| (in units of 1.0), its
+    worst and RMS values, the worst gain error | |W_q| - 1 |, and the worst
+    butterfly output error in LSBs for a full-scale DATA_WIDTH input: the
+    twiddle error times |x2| plus one LSB of floor per component from the
+    >>> TWIDDLE_FRAC_BITS.
+    """
+    re, im, w = twiddle_values(N, width, frac_bits, table)
+    quantized = (re + 1j * im) / (1 << frac_bits)
+    err = np.abs(quantized - w)
+    full_scale = np.sqrt(2) * (1 << (data_width - 1))
+    return {
+        "entries": len(err),
+        "error": err,
+        "max_error": float(err.max()),
+        "rms_error": float(np.sqrt(np.mean(err ** 2))),
+        "worst_entry": int(err.argmax()),
+        "max_gain_error": float(np.abs(np.abs(quantized) - 1).max()),
+        "butterfly_error_lsb": float(full_scale * err.max() + np.sqrt(2)),
+        "overflow": bool((1 << frac_bits) > (1 << (width - 1)) - 1),
+    }
+
+
+def format_report(report, per_entry=False):
+    lines = [f"{report['entries']} entries: max |W_q - W| {report['max_error']:.3e} (entry {report['worst_entry']}), "
+             f"rms {report['rms_error']:.3e}, max gain error {report['max_gain_error']:.3e}",
+             f"worst butterfly error at full scale: {report['butterfly_error_lsb']:.1f} LSB"]
+    if report["overflow"]:
+        lines.append("warning: 1.0 doesn't fit in this width and wraps negative")
+    if per_entry:
+        lines += [f"{k:6d} {e:.3e}" for k, e in enumerate(report["error"].tolist())]
+    return "\n".join(lines)
 
-        re = float_to_fixed(w.real, width, frac_bits)
-        im = float_to_fixed(w.imag, width, frac_bits)
 
-        packed = (re << width) | im
-        hex_str = f"{packed:0{(2*width+3)//4}x}"
-        entries.append(hex_str)
+def main():
+    parser = argparse.ArgumentParser(description="Generate fft_core's twiddle ROM")
+    parser.add_argument("-n", "--points", type=int, default=POINTS, help="FFT size (power of two)")
+    parser.add_argument("--width", type=int, default=TWIDDLE_WIDTH, help="TWIDDLE_WIDTH")
+    parser.add_argument("--frac", type=int, default=TWIDDLE_FRAC_BITS, help="TWIDDLE_FRAC_BITS")
+    parser.add_argument("--table", choices=TABLES, default="full", help="how much of the circle to store")
+    parser.add_argument("-o", "--output", default=data_dir / "twiddle_rom.mem", help="output .mem file")
+    parser.add_argument("--report", action="store_true", help="print the quantization error report")
+    parser.add_argument("--per-entry", action="store_true", help="with --report, list every entry's error")
+    parser.add_argument("--data-width", type=int, default=24, help="DATA_WIDTH for the butterfly error bound")
+    parser.add_argument("--no-cache", action="store_true", help="always regenerate")
+    args = parser.parse_args()
 
-    with open(outfile, "w") as f:
-        for e in entries:
-            f.write(e + "\n")
+    gen_twiddle_rom(args.points, args.width, args.frac, args.output, args.table, cache=not args.no_cache)
+    if args.report:
+        print(format_report(error_report(args.points, args.width, args.frac, args.table, args.data_width),
+                            args.per_entry))
 
-    print(f"Generated {outfile} with {len(entries)} entries.")
 
-# Example
-gen_twiddle_rom()
+if __name__ == "__main__":
+    main()
@@ -9,7 +9,30 @@ module fft_core
         parameter DATA_FRAC_BITS = 16,
         parameter TWIDDLE_WIDTH = 5,
         parameter TWIDDLE_FRAC_BITS = 3,
-        parameter DEBUG_LOAD = 0
+        parameter DEBUG_LOAD = 0,
+        // two-for-one real mode: input_data_re and input_data_im carry two
+        // real frames (left/right, or two consecutive mono frames). After the
+        // last stage SPLIT separates A[k] = (Z[k] + conj Z[N-k]) / 2 and
+        // B[k] = (Z[k] - conj Z[N-k]) / 2j for the band bins, A into
+        // band_magnitudes and B into band_magnitudes_b. read_data still
+        // returns the combined spectrum Z.
+        parameter TWO_REAL = 0,
+        // bin -> band table from data/band_gen.py: BAND_BINS entries, 0 for
+        // no band, b + 1 for band b. Bins from BAND_BINS up belong to none.
+        parameter NUM_BANDS = 3,
+        parameter BAND_BINS = 101,
+        parameter BAND_MAP = `FPATH(band_map.mem),
+        // magnitude fed to the band accumulators, see sim/model/magnitude_explorer.py:
+        // 0 = |re| + |im| (up to 41% high), 1 = max(L, L - L/8 + S/2) with
+        // L/S the larger/smaller of |re|, |im| (within 3%, no multipliers)
+        parameter MAG_MODE = 0,
+        // block floating point: before each stage the block is shifted right
+        // by 0-2 bits, just enough to leave two guard bits above the largest
+        // word written by the stage before (or by LOAD), so the butterflies
+        // never saturate. The shifts add up to block_exponent: read_data is
+        // X / 2**block_exponent, and band_magnitudes are scaled back up
+        // (saturating) so they stay on the unscaled core's scale.
+        parameter BLOCK_FLOAT = 0
     )
     (
         // system inputs
@@ -29,8 +52,17 @@ module fft_core
         // fft output / right side
         input wire [STAGES-1:0] read_addr,
         output logic signed [DATA_WIDTH-1:0] read_data_re, read_data_im,
+        // BLOCK_FLOAT only: right shifts applied to this transform, 0 otherwise
+        output logic [EXP_WIDTH-1:0] block_exponent,
 
-        output logic [31:0] low_magnitude, mid_magnitude, high_magnitude
+        // band b of the table in [32*b +: 32]
+        output logic [32*NUM_BANDS-1:0] band_magnitudes,
+        // TWO_REAL only: bands of the frame on input_data_im
+        output logic [32*NUM_BANDS-1:0] band_magnitudes_b,
+
+        // bands 0, 1 and 2 of band_magnitudes(_b), for the default table
+        output logic [31:0] low_magnitude, mid_magnitude, high_magnitude,
+        output logic [31:0] low_magnitude_b, mid_magnitude_b, high_magnitude_b
     );
     // a parallelized FFT has log_2(points) number of stages
     localparam STAGES = $clog2(POINTS);
@@ -44,13 +76,57 @@ module fft_core
     localparam TOTAL_LATENCY = BRAM_LATENCY + BUTTERFLY_LATENCY;
     localparam TWIDDLE_ADDR_SIZE = $clog2(BUTTERFLIES_PER_STAGE);
 
-    // For the extraction, since it will be easier to just tap during the reading then read as I had it before
-    localparam LOW_START = 0;
-    localparam LOW_END = 5;
-    localparam MID_START = 6;
-    localparam MID_END = 40;
-    localparam HIGH_START = 41;
-    localparam HIGH_END = 100;
+    // band table entries: 0 for no band, b + 1 for band b
+    localparam BAND_WIDTH = $clog2(NUM_BANDS + 1);
+
+    // TWO_REAL: SPLIT reads bins 0..SPLIT_BINS-1 and their mirrors
+    localparam SPLIT_BINS = BAND_BINS;
+
+    // BLOCK_FLOAT: up to two bits of shift ahead of each stage
+    localparam EXP_WIDTH = $clog2(2 * STAGES + 1);
+    localparam MAX_EXPONENT = 2 * STAGES;
+
+    // |re| + |im|, or the two-region alpha-max-beta-min, per MAG_MODE
+    function automatic [DATA_WIDTH+1:0] magnitude(input logic signed [DATA_WIDTH-1:0] re,
+                                                  input logic signed [DATA_WIDTH-1:0] im);
+        logic [DATA_WIDTH-1:0] abs_re, abs_im, larger, smaller;
+        logic [DATA_WIDTH+1:0] blend;
+
+        abs_re = re[DATA_WIDTH-1] ? (~re + 1) : re;
+        abs_im = im[DATA_WIDTH-1] ? (~im + 1) : im;
+
+        if (MAG_MODE == 1) begin
+            larger = (abs_re > abs_im) ? abs_re : abs_im;
+            smaller = (abs_re > abs_im) ? abs_im : abs_re;
+            blend = {2'b0, larger} - {5'b0, larger[DATA_WIDTH-1:3]} + {3'b0, smaller[DATA_WIDTH-1:1]};
+            magnitude = (blend > {2'b0, larger}) ? blend : {2'b0, larger};
+        end else begin
+            magnitude = {1'b0, abs_re} + {1'b0, abs_im};
+        end
+    endfunction
+
+    // BLOCK_FLOAT: right shift that leaves x two guard bits (top three bits equal)
+    function automatic [1:0] headroom_shift(input logic signed [DATA_WIDTH-1:0] x);
+        if (x[DATA_WIDTH-1:DATA_WIDTH-3] == 3'b000 || x[DATA_WIDTH-1:DATA_WIDTH-3] == 3'b111) begin
+            headroom_shift = 0;
+        end else if (x[DATA_WIDTH-1] == x[DATA_WIDTH-2]) begin
+            headroom_shift = 1;
+        end else begin
+            headroom_shift = 2;
+        end
+    endfunction
+
+    function automatic [1:0] max_shift(input [1:0] a, input [1:0] b);
+        max_shift = (a > b) ? a : b;
+    endfunction
+
+    // BLOCK_FLOAT: band sum scaled back by the block exponent, saturating at 32 bits
+    function automatic [31:0] scale_band(input [31:0] acc, input [EXP_WIDTH-1:0] exponent);
+        logic [31+MAX_EXPONENT:0] wide;
+
+        wide = {{MAX_EXPONENT{1'b0}}, acc} << exponent;
+        scale_band = (|wide[31+MAX_EXPONENT:32]) ? 32'hFFFFFFFF : wide[31:0];
+    endfunction
 
     // Need to switch this to it's own module, just used for simplicity here
     function automatic [STAGES-1:0] bit_reverse(input [STAGES-1:0] in);
@@ -64,7 +140,8 @@ module fft_core
         LOAD,
         RUN_STAGE,
         FINISH_STAGE,
-        DONE
+        DONE,
+        SPLIT
     } fft_state;
 
     fft_state current_state;
@@ -74,21 +151,43 @@ module fft_core
     logic [STAGES-1:0] butterfly_counter;
     logic [$clog2(TOTAL_LATENCY):0] flush_counter;
     logic active_read_bram_a;
+    logic [STAGES:0] split_counter;
 
-    logic [31:0] low_acc, mid_acc, high_acc;
+    logic [31:0] band_acc [NUM_BANDS-1:0];
+    logic [31:0] band_acc_b [NUM_BANDS-1:0];
     logic [DATA_WIDTH+1:0] magnitude_approx_1;
     logic [DATA_WIDTH+1:0] magnitude_approx_2;
 
-    logic add_to_low_1, add_to_mid_1, add_to_high_1;
-    logic add_to_low_2, add_to_mid_2, add_to_high_2;
+    // For the extraction, since it will be easier to just tap during the reading then read as I had it before
+    logic [BAND_WIDTH-1:0] band_map [0:BAND_BINS-1];
+    logic [BAND_WIDTH-1:0] band_1, band_2;
+
+    initial begin
+        $readmemh(BAND_MAP, band_map);
+    end
+
+    // TWO_REAL spectrum split: Z[k] on port 1, Z[N-k] on port 2 of the final BRAM
+    logic [STAGES-1:0] split_k, split_mirror;
+    logic [STAGES-1:0] split_bin_pipe [BRAM_LATENCY-1:0];
+    logic split_valid_pipe [BRAM_LATENCY-1:0];
+    logic [DATA_WIDTH+1:0] magnitude_split_a, magnitude_split_b;
+    logic [BAND_WIDTH-1:0] split_band;
 
-    assign add_to_low_1 = (addr1_pipe[TOTAL_LATENCY-1] >= LOW_START && addr1_pipe[TOTAL_LATENCY-1] <= LOW_END);
-    assign add_to_mid_1 = (addr1_pipe[TOTAL_LATENCY-1] >= MID_START && addr1_pipe[TOTAL_LATENCY-1] <= MID_END);
-    assign add_to_high_1 = (addr1_pipe[TOTAL_LATENCY-1] >= HIGH_START && addr1_pipe[TOTAL_LATENCY-1] <= HIGH_END);
+    // BLOCK_FLOAT: shifts requested by the words written so far, applied to the next stage's reads
+    logic block_write;
+    logic [1:0] block_incoming, block_pending, block_next, stage_shift;
+    logic [EXP_WIDTH-1:0] block_shift_total;
 
-    assign add_to_low_2 = (addr2_pipe[TOTAL_LATENCY-1] >= LOW_START && addr2_pipe[TOTAL_LATENCY-1] <= LOW_END);
-    assign add_to_mid_2 = (addr2_pipe[TOTAL_LATENCY-1] >= MID_START && addr2_pipe[TOTAL_LATENCY-1] <= MID_END);
-    assign add_to_high_2 = (addr2_pipe[TOTAL_LATENCY-1] >= HIGH_START && addr2_pipe[TOTAL_LATENCY-1] <= HIGH_END);
+    assign band_1 = (addr1_pipe[TOTAL_LATENCY-1] < BAND_BINS) ? band_map[addr1_pipe[TOTAL_LATENCY-1]] : 0;
+    assign band_2 = (addr2_pipe[TOTAL_LATENCY-1] < BAND_BINS) ? band_map[addr2_pipe[TOTAL_LATENCY-1]] : 0;
+
+    // zero-padded so tables with fewer than three bands still elaborate
+    logic [32*(NUM_BANDS+3)-1:0] named_bands, named_bands_b;
+
+    assign named_bands = {96'b0, band_magnitudes};
+    assign named_bands_b = {96'b0, band_magnitudes_b};
+    assign {high_magnitude, mid_magnitude, low_magnitude} = named_bands[95:0];
+    assign {high_magnitude_b, mid_magnitude_b, low_magnitude_b} = named_bands_b[95:0];
 
     // FFT is busy whenever we're not idle
     assign fft_busy = (current_state != IDLE);
@@ -119,13 +218,19 @@ module fft_core
             FINISH_STAGE: begin
                 if (flush_counter == TOTAL_LATENCY) begin
                     if (current_stage == STAGES - 1) begin
-                        next_state = DONE;
+                        next_state = TWO_REAL ? SPLIT : DONE;
                     end else begin
                         next_state = RUN_STAGE;
                     end
                 end
             end
 
+            SPLIT: begin
+                if (split_counter == SPLIT_BINS + BRAM_LATENCY - 1) begin
+                    next_state = DONE;
+                end
+            end
+
             DONE: begin
                 next_state = IDLE;
             end
@@ -144,12 +249,13 @@ module fft_core
             fft_done <= 0;
             load_read_en <= 0;
             flush_counter <= 0;
-            low_acc <= 0;
-            mid_acc <= 0;
-            high_acc <= 0;
-            low_magnitude <= 0;
-            mid_magnitude <= 0;
-            high_magnitude <= 0;
+            split_counter <= 0;
+            for (int b = 0; b < NUM_BANDS; b++) begin
+                band_acc[b] <= 0;
+                band_acc_b[b] <= 0;
+            end
+            band_magnitudes <= 0;
+            band_magnitudes_b <= 0;
         end else begin
             load_read_en <= 0;
             current_state <= next_state;
@@ -161,10 +267,12 @@ module fft_core
                     butterfly_counter <= 0;
                     current_stage <= 0;
                     flush_counter <= 0;
+                    split_counter <= 0;
                     active_read_bram_a <= 1;
-                    low_acc <= 0;
-                    mid_acc <= 0;
-                    high_acc <= 0;
+                    for (int b = 0; b < NUM_BANDS; b++) begin
+                        band_acc[b] <= 0;
+                        band_acc_b[b] <= 0;
+                    end
 
                     if (start_fft) begin
                         load_read_en <= 1;
@@ -186,10 +294,10 @@ module fft_core
                         butterfly_counter <= butterfly_counter + 1;
                     end
 
-                    if (current_stage == STAGES - 1 && butterfly_out_valid) begin
-                        low_acc <= low_acc + (add_to_low_1 ? $unsigned(magnitude_approx_1) : 0) + (add_to_low_2 ? $unsigned(magnitude_approx_2) : 0);
-                        mid_acc <= mid_acc + (add_to_mid_1 ? $unsigned(magnitude_approx_1) : 0) + (add_to_mid_2 ? $unsigned(magnitude_approx_2) : 0);
-                        high_acc <= high_acc + (add_to_high_1 ? $unsigned(magnitude_approx_1) : 0) + (add_to_high_2 ? $unsigned(magnitude_approx_2) : 0);
+                    if (!TWO_REAL && current_stage == STAGES - 1 && butterfly_out_valid) begin
+                        for (int b = 0; b < NUM_BANDS; b++) begin
+                            band_acc[b] <= band_acc[b] + (band_1 == b + 1 ? $unsigned(magnitude_approx_1) : 0) + (band_2 == b + 1 ? $unsigned(magnitude_approx_2) : 0);
+                        end
                     end
                 end
 
@@ -202,18 +310,30 @@ module fft_core
                         butterfly_counter <= 0;
                     end
 
-                    if (current_stage == STAGES - 1 && butterfly_out_valid) begin
-                        low_acc <= low_acc + (add_to_low_1 ? $unsigned(magnitude_approx_1) : 0) + (add_to_low_2 ? $unsigned(magnitude_approx_2) : 0);
-                        mid_acc <= mid_acc + (add_to_mid_1 ? $unsigned(magnitude_approx_1) : 0) + (add_to_mid_2 ? $unsigned(magnitude_approx_2) : 0);
-                        high_acc <= high_acc + (add_to_high_1 ? $unsigned(magnitude_approx_1) : 0) + (add_to_high_2 ? $unsigned(magnitude_approx_2) : 0);
+                    if (!TWO_REAL && current_stage == STAGES - 1 && butterfly_out_valid) begin
+                        for (int b = 0; b < NUM_BANDS; b++) begin
+                            band_acc[b] <= band_acc[b] + (band_1 == b + 1 ? $unsigned(magnitude_approx_1) : 0) + (band_2 == b + 1 ? $unsigned(magnitude_approx_2) : 0);
+                        end
+                    end
+                end
+
+                SPLIT: begin
+                    split_counter <= split_counter + 1;
+
+                    if (split_valid_pipe[BRAM_LATENCY-1]) begin
+                        for (int b = 0; b < NUM_BANDS; b++) begin
+                            band_acc[b] <= band_acc[b] + (split_band == b + 1 ? $unsigned(magnitude_split_a) : 0);
+                            band_acc_b[b] <= band_acc_b[b] + (split_band == b + 1 ? $unsigned(magnitude_split_b) : 0);
+                        end
                     end
                 end
 
                 DONE: begin
                     fft_done <= 1;
-                    low_magnitude <= low_acc;
-                    mid_magnitude <= mid_acc;
-                    high_magnitude <= high_acc;
+                    for (int b = 0; b < NUM_BANDS; b++) begin
+                        band_magnitudes[32*b +: 32] <= scale_band(band_acc[b], block_shift_total);
+                        band_magnitudes_b[32*b +: 32] <= scale_band(band_acc_b[b], block_shift_total);
+                    end
                 end
             endcase
         end
@@ -337,6 +457,16 @@ module fft_core
                 end
             end
 
+            SPLIT: begin
+                if (!FINAL_WRITE_TO_B) begin
+                    bram_a_addr_1 = split_k;
+                    bram_a_addr_2 = split_mirror;
+                end else begin
+                    bram_b_addr_1 = split_k;
+                    bram_b_addr_2 = split_mirror;
+                end
+            end
+
             IDLE, DONE: begin
                 if (!FINAL_WRITE_TO_B || DEBUG_LOAD) begin
                     bram_a_addr_1 = read_addr;
@@ -405,23 +535,24 @@ module fft_core
     logic signed [DATA_WIDTH-1:0] output_1_re, output_1_im;
     logic signed [DATA_WIDTH-1:0] output_2_re, output_2_im;
 
-    // Sets inputs based on which bram is actively being read (use delayed signal!)
+    // Sets inputs based on which bram is actively being read (use delayed signal!),
+    // shifted down by this stage's block floating point shift
     always_comb begin
         twiddle_re = twiddle_rom_out_packed[TOTAL_TWIDDLE_WIDTH-1:TWIDDLE_WIDTH];
         twiddle_im = twiddle_rom_out_packed[TWIDDLE_WIDTH-1:0];
 
         if (active_write_bram_b_pipe[BRAM_LATENCY-1]) begin
-            input_1_re = bram_a_rd_1[TOTAL_DATA_WIDTH-1:DATA_WIDTH];
-            input_1_im = bram_a_rd_1[DATA_WIDTH-1:0];
+            input_1_re = $signed(bram_a_rd_1[TOTAL_DATA_WIDTH-1:DATA_WIDTH]) >>> stage_shift;
+            input_1_im = $signed(bram_a_rd_1[DATA_WIDTH-1:0]) >>> stage_shift;
 
-            input_2_re = bram_a_rd_2[TOTAL_DATA_WIDTH-1:DATA_WIDTH];
-            input_2_im = bram_a_rd_2[DATA_WIDTH-1:0];
+            input_2_re = $signed(bram_a_rd_2[TOTAL_DATA_WIDTH-1:DATA_WIDTH]) >>> stage_shift;
+            input_2_im = $signed(bram_a_rd_2[DATA_WIDTH-1:0]) >>> stage_shift;
         end else begin
-            input_1_re = bram_b_rd_1[TOTAL_DATA_WIDTH-1:DATA_WIDTH];
-            input_1_im = bram_b_rd_1[DATA_WIDTH-1:0];
+            input_1_re = $signed(bram_b_rd_1[TOTAL_DATA_WIDTH-1:DATA_WIDTH]) >>> stage_shift;
+            input_1_im = $signed(bram_b_rd_1[DATA_WIDTH-1:0]) >>> stage_shift;
 
-            input_2_re = bram_b_rd_2[TOTAL_DATA_WIDTH-1:DATA_WIDTH];
-            input_2_im = bram_b_rd_2[DATA_WIDTH-1:0];
+            input_2_re = $signed(bram_b_rd_2[TOTAL_DATA_WIDTH-1:DATA_WIDTH]) >>> stage_shift;
+            input_2_im = $signed(bram_b_rd_2[DATA_WIDTH-1:0]) >>> stage_shift;
         end
     end
 
@@ -480,16 +611,98 @@ module fft_core
         end
     end
 
-    logic [DATA_WIDTH-1:0] abs_re_1, abs_im_1, abs_re_2, abs_im_2;
+    // BLOCK_FLOAT: the largest shift any word written so far (LOAD, or the
+    // current stage) asks for becomes the shift of the next stage's reads
+    always_comb begin
+        block_write = 0;
+        block_incoming = 0;
+
+        if (current_state == LOAD && input_data_valid && load_read_en) begin
+            block_write = 1;
+            block_incoming = max_shift(headroom_shift(input_data_re), headroom_shift(input_data_im));
+        end else if ((current_state == RUN_STAGE || current_state == FINISH_STAGE) && valid_pipe[TOTAL_LATENCY-1]) begin
+            block_write = 1;
+            block_incoming = max_shift(max_shift(headroom_shift(output_1_re), headroom_shift(output_1_im)),
+                                       max_shift(headroom_shift(output_2_re), headroom_shift(output_2_im)));
+        end
+
+        block_next = block_write ? max_shift(block_pending, block_incoming) : block_pending;
+    end
+
+    always_ff @(posedge clk) begin
+        if (rst || current_state == IDLE) begin
+            block_pending <= 0;
+            stage_shift <= 0;
+            block_shift_total <= 0;
+        end else if (next_state == RUN_STAGE && current_state != RUN_STAGE) begin
+            // a stage starts: everything it reads has been written
+            block_pending <= 0;
+            stage_shift <= BLOCK_FLOAT ? block_next : 0;
+            block_shift_total <= block_shift_total + (BLOCK_FLOAT ? block_next : 0);
+        end else begin
+            block_pending <= block_next;
+        end
+
+        if (rst) begin
+            block_exponent <= 0;
+        end else if (current_state == DONE) begin
+            block_exponent <= block_shift_total;
+        end
+    end
+
+    assign magnitude_approx_1 = magnitude(output_1_re, output_1_im);
+    assign magnitude_approx_2 = magnitude(output_2_re, output_2_im);
+
+    // SPLIT: bin k on port 1, its mirror (N-k) mod N on port 2
+    assign split_k = split_counter[STAGES-1:0];
+    assign split_mirror = POINTS - split_counter[STAGES-1:0];
+
+    always_ff @(posedge clk) begin
+        if (rst) begin
+            for (int i = 0; i < BRAM_LATENCY; i++) begin
+                split_bin_pipe[i] <= 0;
+                split_valid_pipe[i] <= 0;
+            end
+        end else begin
+            split_bin_pipe[0] <= split_k;
+            split_valid_pipe[0] <= (current_state == SPLIT && split_counter < SPLIT_BINS);
+
+            for (int i = 1; i < BRAM_LATENCY; i++) begin
+                split_bin_pipe[i] <= split_bin_pipe[i-1];
+                split_valid_pipe[i] <= split_valid_pipe[i-1];
+            end
+        end
+    end
+
+    logic signed [DATA_WIDTH-1:0] z_re, z_im, z_mirror_re, z_mirror_im;
+    logic signed [DATA_WIDTH:0] sum_re, diff_re, sum_im, diff_im;
+    logic signed [DATA_WIDTH-1:0] split_a_re, split_a_im, split_b_re, split_b_im;
 
     always_comb begin
-        abs_re_1 = (output_1_re[DATA_WIDTH-1]) ? (~output_1_re + 1) : output_1_re;
-        abs_im_1 = (output_1_im[DATA_WIDTH-1]) ? (~output_1_im + 1) : output_1_im;
-        abs_re_2 = (output_2_re[DATA_WIDTH-1]) ? (~output_2_re + 1) : output_2_re;
-        abs_im_2 = (output_2_im[DATA_WIDTH-1]) ? (~output_2_im + 1) : output_2_im;
-        
-        magnitude_approx_1 = {1'b0, abs_re_1} + {1'b0, abs_im_1};
-        magnitude_approx_2 = {1'b0, abs_re_2} + {1'b0, abs_im_2};
+        if (!FINAL_WRITE_TO_B) begin
+            {z_re, z_im} = bram_a_rd_1;
+            {z_mirror_re, z_mirror_im} = bram_a_rd_2;
+        end else begin
+            {z_re, z_im} = bram_b_rd_1;
+            {z_mirror_re, z_mirror_im} = bram_b_rd_2;
+        end
+
+        sum_re = z_re + z_mirror_re;
+        diff_re = z_re - z_mirror_re;
+        sum_im = z_im + z_mirror_im;
+        diff_im = z_im - z_mirror_im;
+
+        // A = ((Zr[k] + Zr[N-k]) + j(Zi[k] - Zi[N-k])) / 2
+        // B = ((Zi[k] + Zi[N-k]) - j(Zr[k] - Zr[N-k])) / 2, halved with >>> (floor)
+        split_a_re = sum_re >>> 1;
+        split_a_im = diff_im >>> 1;
+        split_b_re = sum_im >>> 1;
+        split_b_im = -(diff_re >>> 1);
+
+        magnitude_split_a = magnitude(split_a_re, split_a_im);
+        magnitude_split_b = magnitude(split_b_re, split_b_im);
+
+        split_band = band_map[split_bin_pipe[BRAM_LATENCY-1]];
     end
 
     always_comb begin
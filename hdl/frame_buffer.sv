@@ -3,7 +3,11 @@
 
 module frame_buffer
 #(
-    parameter POINTS = 512
+    parameter POINTS = 512,
+    // samples between frames. POINTS gives back-to-back frames; POINTS/2,
+    // POINTS/4, ... give overlapping ones, each still the last POINTS
+    // samples in arrival order. Must divide POINTS.
+    parameter HOP = POINTS
 )
 (
     input wire rst,
@@ -21,15 +25,19 @@ module frame_buffer
     localparam ADDR_WIDTH = $clog2(POINTS);
     localparam TOTAL_DEPTH = POINTS * 2;
     localparam BRAM_LATENCY = 2;
+    localparam HOP_WIDTH = $clog2(HOP) + 1;
 
-    logic write_bank;
-    logic read_bank;
-    logic full_bank;
+    // circular history of TOTAL_DEPTH samples: the writer can run POINTS
+    // samples ahead before it reaches the frame being read
+    logic [ADDR_WIDTH:0] write_addr;
+    logic [ADDR_WIDTH:0] read_addr;
+    logic [ADDR_WIDTH:0] full_start;
+    logic [ADDR_WIDTH-1:0] read_count;
 
-    logic [ADDR_WIDTH-1:0] write_addr;
-    logic [ADDR_WIDTH-1:0] read_addr;
+    logic [HOP_WIDTH-1:0] hop_count;
+    logic primed;
 
-    logic bank_full;
+    logic frame_full;
     logic reading;
 
     logic signed [23:0] bram_read_data;
@@ -39,7 +47,7 @@ module frame_buffer
         .RAM_WIDTH(24),
         .RAM_DEPTH(TOTAL_DEPTH)
     ) audio_bram (
-        .addra({write_bank, write_addr}),
+        .addra(write_addr),
         .dina(input_data),
         .clka(clk),
         .wea(input_valid),
@@ -48,7 +56,7 @@ module frame_buffer
         .regcea(1'b1),
         .douta(),
 
-        .addrb({read_bank, read_addr}),
+        .addrb(read_addr),
         .dinb(24'b0),
         .web(1'b0),
         .enb(1'b1),
@@ -59,14 +67,15 @@ module frame_buffer
 
     always_ff @(posedge clk) begin
         if (rst) begin
-            write_bank <= 0;
-            read_bank <= 0;
-            full_bank <= 0;
-
             write_addr <= 0;
             read_addr <= 0;
+            full_start <= 0;
+            read_count <= 0;
+
+            hop_count <= 0;
+            primed <= 0;
 
-            bank_full <= 0;
+            frame_full <= 0;
             reading <= 0;
             frame_ready <= 0;
 
@@ -77,33 +86,42 @@ module frame_buffer
         else begin
             if (input_valid) begin
                 write_addr <= write_addr + 1;
+                hop_count <= hop_count + 1;
 
                 if (write_addr == POINTS-1) begin
-                    write_addr <= 0;
-                    bank_full <= 1;
-                    full_bank <= write_bank;
-                    write_bank <= ~write_bank;
+                    primed <= 1;
+                end
+
+                // a frame every HOP samples once the first POINTS are in
+                if (hop_count == HOP-1) begin
+                    hop_count <= 0;
+
+                    if (primed || write_addr == POINTS-1) begin
+                        frame_full <= 1;
+                        full_start <= write_addr - (POINTS-1);
+                    end
                 end
             end
 
             // frame_ready: full frame available AND not reading
-            frame_ready <= bank_full && !reading;
+            frame_ready <= frame_full && !reading;
 
-            if (!reading && bank_full && read_request) begin
+            if (!reading && frame_full && read_request) begin
                 reading <= 1;
-                bank_full <= 0;
-                read_bank <= full_bank;
-                read_addr <= 0;
+                frame_full <= 0;
+                read_addr <= full_start;
+                read_count <= 0;
                 data_out_valid_pipe[0] <= 1;
             end
             else if (reading) begin
                 data_out_valid_pipe[0] <= 1;
 
-                if (read_addr == POINTS-1) begin
+                if (read_count == POINTS-1) begin
                     reading <= 0;
-                    read_addr <= 0;
+                    read_count <= 0;
                 end
                 else begin
+                    read_count <= read_count + 1;
                     read_addr <= read_addr + 1;
                 end
             end
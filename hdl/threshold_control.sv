@@ -1,6 +1,8 @@
 `default_nettype none
 module threshold_control#(
-    parameter BAR_REGION_HEIGHT    = 359, parameter MOVE_SPEED = 4
+    parameter BAR_REGION_HEIGHT    = 359, parameter MOVE_SPEED = 4,
+    // reset values, e.g. from sim/model/threshold_tuner.py
+    parameter LOW_DEFAULT = 0, parameter MIDDLE_DEFAULT = 0, parameter HIGH_DEFAULT = 0
 )
     (
         input wire clk,
@@ -17,9 +19,9 @@ module threshold_control#(
 
     always_ff @(posedge clk)begin
         if(rst)begin
-            low_threshold<=0;
-            middle_threshold<=0;
-            high_threshold<=0;
+            low_threshold<=LOW_DEFAULT;
+            middle_threshold<=MIDDLE_DEFAULT;
+            high_threshold<=HIGH_DEFAULT;
             counter<=0;
         end
         else begin
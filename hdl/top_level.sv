@@ -66,6 +66,7 @@ module top_level(
     logic clk_100mhz_buffer;
     logic clk_pixel;
     logic locked;
+    logic hdmi_locked;
 
     // System Clock
     design_1_clk_wiz_0_0_clk_wiz create_98_clk (
@@ -79,7 +80,7 @@ module top_level(
     // HDMI Clocks
     hdmi_clk_wiz_720p mhdmicw (
         .reset(0),
-        .locked(locked),
+        .locked(hdmi_locked),
         .clk_ref(clk_100mhz_buffer),
         .clk_pixel(clk_pixel),
         .clk_tmds(clk_5x)
@@ -175,7 +176,8 @@ module top_level(
     logic start_fft_single;
 
     frame_buffer #(
-        .POINTS(512)
+        .POINTS(512),
+        .HOP(512)
     ) fb (
         .clk(clk_98mhz),
         .rst(sys_rst),
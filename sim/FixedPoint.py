@@ -0,0 +1,134 @@
+"""Lightweight fixed-point arrays for the testbenches.
+
+A FixedPoint is an int64 NumPy array of raw two's complement values plus the
+width/frac_bits it is interpreted with, so a whole stimulus vector (or a
+whole readout) converts in one vectorized step instead of one Fxp object per
+sample.
+
+    samples = FixedPoint.from_float(np.sin(t), 24, 16)
+    dut.input_data_re.value = samples.packed()[i]       # bit pattern for a signal
+    out = FixedPoint.from_signals(values, 24, 16)       # list of dut.x.value
+    out.to_float()
+
+Conversion defaults follow fxpmath's (truncate toward zero, saturate on
+overflow) so stimulus built here matches what Fxp produced before.
+"""
+import numpy as np
+
+
+def wrap(raw, width, signed=True):
+    # two's complement (or modulo for unsigned) wrap to `width` bits
+    raw = np.asarray(raw, dtype=np.int64)
+    mask = (np.int64(1) << width) - 1
+    if not signed:
+        return raw & mask
+    half = np.int64(1) << (width - 1)
+    return ((raw + half) & mask) - half
+
+
+def saturate(raw, width, signed=True):
+    lo, hi = int_range(width, signed)
+    return np.clip(np.asarray(raw, dtype=np.int64), lo, hi)
+
+
+def int_range(width, signed=True):
+    if signed:
+        return -(1 << (width - 1)), (1 << (width - 1)) - 1
+    return 0, (1 << width) - 1
+
+
+class FixedPoint:
+    ROUNDING = {
+        "trunc": np.trunc,
+        "floor": np.floor,
+        "round": np.round,
+        "ceil": np.ceil,
+    }
+
+    def __init__(self, raw, width, frac_bits, signed=True):
+        if width > 63:
+            raise ValueError(f"width {width} does not fit in int64")
+        self.raw = np.asarray(raw, dtype=np.int64)
+        self.width = width
+        self.frac_bits = frac_bits
+        self.signed = signed
+
+    # -- construction -------------------------------------------------------
+
+    @classmethod
+    def from_float(cls, values, width, frac_bits, signed=True, rounding="trunc", overflow="saturate"):
+        scaled = np.asarray(values, dtype=np.float64) * (2.0 ** frac_bits)
+        try:
+            scaled = cls.ROUNDING[rounding](scaled)
+        except KeyError:
+            raise ValueError(f"unknown rounding {rounding!r}, expected one of {list(cls.ROUNDING)}")
+
+        # clip in float first so huge values can't overflow the int64 cast
+        lo, hi = int_range(width, signed)
+        if overflow == "saturate":
+            raw = np.clip(scaled, lo, hi).astype(np.int64)
+        elif overflow == "wrap":
+            raw = wrap(np.clip(scaled, -2.0 ** 62, 2.0 ** 62).astype(np.int64), width, signed)
+        else:
+            raise ValueError(f"unknown overflow {overflow!r}, expected 'saturate' or 'wrap'")
+        return cls(raw, width, frac_bits, signed)
+
+    @classmethod
+    def from_packed(cls, values, width, frac_bits, signed=True):
+        """From unsigned bit patterns, e.g. ints read back from signals."""
+        return cls(wrap(np.asarray(values, dtype=np.int64), width, signed), width, frac_bits, signed)
+
+    @classmethod
+    def from_signals(cls, values, width, frac_bits, signed=True):
+        """From a list of cocotb signal values; unresolvable (x/z) values read as 0."""
+        packed = [int(v) if v.is_resolvable else 0 for v in values]
+        return cls.from_packed(packed, width, frac_bits, signed)
+
+    # -- conversion ---------------------------------------------------------
+
+    def to_float(self):
+        return self.raw / (2.0 ** self.frac_bits)
+
+    def packed(self):
+        """Unsigned bit patterns, ready to assign to a signal's .value."""
+        return self.raw & ((np.int64(1) << self.width) - 1)
+
+    def tolist(self):
+        return self.raw.tolist()
+
+    def saturate(self, width=None):
+        width = self.width if width is None else width
+        return FixedPoint(saturate(self.raw, width, self.signed), width, self.frac_bits, self.signed)
+
+    def wrap(self, width=None):
+        width = self.width if width is None else width
+        return FixedPoint(wrap(self.raw, width, self.signed), width, self.frac_bits, self.signed)
+
+    def resize(self, width, frac_bits, overflow="saturate"):
+        """Re-quantize to a new format (arithmetic shift, so truncation is toward -inf)."""
+        shift = frac_bits - self.frac_bits
+        raw = self.raw << shift if shift >= 0 else self.raw >> -shift
+        fixed = FixedPoint(raw, self.width, frac_bits, self.signed)
+        return fixed.saturate(width) if overflow == "saturate" else fixed.wrap(width)
+
+    # -- array behaviour ----------------------------------------------------
+
+    def __len__(self):
+        return len(self.raw)
+
+    def __getitem__(self, index):
+        return FixedPoint(self.raw[index], self.width, self.frac_bits, self.signed)
+
+    def __int__(self):
+        return int(self.raw)
+
+    def __float__(self):
+        return float(self.to_float())
+
+    def __array__(self, dtype=None, copy=None):
+        out = self.to_float()
+        return out if dtype is None else out.astype(dtype)
+
+    def __repr__(self):
+        kind = "s" if self.signed else "u"
+        return f"FixedPoint({kind}{self.width}.{self.frac_bits}, {self.to_float()!r})"
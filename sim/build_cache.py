@@ -0,0 +1,125 @@
+"""Content-hashed cache of simulator builds for runner.py.
+
+A build is keyed on everything that can change the compiled simulation:
+the contents of SOURCES, TOPLEVEL, PARAMS, BUILD_ARGS, TIMESCALE, waves, the
+simulator and its version, and the cocotb version. Test modules that compile
+the same design (all the fft_core tests, for example) share one entry, and
+entries survive between invocations until the LRU size cap evicts them.
+"""
+import fcntl
+import functools
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+from contextlib import contextmanager
+from pathlib import Path
+
+import cocotb
+
+VERSION_COMMANDS = {
+    "icarus": ["iverilog", "-V"],
+    "verilator": ["verilator", "--version"],
+}
+
+
+@functools.lru_cache(maxsize=None)
+def simulator_version(sim):
+    cmd = VERSION_COMMANDS.get(sim, [sim, "--version"])
+    try:
+        out = subprocess.run(cmd, capture_output=True, text=True, timeout=30)
+    except (OSError, subprocess.TimeoutExpired):
+        return "unknown"
+    lines = (out.stdout or out.stderr).strip().splitlines()
+    return lines[0] if lines else "unknown"
+
+
+def file_digest(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def dir_size(path):
+    return sum(f.stat().st_size for f in Path(path).rglob("*") if f.is_file())
+
+
+class BuildCache:
+    def __init__(self, root, max_bytes):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.lock_dir = self.root / "locks"
+        self.lock_dir.mkdir(parents=True, exist_ok=True)
+
+    def key(self, sim, sources, hdl_toplevel, params, build_args, timescale, waves):
+        desc = {
+            "sim": sim,
+            "sim_version": simulator_version(sim),
+            "cocotb": cocotb.__version__,
+            "toplevel": hdl_toplevel,
+            "params": {str(k): str(v) for k, v in sorted(params.items())},
+            "build_args": [str(a) for a in build_args],
+            "timescale": list(timescale) if timescale else None,
+            "waves": bool(waves),
+            "sources": [(Path(s).name, file_digest(s)) for s in sources],
+        }
+        blob = json.dumps(desc, sort_keys=True).encode()
+        return f"{hdl_toplevel}-{hashlib.sha256(blob).hexdigest()[:16]}"
+
+    @contextmanager
+    def checkout(self, key, build):
+        """Yield (build_dir, hit) for `key`, calling build(build_dir) first on a miss.
+
+        Hits only take a shared lock, so parallel jobs with the same key
+        simulate side by side. A miss upgrades to an exclusive lock and checks
+        again, so the key builds once; the entry is then held with a shared
+        lock until the block exits so eviction can't delete it out from under
+        a running sim.
+        """
+        path = self.root / key
+        stamp = path / ".built"
+        with open(self.lock_dir / f"{key}.lock", "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_SH)
+            hit = stamp.is_file()
+            if not hit:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+                fcntl.flock(lock, fcntl.LOCK_EX)
+                # another job may have built it while we waited
+                hit = stamp.is_file()
+                if not hit:
+                    shutil.rmtree(path, ignore_errors=True)
+                    path.mkdir(parents=True)
+                    build(path)
+                    stamp.touch()
+                fcntl.flock(lock, fcntl.LOCK_SH)
+            os.utime(stamp)
+            yield path, hit
+
+    def evict(self):
+        """Drop least recently used entries until the cache fits in max_bytes."""
+        entries = []
+        for path in self.root.iterdir():
+            if not path.is_dir() or path == self.lock_dir:
+                continue
+            stamp = path / ".built"
+            # half-finished builds go first
+            last_used = stamp.stat().st_mtime if stamp.is_file() else 0.0
+            entries.append((last_used, path, dir_size(path)))
+
+        total = sum(size for _, _, size in entries)
+        removed = []
+        for _, path, size in sorted(entries, key=lambda e: e[0]):
+            if total <= self.max_bytes:
+                break
+            with open(self.lock_dir / f"{path.name}.lock", "w") as lock:
+                try:
+                    fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    continue
+                shutil.rmtree(path, ignore_errors=True)
+            total -= size
+            removed.append(path.name)
+        return removed
@@ -0,0 +1,88 @@
+"""Measures top_level's per-frame FFT intervals and checks them against cycle_budget.py.
+
+    probe = CycleProbe(dut, CLK_98_PERIOD_NS)
+    ...                       # stream audio
+    probe.check(dut._log)     # logs the table, fails on drift
+
+frame_ready -> start_fft and start_fft -> fft_done are timed off rising
+edges only (EdgeMonitor), so the probe costs a few callbacks per frame.
+"""
+import numpy as np
+
+from cycle_budget import budget, read_params
+from monitors import EdgeMonitor
+
+
+class CycleProbe:
+    """Edge timestamps of frame_buf_ready, start_fft_single and fft_done, in clk_98mhz cycles.
+
+    `tolerance` is how many cycles a measured interval may sit off the
+    analytic one before it counts as drift.
+    """
+
+    def __init__(self, dut, clk_period_ns, tolerance=0, params=None):
+        self.clk_period_ns = clk_period_ns
+        self.tolerance = tolerance
+        self.expected = budget(params or read_params())
+        self.frame_ready = EdgeMonitor(dut.frame_buf_ready)
+        self.start_fft = EdgeMonitor(dut.start_fft_single)
+        self.fft_done = EdgeMonitor(dut.fft_done)
+
+    def intervals(self):
+        """{name: per-frame cycles} for every start_fft with a frame_ready before it and fft_done after."""
+        ready = np.array(self.frame_ready.times)
+        starts = np.array(self.start_fft.times)
+        done = np.array(self.fft_done.times)
+        if len(ready):
+            starts = starts[starts >= ready[0]]
+        n = min(len(starts), len(done)) if len(ready) else 0
+        starts, done = starts[:n], done[:n]
+        # latest frame_ready at or before each start
+        before = ready[np.searchsorted(ready, starts, side="right") - 1]
+        to_cycles = 1 / self.clk_period_ns
+        return {
+            "frame_ready -> start_fft": np.round((starts - before) * to_cycles).astype(np.int64),
+            "start_fft -> fft_done": np.round((done - starts) * to_cycles).astype(np.int64),
+            "frame period": np.round(np.diff(ready) * to_cycles).astype(np.int64),
+        }
+
+    def analytic(self):
+        return {
+            "frame_ready -> start_fft": self.expected["ready_to_start"],
+            "start_fft -> fft_done": self.expected["start_to_done"],
+        }
+
+    def drift(self):
+        """(name, analytic, measured min, measured max) for each interval off by more than the tolerance."""
+        measured = self.intervals()
+        drifts = []
+        for name, want in self.analytic().items():
+            got = measured[name]
+            if len(got) and np.abs(got - want).max() > self.tolerance:
+                drifts.append((name, want, int(got.min()), int(got.max())))
+        return drifts
+
+    def report(self, log):
+        measured = self.intervals()
+        frames = len(measured["start_fft -> fft_done"])
+        log.info(f"Cycle budget over {frames} frames (analytic vs measured, clk_98mhz cycles):")
+        for name, want in self.analytic().items():
+            got = measured[name]
+            span = f"{got.min()}..{got.max()}" if len(got) else "-"
+            log.info(f"  {name:<26}{want:>8}  {span}")
+        period = measured["frame period"]
+        if len(period):
+            # the testbench clocks I2S faster than 48 kHz, so the frame period is its own
+            used = self.expected["used"]
+            log.info(f"  frame period {period.mean():.0f} cycles, FFT side uses {100 * used / period.mean():.2f}%")
+        for name, want, low, high in self.drift():
+            log.warning(f"  DRIFT {name}: analytic {want}, measured {low}..{high}")
+
+    def check(self, log):
+        self.report(log)
+        drifts = self.drift()
+        assert not drifts, f"Measured intervals drifted from cycle_budget.py: {drifts}"
+
+    def stop(self):
+        for monitor in (self.frame_ready, self.start_fft, self.fft_done):
+            monitor.stop()
@@ -0,0 +1,173 @@
+"""Bulk load / readout helpers for fft_core testbenches.
+
+Front-door access goes through the ports the way top_level uses them:
+samples clocked in one per cycle against load_read_en, results read back
+through read_addr with the BRAM read latency on every address. That is
+~2,500 clock edges and Python round trips per frame.
+
+Back-door access goes through the hierarchy instead: samples are written
+straight into bram_a (at their bit-reversed addresses, which is what LOAD
+does) and the result BRAM is dumped word by word without advancing the
+clock. Set FFT_BACKDOOR=0 in the environment, or pass backdoor=False, to
+exercise the real load/read paths.
+"""
+import os
+
+import numpy as np
+from cocotb.triggers import ClockCycles, FallingEdge, RisingEdge
+
+from FixedPoint import FixedPoint
+from fft_model import block_shift, to_signed
+from monitors import drive_stream, start_clock, wait_for
+
+BACKDOOR = os.getenv("FFT_BACKDOOR", "1") != "0"
+
+# read_addr -> read_data latency through the output-registered BRAM
+READ_LATENCY = 3
+
+
+def bit_reverse(n, bits):
+    return int(f"{n:0{bits}b}"[::-1], 2)
+
+
+def random_tone_frames(fft, frames, rng, max_bin, tones=4, min_bin=1, level=0.25):
+    """Raw input frames for a core with `fft` parameters (hdl_params()).
+
+    Each frame is `tones` equal sines at random bins in [min_bin, max_bin)
+    plus a little noise, peaking around `level` of full scale (a quarter by
+    default) and clipped to DATA_WIDTH. `level` is a scalar or one per frame.
+    """
+    points, width = fft["POINTS"], fft["DATA_WIDTH"]
+    n = np.arange(points)
+    bins = rng.integers(min_bin, max_bin, size=(frames, tones))
+    audio = np.sin(2 * np.pi * bins[:, :, None] * n / points).sum(axis=1) / tones
+    audio = audio + rng.normal(0, 0.02, size=(frames, points))
+    full = 1 << (width - 1)
+    scaled = audio * np.reshape(level, (-1, 1)) * full
+    return np.clip(np.round(scaled), -full, full - 1).astype(np.int64)
+
+
+class FFTCoreDriver:
+    def __init__(self, dut, points=512, data_width=24, frac_bits=16, debug_load=False,
+                 backdoor=BACKDOOR, backdoor_read=None, num_bands=3):
+        self.dut = dut
+        self.points = points
+        self.num_bands = num_bands
+        self.stages = points.bit_length() - 1
+        self.data_width = data_width
+        self.frac_bits = frac_bits
+        self.debug_load = debug_load
+        self.backdoor_load = backdoor
+        self.backdoor_read = backdoor if backdoor_read is None else backdoor_read
+        self.mask = (1 << data_width) - 1
+
+        # mirrors FINAL_WRITE_TO_B in fft_core.sv
+        final_write_to_b = self.stages % 2 == 1 and not debug_load
+        self.result_bram = dut.bram_b if final_write_to_b else dut.bram_a
+
+    async def reset(self, period_ns=10):
+        dut = self.dut
+        start_clock(dut.clk, period_ns)
+        dut.start_fft.value = 0
+        dut.input_data_valid.value = 0
+        dut.input_data_re.value = 0
+        dut.input_data_im.value = 0
+        dut.read_addr.value = 0
+        dut.rst.value = 1
+        await ClockCycles(dut.clk, 5)
+        dut.rst.value = 0
+        await ClockCycles(dut.clk, 1)
+
+    def _as_packed(self, values):
+        if values is None:
+            return [0] * self.points
+        if isinstance(values, FixedPoint):
+            return values.packed().tolist()
+        return [int(v) & self.mask for v in values]
+
+    async def load(self, samples_re, samples_im=None):
+        """Start a transform and load one frame of samples (FixedPoint or raw ints)."""
+        re = self._as_packed(samples_re)
+        im = self._as_packed(samples_im)
+        if len(re) != self.points or len(im) != self.points:
+            raise ValueError(f"expected {self.points} samples, got {len(re)}/{len(im)}")
+
+        if self.backdoor_load:
+            await self._load_backdoor(re, im)
+        else:
+            await self._load_frontdoor(re, im)
+
+    async def _load_frontdoor(self, re, im):
+        dut = self.dut
+        dut.start_fft.value = 1
+        await RisingEdge(dut.clk)
+        dut.start_fft.value = 0
+
+        await wait_for(dut.load_read_en, 1, dut.clk)
+        await drive_stream(dut.clk, dut.input_data_valid, (dut.input_data_re, dut.input_data_im), zip(re, im))
+
+    async def _load_backdoor(self, re, im):
+        dut = self.dut
+        bram = dut.bram_a.BRAM
+        for i in range(self.points):
+            bram[bit_reverse(i, self.stages)].value = (re[i] << self.data_width) | im[i]
+
+        dut.input_data_valid.value = 0
+        dut.start_fft.value = 1
+        await RisingEdge(dut.clk)
+        dut.start_fft.value = 0
+
+        # now in LOAD: jump the counter to the last sample so the FSM moves
+        # straight on to RUN_STAGE without writing anything over the preload,
+        # with the block floating point shift LOAD would have found
+        await FallingEdge(dut.clk)
+        dut.sample_load_counter.value = self.points - 1
+        dut.block_pending.value = int(block_shift(to_signed(re, self.data_width), to_signed(im, self.data_width),
+                                                  self.data_width))
+        await RisingEdge(dut.clk)
+
+    async def wait_done(self):
+        await RisingEdge(self.dut.fft_done)
+        await ClockCycles(self.dut.clk, 5)
+
+    async def run(self, samples_re, samples_im=None):
+        """load() + wait_done() + read(): returns (re, im) FixedPoint arrays."""
+        await self.load(samples_re, samples_im)
+        await self.wait_done()
+        return await self.read()
+
+    async def read(self):
+        """Read every bin back, in natural order, as (re, im) FixedPoint arrays."""
+        if not self.backdoor_read:
+            raw_re, raw_im = [], []
+            for addr in range(self.points):
+                self.dut.read_addr.value = addr
+                await ClockCycles(self.dut.clk, READ_LATENCY)
+                raw_re.append(self.dut.read_data_re.value)
+                raw_im.append(self.dut.read_data_im.value)
+            return (FixedPoint.from_signals(raw_re, self.data_width, self.frac_bits),
+                    FixedPoint.from_signals(raw_im, self.data_width, self.frac_bits))
+
+        # each BRAM word is {re, im}
+        bram = self.result_bram.BRAM
+        words = [bram[i].value for i in range(self.points)]
+        packed = [int(w) if w.is_resolvable else 0 for w in words]
+        re = FixedPoint.from_packed([w >> self.data_width for w in packed], self.data_width, self.frac_bits)
+        im = FixedPoint.from_packed([w & self.mask for w in packed], self.data_width, self.frac_bits)
+        return re, im
+
+    def _unpack_bands(self, signal):
+        packed = int(signal.value)
+        return [(packed >> (32 * b)) & 0xFFFFFFFF for b in range(self.num_bands)]
+
+    def bands(self):
+        """band_magnitudes, band 0 first (low, mid, high for the default table)."""
+        return self._unpack_bands(self.dut.band_magnitudes)
+
+    def bands_b(self):
+        # TWO_REAL=1 only: bands of the frame loaded on input_data_im
+        return self._unpack_bands(self.dut.band_magnitudes_b)
+
+    def exponent(self):
+        # BLOCK_FLOAT=1: read() returns the spectrum divided by 2**exponent()
+        return int(self.dut.block_exponent.value)
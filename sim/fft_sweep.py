@@ -0,0 +1,350 @@
+#!/usr/bin/env python3
+"""Sweep fft_core over POINTS and fixed-point widths.
+
+Every grid point gets its own twiddle ROM and a run of the bit-exact model
+on the same audio. The model is scored against a float FFT of the same
+integer input: SNR over all bins, and the error of the |re| + |im| band sums
+fft_core reports. Cycles per frame come from cycle_budget.py, and BRAM/DSP
+use is estimated for 7-series primitives. With --rtl, test_fft_config.py
+also simulates each configuration, checks it bit for bit against the model
+and measures the cycles. Grid points run in parallel.
+
+    python sim/fft_sweep.py --points 256 512 1024 --twiddle 5/3 8/6 12/10 --min-snr 40
+    python sim/fft_sweep.py --data 24/8 18/8 --rtl -j 4 --csv sweep.csv
+
+DATA_FRAC_BITS only labels the binary point (the butterfly never uses it),
+so rows that differ only in it come out the same. Without BLOCK_FLOAT
+fft_core doesn't scale between stages, so loud input saturates and swamps
+twiddle precision: watch the sat % column, and use --gain-db to see the
+quantization floor. --block-float 0 1 runs every point both ways and
+reports what block floating point buys at each DATA_WIDTH, in dB and in
+the datapath bits that would cost at 6.02 dB/bit.
+
+    python sim/fft_sweep.py --data 24/8 20/8 16/8 12/4 --twiddle 12/10 --block-float 0 1
+"""
+import argparse
+import csv
+import itertools
+import json
+import math
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+import numpy as np
+
+sim_dir = Path(__file__).resolve().parent
+for path in (sim_dir / "model", sim_dir / "tests", sim_dir.parent / "data"):
+    if str(path) not in sys.path:
+        sys.path.append(str(path))
+
+from cycle_budget import fft_cycles, hdl_params  # noqa: E402
+from band_gen import gen_band_map  # noqa: E402
+from fft_model import FFTCoreModel, magnitude_approx, read_band_map  # noqa: E402
+from pipeline_model import to_mono  # noqa: E402
+from twiddle_gen import error_report, gen_twiddle_rom  # noqa: E402
+
+proj_path = sim_dir.parent
+FFT_CORE = proj_path / "hdl" / "fft_core.sv"
+FRAME_BUFFER = proj_path / "hdl" / "frame_buffer.sv"
+# one directory per grid point: data/twiddle_rom.mem, data/band_map.mem, run/, logs
+SWEEP_DIR = proj_path / "sim_build" / "sweep"
+
+RTL_TEST = "test_fft_config"
+SAMPLE_WIDTH = 24
+
+# 7-series block RAM: RAMB18 true dual port shapes (depth, width), and the
+# widest operands a DSP48E1 multiplies in one slice
+RAMB18_SHAPES = ((16384, 1), (8192, 2), (4096, 4), (2048, 9), (1024, 18))
+DSP_A_WIDTH, DSP_B_WIDTH = 25, 18
+# butterfly.sv: four real products per complex multiply
+BUTTERFLY_MULTIPLIERS = 4
+
+
+def ramb18_count(depth, width):
+    return min(math.ceil(width / w) * math.ceil(depth / d) for d, w in RAMB18_SHAPES)
+
+
+def dsp_count(a_width, b_width):
+    return min(math.ceil(a_width / DSP_A_WIDTH) * math.ceil(b_width / DSP_B_WIDTH),
+               math.ceil(a_width / DSP_B_WIDTH) * math.ceil(b_width / DSP_A_WIDTH))
+
+
+def resources(fft):
+    """Estimated RAMB36 (in halves) and DSP48E1 slices for fft_core at these parameters."""
+    # bram_a and bram_b hold {re, im}; the twiddle ROM holds POINTS/2 packed pairs
+    data = 2 * ramb18_count(fft["POINTS"], 2 * fft["DATA_WIDTH"])
+    rom = ramb18_count(fft["POINTS"] // 2, 2 * fft["TWIDDLE_WIDTH"])
+    return {
+        "bram36": (data + rom) / 2,
+        "dsp": BUTTERFLY_MULTIPLIERS * dsp_count(fft["DATA_WIDTH"], fft["TWIDDLE_WIDTH"]),
+    }
+
+
+def synthetic_audio(samples, rng):
+    """Tones in each band over a little noise, as stereo 24-bit samples peaking around -20 dBFS."""
+    n = np.arange(samples)
+    freqs = (3 * 93.75, 20 * 93.75, 70 * 93.75)      # bins 3, 20, 70 at 512 points / 48 kHz
+    levels = rng.uniform(0.05, 0.08, size=3)
+    mono = sum(a * np.sin(2 * np.pi * f * n / 48000) for a, f in zip(levels, freqs))
+    mono = mono + rng.normal(0, 0.005, size=samples)
+    audio = np.round(mono * (1 << (SAMPLE_WIDTH - 1))).astype(np.int64)
+    return np.stack((audio, audio), axis=1)
+
+
+def load_frames(wav, frames, points, gain_db=0.0):
+    """top_level's mono mix of `wav` (or synthetic audio), cut into frames of `points` samples."""
+    count = frames * points
+    if wav:
+        from i2s_stimulus import wav_samples
+
+        stereo = wav_samples(wav, seconds=count / 48000)
+    else:
+        stereo = synthetic_audio(count, np.random.default_rng(16))
+    mono = to_mono(stereo)[:count]
+    if gain_db:
+        mono = np.round(mono * 10 ** (gain_db / 20)).astype(np.int64)
+    return mono[:len(mono) // points * points].reshape(-1, points)
+
+
+def snr_db(out_re, out_im, exponent, ref):
+    # output scaled back up by 2**exponent per frame, against the float spectrum
+    scale = (np.int64(1) << np.asarray(exponent, dtype=np.int64))[:, None]
+    err = (out_re * scale - ref.real) ** 2 + (out_im * scale - ref.imag) ** 2
+    return 10 * np.log10(np.sum(np.abs(ref) ** 2) / max(np.sum(err), 1e-30))
+
+
+def model_metrics(fft, rom, band_map, frames):
+    """SNR (dB) of the fixed-point output against a float FFT, and band sum errors (%)."""
+    model = FFTCoreModel.from_params(fft, twiddle_rom=rom, band_map=read_band_map(band_map))
+    # 24-bit audio into a DATA_WIDTH-bit core: keep the top bits
+    shift = SAMPLE_WIDTH - fft["DATA_WIDTH"]
+    frames = frames >> shift if shift > 0 else frames << -shift
+    out_re, out_im, exponent = model.fft(frames, return_exponent=True)
+    bands = model.band_magnitudes(out_re, out_im, exponent)
+
+    # the reference is the plain DFT; block floating point output is scaled back up first
+    ref = np.fft.fft(frames.astype(np.float64), axis=1)
+    snr = snr_db(out_re, out_im, exponent, ref)
+
+    # an unscaled core only works with the input turned down by hand (the way
+    # test_fft_audio.py divides by 256): its SNR at the best fixed attenuation
+    hand_snr = snr
+    if not fft["BLOCK_FLOAT"]:
+        for atten in range(1, model.stages + 3):
+            re, im = model.fft(frames >> atten)
+            hand_snr = max(hand_snr, snr_db(re, im, np.full(len(frames), atten), ref))
+
+    ref_mag = magnitude_approx(ref.real, ref.imag)
+    ref_bands = ref_mag @ model.band_table
+    band_err = np.abs(bands - ref_bands) / np.maximum(ref_bands, 1)
+    saturated = np.mean((np.abs(out_re) >= (1 << (fft["DATA_WIDTH"] - 1)) - 1) |
+                        (np.abs(out_im) >= (1 << (fft["DATA_WIDTH"] - 1)) - 1))
+    return {
+        "snr_db": float(snr),
+        "snr_hand_db": float(hand_snr),
+        "band_err_mean_pct": float(100 * band_err.mean()),
+        "band_err_max_pct": float(100 * band_err.max()),
+        "saturated_pct": float(100 * saturated),
+        "exponent": float(exponent.mean()),
+    }
+
+
+def run_rtl(params, rom, band_map, out_dir, sim, frames):
+    """Simulate test_fft_config.py at `params` and return its result dict."""
+    from runner import BUILD_CACHE, get_runner, tests_dir
+    from build_cache import BuildCache
+    from static_config import module_config
+
+    result_file = out_dir / "rtl.json"
+    result_file.unlink(missing_ok=True)
+    runner = get_runner(sim)
+    test = module_config(tests_dir / f"{RTL_TEST}.py")
+    sources = test["SOURCES"]
+
+    def build(build_dir):
+        runner.build(sources=sources, hdl_toplevel=test["TOPLEVEL"], parameters=params,
+                     build_args=test["BUILD_ARGS"], timescale=test["TIMESCALE"],
+                     build_dir=build_dir, log_file=out_dir / "build.log", always=True)
+
+    cache = BuildCache(BUILD_CACHE, 1024 << 20)
+    key = cache.key(sim, sources, test["TOPLEVEL"], params, test["BUILD_ARGS"], test["TIMESCALE"], False)
+    config = {"params": params, "rom": str(rom), "band_map": str(band_map), "frames": frames,
+              "result": str(result_file)}
+    with cache.checkout(key, build) as (build_dir, _):
+        # the simulation runs in out_dir/run so ../data/*.mem are this point's tables
+        runner.test(hdl_toplevel=test["TOPLEVEL"], hdl_toplevel_lang="verilog", test_module=RTL_TEST,
+                    parameters=params, timescale=test["TIMESCALE"], build_dir=build_dir,
+                    test_dir=out_dir / "run", results_xml=str(out_dir / "results.xml"),
+                    extra_env={"FFT_CONFIG": json.dumps(config)}, log_file=out_dir / "test.log")
+    if not result_file.is_file():
+        return {"rtl": "ERROR"}
+    rtl = json.loads(result_file.read_text())
+    ok = rtl["mismatched_bins"] == 0 and all(c == rtl["analytic_cycles"] for c in rtl["cycles"])
+    return {"rtl": "PASS" if ok else "FAIL", "rtl_cycles": max(rtl["cycles"], default=None)}
+
+
+def evaluate(point, args):
+    """Model (and optionally RTL) results for one grid point. Runs in a worker process."""
+    params = {"POINTS": point[0], "DATA_WIDTH": point[1], "DATA_FRAC_BITS": point[2],
+              "TWIDDLE_WIDTH": point[3], "TWIDDLE_FRAC_BITS": point[4], "BLOCK_FLOAT": point[5]}
+    name = "p{}_d{}f{}_t{}f{}".format(*point[:5]) + ("_bfp" if point[5] else "")
+    out_dir = SWEEP_DIR / name
+    # points that share a twiddle format copy the ROM out of twiddle_gen's cache
+    rom = gen_twiddle_rom(params["POINTS"], params["TWIDDLE_WIDTH"], params["TWIDDLE_FRAC_BITS"],
+                          out_dir / "data" / "twiddle_rom.mem", quiet=True)
+    # the default band edges in Hz, mapped onto this point's bins
+    band_map = out_dir / "data" / "band_map.mem"
+    rtl_params = {**params, **gen_band_map(N=params["POINTS"], outfile=band_map, quiet=True)}
+    fft = hdl_params(FFT_CORE, rtl_params)
+    phases = fft_cycles(fft, hdl_params(FRAME_BUFFER, {"POINTS": params["POINTS"]}))
+
+    row = dict(params)
+    row.update(model_metrics(fft, rom, band_map, load_frames(args.wav, args.frames, params["POINTS"], args.gain_db)))
+    row["twiddle_err_max"] = error_report(params["POINTS"], params["TWIDDLE_WIDTH"], params["TWIDDLE_FRAC_BITS"],
+                                          data_width=params["DATA_WIDTH"])["max_error"]
+    row["cycles"] = sum(phases.values())
+    row.update(resources(fft))
+    if args.rtl:
+        (out_dir / "run").mkdir(parents=True, exist_ok=True)
+        row.update(run_rtl(rtl_params, rom, band_map, out_dir, args.sim, args.rtl_frames))
+    return row
+
+
+def parse_pair(text):
+    try:
+        width, frac = (int(x) for x in text.split("/"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected WIDTH/FRAC, got {text!r}")
+    return width, frac
+
+
+def grid(args):
+    points = []
+    for n, (dw, df), (tw, tf), bfp in itertools.product(args.points, args.data, args.twiddle, args.block_float):
+        # a twiddle of 1.0 needs a sign bit above the fraction
+        if tf >= tw or df > dw or n & (n - 1):
+            print(f"skipping POINTS={n} DATA={dw}/{df} TWIDDLE={tw}/{tf}", file=sys.stderr)
+            continue
+        points.append((n, dw, df, tw, tf, bfp))
+    return points
+
+
+COLUMNS = [("POINTS", "{:>6}"), ("DATA_WIDTH", "{:>5}"), ("DATA_FRAC_BITS", "{:>5}"), ("TWIDDLE_WIDTH", "{:>5}"),
+           ("TWIDDLE_FRAC_BITS", "{:>5}"), ("BLOCK_FLOAT", "{:>4}"), ("snr_db", "{:>8.1f}"), ("snr_hand_db", "{:>8.1f}"), ("band_err_mean_pct", "{:>9.3f}"),
+           ("band_err_max_pct", "{:>9.3f}"), ("saturated_pct", "{:>7.2f}"), ("exponent", "{:>5.1f}"), ("cycles", "{:>7}"),
+           ("bram36", "{:>6.1f}"), ("dsp", "{:>4}")]
+HEADERS = ["N", "DW", "DF", "TW", "TF", "BFP", "SNR dB", "hand dB", "band err", "max err", "sat %", "exp", "cycles", "BRAM",
+           "DSP"]
+# the grid point columns
+KEYS = [key for key, _ in COLUMNS[:6]]
+# SNR per datapath bit for a quantization-limited transform
+DB_PER_BIT = 6.02
+
+
+def format_table(rows, best=None):
+    widths = [len(fmt.format(*([0.0] if "f}" in fmt else [0]))) for _, fmt in COLUMNS]
+    lines = [" ".join(f"{h:>{w}}" for h, w in zip(HEADERS, widths)) + "  RTL"]
+    for row in rows:
+        cells = " ".join(fmt.format(row[key]) for key, fmt in COLUMNS)
+        rtl = row.get("rtl", "")
+        lines.append(f"{cells}  {rtl}{'  <- cheapest' if row is best else ''}")
+    return "\n".join(lines)
+
+
+def block_float_gain(rows, min_snr):
+    """What BLOCK_FLOAT buys at each point run both ways: SNR gained over the
+    unscaled core at its best hand attenuation, and the narrowest DATA_WIDTH
+    that reaches `min_snr` either way."""
+    lines = []
+    pairs = {}
+    for row in rows:
+        pairs.setdefault(tuple(row[k] for k in KEYS[:5]), {})[row["BLOCK_FLOAT"]] = row
+    groups = {}
+    for key, pair in sorted(pairs.items()):
+        if 0 not in pair or 1 not in pair:
+            continue
+        fixed, scaled = pair[0], pair[1]
+        gain = scaled["snr_db"] - fixed["snr_hand_db"]
+        lines.append(f"N={key[0]} DATA={key[1]}/{key[2]} TWIDDLE={key[3]}/{key[4]}: block float "
+                     f"{scaled['snr_db']:.1f} dB vs {fixed['snr_hand_db']:.1f} dB hand-scaled, {gain:+.1f} dB = "
+                     f"{gain / DB_PER_BIT:+.1f} bits")
+        groups.setdefault((key[0], key[3], key[4]), []).append((fixed, scaled))
+    for (n, tw, tf), group in groups.items():
+        fixed = [f for f, _ in group if f["snr_hand_db"] >= min_snr]
+        scaled = [s for _, s in group if s["snr_db"] >= min_snr]
+        if not fixed or not scaled:
+            continue
+        fixed = min(fixed, key=lambda r: r["DATA_WIDTH"])
+        scaled = min(scaled, key=lambda r: r["DATA_WIDTH"])
+        lines.append(f"N={n} TWIDDLE={tw}/{tf}: SNR >= {min_snr} dB from DATA_WIDTH={scaled['DATA_WIDTH']} with "
+                     f"block float, {fixed['DATA_WIDTH']} hand-scaled: "
+                     f"{fixed['DATA_WIDTH'] - scaled['DATA_WIDTH']} bits and "
+                     f"{fixed['bram36'] - scaled['bram36']:g} BRAM36 saved")
+    return lines
+
+
+def cheapest(rows, min_snr, max_band_err):
+    ok = [r for r in rows if r["snr_db"] >= min_snr and r["band_err_max_pct"] <= max_band_err
+          and r.get("rtl", "PASS") == "PASS"]
+    return min(ok, key=lambda r: (r["dsp"], r["bram36"], r["cycles"]), default=None)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sweep fft_core sizes and fixed-point widths")
+    parser.add_argument("--points", type=int, nargs="+", default=[512], help="FFT sizes (powers of two)")
+    parser.add_argument("--data", type=parse_pair, nargs="+", default=[(24, 8), (20, 8), (16, 8)],
+                        metavar="W/F", help="DATA_WIDTH/DATA_FRAC_BITS pairs")
+    parser.add_argument("--twiddle", type=parse_pair, nargs="+", default=[(5, 3), (8, 6), (10, 8), (12, 10)],
+                        metavar="W/F", help="TWIDDLE_WIDTH/TWIDDLE_FRAC_BITS pairs")
+    parser.add_argument("--block-float", type=int, nargs="+", choices=(0, 1), default=[0],
+                        help="BLOCK_FLOAT values; 0 1 runs every point both ways and reports the difference")
+    parser.add_argument("--wav", help="score on this recording instead of synthetic tones")
+    parser.add_argument("--gain-db", type=float, default=0.0,
+                        help="scale the audio before the FFT; at 0 dB the core sees what top_level feeds it, "
+                             "and loud tones saturate the unscaled stages")
+    parser.add_argument("--frames", type=int, default=32, help="frames of audio per grid point for the model")
+    parser.add_argument("--rtl", action="store_true", help="also simulate every grid point (test_fft_config)")
+    parser.add_argument("--rtl-frames", type=int, default=2, help="frames per RTL simulation")
+    parser.add_argument("--sim", default="icarus", help="simulator for --rtl")
+    parser.add_argument("--jobs", "-j", type=int, default=os.cpu_count(), help="grid points evaluated in parallel")
+    parser.add_argument("--min-snr", type=float, default=40.0, help="SNR the cheapest pick has to reach (dB)")
+    parser.add_argument("--max-band-err", type=float, default=1.0, help="worst band error allowed (%%)")
+    parser.add_argument("--csv", help="write the table as CSV")
+    parser.add_argument("--json", help="write the table as JSON")
+    args = parser.parse_args()
+
+    points = grid(args)
+    start = time.perf_counter()
+    rows = []
+    with ProcessPoolExecutor(max_workers=max(1, args.jobs)) as pool:
+        futures = {pool.submit(evaluate, point, args): point for point in points}
+        for future in as_completed(futures):
+            rows.append(future.result())
+            print(f"[{len(rows)}/{len(points)}] {futures[future]}", file=sys.stderr)
+    rows.sort(key=lambda r: tuple(r[k] for k in KEYS))
+
+    best = cheapest(rows, args.min_snr, args.max_band_err)
+    print(format_table(rows, best))
+    for line in block_float_gain(rows, args.min_snr):
+        print(line)
+    if best:
+        print(f"cheapest with SNR >= {args.min_snr} dB and band error <= {args.max_band_err}%: "
+              + ", ".join(f"{k}={best[k]}" for k in KEYS))
+    else:
+        print(f"nothing reaches SNR >= {args.min_snr} dB with band error <= {args.max_band_err}%")
+    print(f"{len(rows)} configurations in {time.perf_counter() - start:.1f}s")
+
+    if args.csv:
+        with open(args.csv, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=list(dict.fromkeys(k for r in rows for k in r)))
+            writer.writeheader()
+            writer.writerows(rows)
+    if args.json:
+        Path(args.json).write_text(json.dumps(rows, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+"""Which test modules a set of changed files can affect, for runner.py --changed.
+
+A test module depends on:
+  - its own .py and the local Python modules it imports (sim/, sim/model/,
+    sim/tests/), transitively;
+  - the files in its SOURCES, plus every hdl/ or sim/primitives/ file they
+    pull in through `include or by instantiating a module defined there;
+  - the data/*.mem files that HDL loads through `FPATH(x) or "../data/x".
+
+SOURCES is read statically through static_config.py. When that can't
+evaluate it, each entry's last string component (the "fft_core.sv" in
+`proj_path / "hdl" / "fft_core.sv"`) is looked up among the HDL files, and a
+glob over sim/primitives counts as all of them.
+
+Changed files come from git (diff against the commit of the last green run,
+plus the working tree and untracked files) or, outside a git checkout, from
+mtimes newer than that run. The last green run is kept per test set in
+sim_build/last_green.json.
+"""
+import ast
+import json
+import re
+import subprocess
+import time
+from pathlib import Path
+
+from static_config import module_config, NotStatic
+
+sim_dir = Path(__file__).resolve().parent
+project_root = sim_dir.parent
+hdl_dir = project_root / "hdl"
+primitives_dir = sim_dir / "primitives"
+data_dir = project_root / "data"
+PYTHON_DIRS = (sim_dir, sim_dir / "tests", sim_dir / "model")
+
+# a change to any of these reruns everything
+RUNNER_FILES = (sim_dir / "runner.py", sim_dir / "build_cache.py", Path(__file__).resolve())
+
+STATE_FILE = project_root / "sim_build" / "last_green.json"
+
+MODULE_RE = re.compile(r"^\s*module\s+(\w+)", re.M)
+INCLUDE_RE = re.compile(r'`include\s+"([^"]+)"')
+# name [#(...)] instance ( -- good enough for the instantiation style in hdl/
+INSTANCE_RE = re.compile(r"^\s*(\w+)\s*(?:#\s*\(|\w+\s*\()", re.M)
+DATA_RE = re.compile(r"`FPATH\((\w+\.\w+)\)|\"(?:\.\./data/)?(\w+\.mem)\"")
+
+
+def strip_comments(text):
+    return re.sub(r"//[^\n]*|/\*.*?\*/", "", text, flags=re.S)
+
+
+def hdl_files():
+    return sorted(hdl_dir.glob("*.sv")) + sorted(hdl_dir.glob("*.v")) + sorted(primitives_dir.glob("*.v"))
+
+
+class HdlGraph:
+    """Module definitions and per-file dependencies of everything under hdl/ and sim/primitives/."""
+
+    def __init__(self, files=None):
+        self.files = list(files or hdl_files())
+        self.texts = {f: strip_comments(f.read_text(errors="replace")) for f in self.files}
+        self.defined_in = {}
+        for f, text in self.texts.items():
+            for name in MODULE_RE.findall(text):
+                self.defined_in.setdefault(name, f)
+        self.by_name = {f.name: f for f in self.files}
+
+    def direct_deps(self, path):
+        text = self.texts.get(path)
+        if text is None:
+            return set()
+        deps = set()
+        for name in INCLUDE_RE.findall(text):
+            if Path(name).name in self.by_name:
+                deps.add(self.by_name[Path(name).name])
+        for name in INSTANCE_RE.findall(text):
+            if name in self.defined_in and self.defined_in[name] != path:
+                deps.add(self.defined_in[name])
+        for fpath, quoted in DATA_RE.findall(text):
+            deps.add(data_dir / (fpath or quoted))
+        return deps
+
+    def closure(self, roots):
+        seen, todo = set(), list(roots)
+        while todo:
+            path = todo.pop()
+            if path in seen:
+                continue
+            seen.add(path)
+            todo.extend(self.direct_deps(path) - seen)
+        return seen
+
+
+def python_imports(path):
+    """Local modules `path` imports, as files, transitively."""
+    seen, todo = set(), [Path(path)]
+    while todo:
+        current = todo.pop()
+        if current in seen or not current.is_file():
+            continue
+        seen.add(current)
+        try:
+            tree = ast.parse(current.read_text())
+        except SyntaxError:
+            continue
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                names = [alias.name for alias in node.names]
+            elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+                names = [node.module]
+            else:
+                continue
+            for name in names:
+                for base in PYTHON_DIRS:
+                    candidate = base / (name.split(".")[0] + ".py")
+                    if candidate.is_file():
+                        todo.append(candidate)
+                        break
+    return seen
+
+
+def source_names(test_file):
+    """File names the module's SOURCES list mentions; '*' for a glob over sim/primitives."""
+    tree = ast.parse(Path(test_file).read_text())
+    assigns = {t.id: node.value for node in tree.body if isinstance(node, ast.Assign)
+               for t in node.targets if isinstance(t, ast.Name)}
+    if "SOURCES" not in assigns:
+        return set()
+
+    names, todo, visited = set(), [assigns["SOURCES"]], set()
+    while todo:
+        node = todo.pop()
+        if isinstance(node, ast.BinOp) and isinstance(node.op, ast.Div):
+            if isinstance(node.right, ast.Constant) and isinstance(node.right.value, str):
+                names.add(Path(node.right.value).name)
+        elif isinstance(node, ast.Name) and node.id in assigns and node.id not in visited:
+            visited.add(node.id)
+            todo.append(assigns[node.id])
+        elif isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute) and node.func.attr == "glob":
+            names.add("*")
+        else:
+            todo.extend(ast.iter_child_nodes(node))
+    return names
+
+
+def test_dependencies(test_file, graph):
+    test_file = Path(test_file)
+    try:
+        roots = {Path(f).resolve() for f in module_config(test_file, names=("SOURCES",)).get("SOURCES", [])}
+        return graph.closure(roots) | python_imports(test_file)
+    except NotStatic:
+        pass
+    roots = set()
+    for name in source_names(test_file):
+        if name == "*":
+            roots.update(f for f in graph.files if f.parent == primitives_dir)
+        elif name in graph.by_name:
+            roots.add(graph.by_name[name])
+    return graph.closure(roots) | python_imports(test_file)
+
+
+def dependency_map(test_files):
+    graph = HdlGraph()
+    return {Path(f).stem: test_dependencies(f, graph) for f in test_files}
+
+
+def git(*args):
+    return subprocess.run(["git", *args], cwd=project_root, capture_output=True, text=True, check=True).stdout
+
+
+def git_head():
+    try:
+        return git("rev-parse", "HEAD").strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def changed_since(green):
+    """Changed files (absolute paths) since a last_green entry; None means "don't know", run everything."""
+    if green is None:
+        return None
+    if green.get("commit") and git_head():
+        try:
+            names = git("diff", "--name-only", "--relative", green["commit"]).split()
+            names += git("ls-files", "--others", "--exclude-standard").split()
+            return {(project_root / name).resolve() for name in names}
+        except subprocess.CalledProcessError:
+            pass  # commit no longer exists, fall back to mtimes
+    since = green["time"]
+    roots = (hdl_dir, data_dir, sim_dir)
+    return {f.resolve() for root in roots for f in root.rglob("*")
+            if f.is_file() and "__pycache__" not in f.parts and f.stat().st_mtime > since}
+
+
+def affected(tests, changed, deps):
+    """The subset of `tests` whose dependencies intersect `changed` (all of them when changed is None)."""
+    if changed is None or any(f.resolve() in changed for f in RUNNER_FILES):
+        return list(tests)
+    return [t for t in tests if deps[t] & changed]
+
+
+def load_green(kind):
+    if not STATE_FILE.is_file():
+        return None
+    return json.loads(STATE_FILE.read_text()).get(kind)
+
+
+def save_green(kind):
+    state = json.loads(STATE_FILE.read_text()) if STATE_FILE.is_file() else {}
+    state[kind] = {"commit": git_head(), "time": time.time()}
+    STATE_FILE.parent.mkdir(parents=True, exist_ok=True)
+    STATE_FILE.write_text(json.dumps(state, indent=2) + "\n")
@@ -0,0 +1,209 @@
+"""Vectorized I2S stimulus and capture for the i2s_receiver testbenches.
+
+The whole ws/data bit stream for a block of stereo samples is built in one
+NumPy pass, along with the time of every sck edge, so the driver loop only
+has to sleep to each edge and write three pins:
+
+    driver = I2SDriver(dut, sck_ratio=8, jitter_ns=0.5)
+    capture = I2SCapture(dut)
+    await driver.play(wav_samples("song.wav", seconds=0.05))
+    received = capture.samples()        # (frames, 2): left, right
+
+Framing is Philips I2S as the CS5343 sends it: ws low for the left slot and
+high for the right, ws changing one sck before the MSB, 24 data bits MSB
+first, zero padding to the end of the slot. i2s_receiver samples data_in on
+sck falling edges, so bits (and ws) are launched on rising edges.
+
+The receiver only starts a word on a ws edge, so the stream opens with one
+silent right slot and closes with a ws edge to flush the last right word;
+the first LEAD_IN_WORDS words out of the receiver are the lead-in.
+
+I2SBusDriver does the same for pins packed into one bus, like top_level's
+pmoda1.
+"""
+import numpy as np
+from cocotb.triggers import Timer
+from cocotb.utils import get_sim_time
+
+from monitors import StreamMonitor
+
+# sck periods per channel: 64 per stereo frame, as the CS5343 runs
+SLOT_BITS = 32
+
+# width of the words the ADC sends
+SAMPLE_WIDTH = 24
+
+# clk cycles per sck period: 32 on the board (98.304 MHz / 3.072 MHz), less
+# in simulation to keep runs short. The receiver needs >= 4 to see both levels.
+SCK_RATIO = 8
+MIN_SCK_RATIO = 4
+
+# words the receiver puts out for the lead-in slot before the first sample
+LEAD_IN_WORDS = 2
+
+# trailing bits after the last slot: the ws edge, then the delay bit
+LEAD_OUT_BITS = 2
+
+
+def i2s_bits(samples, slot_bits=SLOT_BITS, sample_width=SAMPLE_WIDTH):
+    """(frames, 2) samples -> (ws, data) uint8 arrays with one entry per sck period.
+
+    Mono (frames,) input is sent on both channels.
+    """
+    samples = np.asarray(samples, dtype=np.int64)
+    if samples.ndim == 1:
+        samples = np.stack((samples, samples), axis=1)
+    if slot_bits < sample_width + 1:
+        raise ValueError(f"slot_bits must be at least {sample_width + 1}, got {slot_bits}")
+
+    words = samples & ((1 << sample_width) - 1)
+    shifts = np.arange(sample_width - 1, -1, -1)
+    # [frame, channel, bit in slot]; bit 0 is the delay bit after the ws edge
+    data = np.zeros((len(samples), 2, slot_bits), dtype=np.uint8)
+    data[:, :, 1:sample_width + 1] = (words[:, :, None] >> shifts) & 1
+    ws = np.zeros_like(data)
+    ws[:, 1, :] = 1
+
+    ws = np.concatenate((np.ones(slot_bits, np.uint8), ws.ravel(), np.zeros(LEAD_OUT_BITS, np.uint8)))
+    data = np.concatenate((np.zeros(slot_bits, np.uint8), data.ravel(), np.zeros(LEAD_OUT_BITS, np.uint8)))
+    return ws, data
+
+
+def edge_times(bits, period_ps, clk_period_ps, jitter_ps=0.0, rng=None, start_ps=0):
+    """Rising and falling sck edge times (ps) for `bits` periods.
+
+    Jitter is gaussian with RMS `jitter_ps` per edge, clipped so every high
+    and low phase stays at least one clk period long.
+    """
+    rise = start_ps + np.arange(bits) * period_ps
+    fall = rise + period_ps / 2
+    if jitter_ps:
+        rng = rng if rng is not None else np.random.default_rng()
+        limit = (period_ps / 2 - clk_period_ps) / 2
+        rise = rise + np.clip(rng.normal(0.0, jitter_ps, bits), -limit, limit)
+        fall = fall + np.clip(rng.normal(0.0, jitter_ps, bits), -limit, limit)
+    return np.round(rise).astype(np.int64), np.round(fall).astype(np.int64)
+
+
+def wav_samples(path, seconds=None, start=0.0):
+    """Stereo 24-bit samples from a WAV file, `seconds` long from `start` (s)."""
+    from wav_stream import WavStream
+
+    wav = WavStream(path)
+    first = int(start * wav.sample_rate)
+    count = None if seconds is None else int(seconds * wav.sample_rate)
+    samples = wav.read(first, count)
+    if samples.shape[1] == 1:
+        return np.repeat(samples, 2, axis=1)
+    return samples[:, :2]
+
+
+class I2SDriver:
+    """Plays sample arrays into a DUT's sck/ws/data_in pins.
+
+    `sck_ratio` is clk cycles per sck period and needn't be a whole number;
+    the first edge is offset from the clk edges by a quarter clk period so
+    the two clocks don't start out aligned.
+    """
+
+    def __init__(self, dut, clk_period_ns=10, sck_ratio=SCK_RATIO, jitter_ns=0.0,
+                 slot_bits=SLOT_BITS, rng=None):
+        if sck_ratio < MIN_SCK_RATIO:
+            raise ValueError(f"sck_ratio must be at least {MIN_SCK_RATIO}, got {sck_ratio}")
+        self.dut = dut
+        self.clk_period_ps = int(clk_period_ns * 1000)
+        self.period_ps = sck_ratio * self.clk_period_ps
+        self.jitter_ps = jitter_ns * 1000
+        self.slot_bits = slot_bits
+        self.rng = rng
+
+    def idle(self):
+        self.dut.sck.value = 0
+        self.dut.ws.value = 0
+        self.dut.data_in.value = 0
+
+    def _schedule(self, samples):
+        # (low, high) sleeps in ps around each rising edge, plus the bits it launches
+        ws, data = i2s_bits(samples, self.slot_bits)
+        start = get_sim_time("ps") + self.period_ps / 2 + self.clk_period_ps // 4
+        rise, fall = edge_times(len(ws), self.period_ps, self.clk_period_ps,
+                                self.jitter_ps, self.rng, start)
+        lows = rise - np.concatenate(([get_sim_time("ps")], fall[:-1]))
+        highs = fall - rise
+        return lows, highs, ws, data
+
+    async def play(self, samples):
+        """Send (frames, 2) samples, returning once the last edge is out."""
+        lows, highs, ws, data = self._schedule(samples)
+        sck, ws_pin, data_pin = self.dut.sck, self.dut.ws, self.dut.data_in
+        for low, high, ws_bit, data_bit in zip(lows.tolist(), highs.tolist(), ws.tolist(), data.tolist()):
+            await Timer(low, units="ps")
+            sck.value = 1
+            ws_pin.value = ws_bit
+            data_pin.value = data_bit
+            await Timer(high, units="ps")
+            sck.value = 0
+
+
+class I2SBusDriver(I2SDriver):
+    """I2SDriver for pins packed into one bus, e.g. top_level's pmoda1[5:7].
+
+    `ws_bit`, `sck_bit` and `data_bit` are bit positions in the bus value;
+    pmoda1[5] (ws) is its MSB, so top_level is (2, 1, 0).
+    """
+
+    def __init__(self, dut, bus, ws_bit, sck_bit, data_bit, **kwargs):
+        super().__init__(dut, **kwargs)
+        self.bus = bus
+        self.bits = (ws_bit, sck_bit, data_bit)
+
+    def idle(self):
+        self.bus.value = 0
+
+    async def play(self, samples):
+        lows, highs, ws, data = self._schedule(samples)
+        ws_bit, sck_bit, data_bit = self.bits
+        # bus values after each falling and rising edge, built in one go
+        low_values = (ws.astype(np.int64) << ws_bit) | (data.astype(np.int64) << data_bit)
+        high_values = low_values | (1 << sck_bit)
+        bus = self.bus
+        for low, high, high_value, low_value in zip(lows.tolist(), highs.tolist(),
+                                                    high_values.tolist(), low_values.tolist()):
+            await Timer(low, units="ps")
+            bus.value = high_value
+            await Timer(high, units="ps")
+            bus.value = low_value
+
+
+class I2SCapture:
+    """Collects every data_valid word from i2s_receiver and sorts it by channel.
+
+    A left word comes out after ws rises and a right word after it falls, so
+    ws at the data_valid pulse says which channel it was.
+    """
+
+    def __init__(self, dut):
+        self.data_width = len(dut.data_out)
+        self.monitor = StreamMonitor(dut.clk, dut.data_valid, (dut.data_out, dut.ws))
+
+    def samples(self, skip=LEAD_IN_WORDS):
+        """(frames, 2) signed samples received so far, after the lead-in words."""
+        items = np.array(self.monitor.items[skip:], dtype=np.int64).reshape(-1, 2)
+        words, ws = items[:, 0], items[:, 1]
+        words = words - ((words >> (self.data_width - 1)) << self.data_width)
+        left, right = words[ws == 1], words[ws == 0]
+        frames = min(len(left), len(right))
+        return np.stack((left[:frames], right[:frames]), axis=1)
+
+    def expected(self, samples, sample_width=SAMPLE_WIDTH):
+        """What the receiver should deliver for `samples`: the first data_width bits of each slot."""
+        samples = np.asarray(samples, dtype=np.int64)
+        if samples.ndim == 1:
+            samples = np.stack((samples, samples), axis=1)
+        if self.data_width >= sample_width:
+            # the padding after the LSB shifts in as zeros
+            return samples << (self.data_width - sample_width)
+        return samples >> (sample_width - self.data_width)
+
+    def stop(self):
+        self.monitor.stop()
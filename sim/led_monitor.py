@@ -0,0 +1,213 @@
+"""WS2812 decoder for led_control's data_out / top_level's led_wire.
+
+Only the edges of the wire are timestamped while the simulation runs (one
+callback per edge, nothing per clock). Decoding happens afterwards in NumPy:
+each high pulse is one symbol, a 1 if it is closer to ONE_CYCLES_HIGH than
+ZERO_CYCLES_HIGH, and a low stretch of at least GAP_MIN_CYCLES is the WAIT
+reset code that ends a frame. Frames are cut into 24-bit GRB words:
+
+    mon = LedWireMonitor(dut.led_wire, clk_period_ns, tag=dut.choose_pic)
+    await mon.wait_frames(2)
+    for frame in mon.frames():
+        errors = compare_frame(frame.words, face_words(frame.tag))
+
+face_words() builds the expected words from data/image.mem + palette.mem
+the way led_choice reads them, and to_image() undoes img_to_mem.py's
+serpentine layout to get the 32x32 picture back.
+"""
+from collections import namedtuple
+from pathlib import Path
+
+import cocotb
+import numpy as np
+from cocotb.triggers import Edge, Event
+from cocotb.utils import get_sim_time
+
+DATA_DIR = Path(__file__).resolve().parent.parent / "data"
+
+# led_control timing, in clk cycles
+ZERO_CYCLES_HIGH = 49
+ZERO_CYCLES_LOW = 74
+ONE_CYCLES_HIGH = 86
+ONE_CYCLES_LOW = 37
+WAIT_CYCLES = 5000
+
+# symbols may run a couple of cycles long around word boundaries
+# (RECEIVE_SAMPLE holds the line high, the bits_sent check holds it low)
+SYMBOL_TOLERANCE = 3
+HIGH_THRESHOLD = (ZERO_CYCLES_HIGH + ONE_CYCLES_HIGH) / 2
+# any low this long is a reset gap rather than a stretched symbol
+GAP_MIN_CYCLES = 1000
+
+BITS_PER_LED = 24
+TOTAL_LEDS = 1024
+WIDTH = HEIGHT = 32
+
+# start/end in ns; words in wire order; malformed counts symbols off the
+# ZERO/ONE timing; gap is the reset low before the frame, in cycles
+# (None for the first); tag is the tag signal's value at the first edge
+LedFrame = namedtuple("LedFrame", "start end words malformed gap tag")
+
+
+def read_mem(path):
+    """A $readmemh file as an int64 array."""
+    return np.array([int(line, 16) for line in Path(path).read_text().split()], dtype=np.int64)
+
+
+def rgb_to_grb(rgb):
+    rgb = np.asarray(rgb, dtype=np.int64)
+    return (((rgb >> 8) & 0xFF) << 16) | (((rgb >> 16) & 0xFF) << 8) | (rgb & 0xFF)
+
+
+def face_words(face, image_mem=DATA_DIR / "image.mem", palette_mem=DATA_DIR / "palette.mem",
+               total_leds=TOTAL_LEDS):
+    """GRB words led_choice sends for `face`, in wire order."""
+    image = read_mem(image_mem)
+    palette = np.zeros(256, dtype=np.int64)
+    entries = read_mem(palette_mem)
+    # palette RAM entries past the end of the file stay zero
+    palette[:len(entries)] = entries
+    return rgb_to_grb(palette[image[face * total_leds:(face + 1) * total_leds]])
+
+
+def to_image(words):
+    """Wire-order GRB words -> (32, 32, 3) RGB, undoing img_to_mem.py's serpentine layout."""
+    rows = np.asarray(words, dtype=np.int64)[::-1].reshape(HEIGHT, WIDTH).copy()
+    rows[1::2] = rows[1::2, ::-1]
+    rgb = np.stack(((rows >> 8) & 0xFF, (rows >> 16) & 0xFF, rows & 0xFF), axis=-1)
+    return rgb.astype(np.uint8)
+
+
+def compare_frame(words, expected):
+    """(row, col, expected, got) for every LED that differs, in image coordinates."""
+    words = np.asarray(words, dtype=np.int64)
+    expected = np.asarray(expected, dtype=np.int64)
+    if len(words) != len(expected):
+        raise AssertionError(f"Frame has {len(words)} LEDs, expected {len(expected)}")
+    bad = np.flatnonzero(words != expected)
+    # wire index -> image position (inverse of to_image)
+    flipped = len(words) - 1 - bad
+    row, col = flipped // WIDTH, flipped % WIDTH
+    col = np.where(row % 2 == 1, WIDTH - 1 - col, col)
+    return [(int(r), int(c), int(expected[i]), int(words[i])) for r, c, i in zip(row, col, bad)]
+
+
+def decode_symbols(rises, falls, clk_period_ps, now_ps=None):
+    """Rising/falling edge times (ps, alternating, starting with a rise) -> per-symbol arrays.
+
+    Returns (bits, malformed, gap_after) where gap_after[i] means symbol i
+    is the last one before a reset gap. The last symbol's low time runs to
+    `now_ps`; without it the last symbol is taken as still open.
+    """
+    rises = np.asarray(rises, dtype=np.int64)
+    falls = np.asarray(falls, dtype=np.int64)
+    n = len(falls)
+    high = (falls - rises[:n]) / clk_period_ps
+    low = np.empty(n)
+    low[:len(rises) - 1] = (rises[1:n + 1] - falls[:len(rises) - 1]) / clk_period_ps
+    if len(rises) == n:
+        low[-1:] = (now_ps - falls[-1]) / clk_period_ps if now_ps is not None else 0.0
+
+    bits = (high > HIGH_THRESHOLD).astype(np.uint8)
+    gap_after = low >= GAP_MIN_CYCLES
+    want_high = np.where(bits == 1, ONE_CYCLES_HIGH, ZERO_CYCLES_HIGH)
+    want_low = np.where(bits == 1, ONE_CYCLES_LOW, ZERO_CYCLES_LOW)
+    malformed = np.abs(high - want_high) > SYMBOL_TOLERANCE
+    # the low before a gap (or still running) has nothing to check against
+    timed_low = ~gap_after & (low > 0)
+    malformed |= timed_low & (np.abs(low - want_low) > SYMBOL_TOLERANCE)
+    return bits, malformed, gap_after
+
+
+class LedWireMonitor:
+    """Timestamps every edge of a WS2812 line and decodes it into frames on demand.
+
+    `tag` is an optional signal (e.g. top_level's choose_pic) sampled at the
+    first edge of each frame.
+    """
+
+    def __init__(self, signal, clk_period_ns=10, total_leds=TOTAL_LEDS, tag=None):
+        self.signal = signal
+        self.clk_period_ps = int(round(clk_period_ns * 1000))
+        self.frame_bits = total_leds * BITS_PER_LED
+        self.tag = tag
+        self.rises = []
+        self.falls = []
+        self.tags = []
+        self.completed = 0
+        self._level = 0
+        self._last_fall = None
+        self._bits = 0
+        self._wanted = None
+        self._event = Event()
+        self._task = cocotb.start_soon(self._run())
+
+    async def _run(self):
+        gap_ps = GAP_MIN_CYCLES * self.clk_period_ps
+        while True:
+            await Edge(self.signal)
+            value = self.signal.value
+            if not value.is_resolvable or int(value) == self._level:
+                continue
+            self._level = int(value)
+            now = get_sim_time("ps")
+            if self._level:
+                if self._last_fall is None or now - self._last_fall >= gap_ps:
+                    self._bits = 0
+                    self.tags.append(int(self.tag.value) if self.tag is not None else None)
+                self.rises.append(now)
+            else:
+                self.falls.append(now)
+                self._last_fall = now
+                self._bits += 1
+                if self._bits == self.frame_bits:
+                    self.completed += 1
+                    if self._wanted is not None and self.completed >= self._wanted:
+                        self._event.set()
+
+    async def wait_frames(self, count):
+        """Wait until `count` frames' worth of bits have gone out in total."""
+        if self.completed >= count:
+            return
+        self._wanted = count
+        self._event.clear()
+        await self._event.wait()
+        self._wanted = None
+
+    def frames(self, partial=False):
+        """Decoded frames so far; the one still being sent only if `partial`."""
+        n = len(self.falls)
+        if n == 0:
+            return []
+        now = get_sim_time("ps")
+        bits, malformed, gap_after = decode_symbols(self.rises[:n + 1], self.falls, self.clk_period_ps, now)
+        rises = np.asarray(self.rises[:n], dtype=np.int64)
+        falls = np.asarray(self.falls, dtype=np.int64)
+
+        ends = np.flatnonzero(gap_after) + 1
+        starts = np.concatenate(([0], ends))
+        if not partial or (len(ends) and ends[-1] == n):
+            starts = starts[:len(ends)]
+        stops = np.concatenate((ends, [n]))[:len(starts)]
+
+        frames = []
+        for i, (a, b) in enumerate(zip(starts.tolist(), stops.tolist())):
+            whole = (b - a) // BITS_PER_LED * BITS_PER_LED
+            words = np.packbits(bits[a:a + whole].reshape(-1, BITS_PER_LED), axis=1, bitorder="big")
+            words = (words.astype(np.int64) @ np.array([1 << 16, 1 << 8, 1])).astype(np.int64)
+            gap = None if a == 0 else (rises[a] - falls[a - 1]) / self.clk_period_ps
+            tag = self.tags[i] if i < len(self.tags) else None
+            frames.append(LedFrame(rises[a] / 1000, falls[b - 1] / 1000, words,
+                                   int(malformed[a:b].sum()), gap, tag))
+        return frames
+
+    def refresh_rate(self):
+        """Frames per second from the spacing of frame starts (None with fewer than two)."""
+        starts = [frame.start for frame in self.frames()]
+        if len(starts) < 2:
+            return None
+        return 1e9 / np.mean(np.diff(starts))
+
+    def stop(self):
+        self._task.kill()
+
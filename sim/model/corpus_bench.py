@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""Per-song statistics of the offline analysis chain over a directory of WAVs.
+
+Every song goes through pipeline_model.py (bit-exact fft_core + smoothers,
+face_selector at the timing level) in its own worker process, and reports:
+
+    bands       mean / median / p99 / max of low/mid/high_magnitude per frame
+                (bins 0-5, 6-40, 41-100), and their dynamic range p99/p1 in dB
+    acc         frames where low/mid/high_acc wrapped past 32 bits, and the
+                widest unwrapped sum seen (bits)
+    fft         fraction of butterfly outputs pinned at the DATA_WIDTH rails
+    faces       face_selector occupancy, changes/s and the transition counts
+
+Results are cached in sim_build/corpus_cache keyed by the WAV's content hash
+and the settings (thresholds, band map contents, magnitude mode, hop), so a re-run after retuning only recomputes songs (or
+settings) that changed.
+
+    python sim/model/corpus_bench.py songs/ -j 8 --thresholds 40 60 30 -o corpus.json
+"""
+import argparse
+import csv
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+import numpy as np
+
+sys.path.append(str(Path(__file__).resolve().parent))
+from fft_model import ACC_WIDTH, BAND_MAP, MAG_SUM, FFTCoreModel, magnitude_approx, read_band_map
+from pipeline_model import FACE_NAMES, PipelineModel
+from threshold_tuner import find_wavs
+
+proj_path = Path(__file__).resolve().parents[2]
+CACHE_DIR = proj_path / "sim_build" / "corpus_cache"
+# bump when the statistics change for the same song and settings
+STATS_VERSION = 1
+
+BAND_NAMES = ("low", "mid", "high")
+
+
+class RecordingFFT(FFTCoreModel):
+    """FFTCoreModel that also keeps the unwrapped band sums and rail hits of every frame it runs."""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.raw_sums = []
+        self.saturated = 0
+        self.outputs = 0
+
+    def band_magnitudes(self, out_re, out_im, exponent=0):
+        rail = 1 << (self.data_width - 1)
+        for out in (out_re, out_im):
+            self.saturated += int(np.count_nonzero((out == rail - 1) | (out == -rail)))
+            self.outputs += out.size
+        mag = magnitude_approx(np.atleast_2d(out_re), np.atleast_2d(out_im), self.mag_mode)
+        self.raw_sums.append(np.stack([mag[:, start:end + 1].sum(axis=1) for start, end in self.bands], axis=1))
+        return super().band_magnitudes(out_re, out_im, exponent)
+
+
+def file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def cache_key(digest, thresholds, band_map_digest, mag_mode, hop):
+    settings = (f"v{STATS_VERSION} thresholds={list(thresholds)} band_map={band_map_digest} "
+                f"mag_mode={mag_mode} hop={hop}")
+    return hashlib.sha256(f"{digest} {settings}".encode()).hexdigest()[:24]
+
+
+def band_stats(values):
+    values = np.asarray(values, dtype=np.float64)
+    if len(values) == 0:
+        return {"mean": 0.0, "median": 0.0, "p99": 0.0, "max": 0, "dynamic_range_db": 0.0}
+    p1, p99 = np.percentile(values, [1, 99])
+    return {
+        "mean": float(values.mean()),
+        "median": float(np.median(values)),
+        "p99": float(p99),
+        "max": int(values.max()),
+        # p1 of silence is 0; floor it at one LSB of the accumulator
+        "dynamic_range_db": float(20 * np.log10(max(p99, 1.0) / max(p1, 1.0))),
+    }
+
+
+def analyze_song(path, thresholds, band_map=BAND_MAP, mag_mode=MAG_SUM, hop=None):
+    """Run one song through the model; returns its statistics as a JSON-able dict."""
+    start = time.perf_counter()
+    fft = RecordingFFT(band_map=read_band_map(band_map), mag_mode=mag_mode)
+    timeline = PipelineModel(thresholds, fft=fft, hop=hop).run_wav(path)
+    raw = np.concatenate(fft.raw_sums) if fft.raw_sums else np.zeros((0, len(BAND_NAMES)), dtype=np.int64)
+    duration = float(timeline["time"][-1]) if len(timeline) else 0.0
+
+    faces = timeline["face_state"]
+    transitions = np.zeros((8, 8), dtype=np.int64)
+    np.add.at(transitions, (faces[:-1], faces[1:]), 1)
+    np.fill_diagonal(transitions, 0)
+    changes = int(transitions.sum())
+
+    return {
+        "frames": len(timeline),
+        "duration_s": duration,
+        "bands": {name: band_stats(timeline[name]) for name in BAND_NAMES},
+        "acc": {name: {"overflow_frames": int(np.count_nonzero(raw[:, i] >> ACC_WIDTH)),
+                       "peak_bits": int(raw[:, i].max()).bit_length() if len(raw) else 0}
+                for i, name in enumerate(BAND_NAMES)},
+        "fft_saturated_pct": 100 * fft.saturated / max(fft.outputs, 1),
+        "faces": {
+            "occupancy": {FACE_NAMES[s]: float(c / max(len(faces), 1))
+                          for s, c in enumerate(np.bincount(faces, minlength=8))},
+            "changes": changes,
+            "changes_per_s": changes / duration if duration else 0.0,
+            # transitions[from][to], face_state encoding order
+            "transitions": transitions.tolist(),
+        },
+        "seconds": time.perf_counter() - start,
+    }
+
+
+def run_song(path, thresholds, band_map=BAND_MAP, mag_mode=MAG_SUM, hop=None, use_cache=True):
+    """analyze_song through the cache: returns (stats, cached)."""
+    key = cache_key(file_hash(path), thresholds, file_hash(band_map), mag_mode, hop)
+    cached = CACHE_DIR / f"{key}.json"
+    if use_cache and cached.is_file():
+        return json.loads(cached.read_text()), True
+    stats = analyze_song(path, thresholds, band_map, mag_mode, hop)
+    if use_cache:
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        tmp = cached.with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_text(json.dumps(stats))
+        tmp.replace(cached)
+    return stats, False
+
+
+def summary_rows(results):
+    rows = []
+    for path, stats in results.items():
+        row = {"song": Path(path).name, "frames": stats["frames"], "seconds": stats["duration_s"]}
+        for name in BAND_NAMES:
+            row[f"{name}_mean"] = stats["bands"][name]["mean"]
+            row[f"{name}_dr_db"] = stats["bands"][name]["dynamic_range_db"]
+            row[f"{name}_acc_overflows"] = stats["acc"][name]["overflow_frames"]
+            row[f"{name}_acc_bits"] = stats["acc"][name]["peak_bits"]
+        row["fft_saturated_pct"] = stats["fft_saturated_pct"]
+        row["changes_per_s"] = stats["faces"]["changes_per_s"]
+        occupancy = stats["faces"]["occupancy"]
+        row["top_face"] = max(occupancy, key=occupancy.get)
+        rows.append(row)
+    return rows
+
+
+def format_table(rows):
+    lines = [f"{'song':<28}{'frames':>7}  {'dyn range dB (l/m/h)':>20}  {'acc bits':>10}  {'ovf':>5}"
+             f"  {'sat %':>6}  {'chg/s':>6}  top face"]
+    for r in rows:
+        dr = "/".join(f"{r[f'{b}_dr_db']:.0f}" for b in BAND_NAMES)
+        bits = "/".join(str(r[f"{b}_acc_bits"]) for b in BAND_NAMES)
+        overflows = sum(r[f"{b}_acc_overflows"] for b in BAND_NAMES)
+        lines.append(f"{r['song'][:27]:<28}{r['frames']:>7}  {dr:>20}  {bits:>10}  {overflows:>5}"
+                     f"  {r['fft_saturated_pct']:>6.2f}  {r['changes_per_s']:>6.2f}  {r['top_face']}")
+    return "\n".join(lines)
+
+
+def corpus_totals(results):
+    """Frame-weighted face occupancy and overall rates across every song."""
+    frames = sum(s["frames"] for s in results.values())
+    duration = sum(s["duration_s"] for s in results.values())
+    occupancy = {name: sum(s["faces"]["occupancy"][name] * s["frames"] for s in results.values()) / max(frames, 1)
+                 for name in FACE_NAMES.values()}
+    return {
+        "songs": len(results),
+        "frames": frames,
+        "duration_s": duration,
+        "acc_overflow_frames": {b: sum(s["acc"][b]["overflow_frames"] for s in results.values()) for b in BAND_NAMES},
+        "changes_per_s": sum(s["faces"]["changes"] for s in results.values()) / duration if duration else 0.0,
+        "occupancy": occupancy,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Band, accumulator and face statistics over a WAV corpus")
+    parser.add_argument("songs", nargs="+", help="WAV files or directories of them")
+    parser.add_argument("--thresholds", type=int, nargs=3, default=[0, 0, 0], metavar=("LOW", "MID", "HIGH"),
+                        help="threshold_control values (default: 0 0 0, the reset state)")
+    parser.add_argument("--band-map", default=str(BAND_MAP),
+                        help="fft_core BAND_MAP table with low/mid/high as bands 1-3 (default: data/band_map.mem)")
+    parser.add_argument("--mag-mode", type=int, choices=(0, 1), default=MAG_SUM,
+                        help="fft_core MAG_MODE: 0 = |re| + |im|, 1 = alpha-max-beta-min blend")
+    parser.add_argument("--hop", type=int, help="frame_buffer HOP in samples (default: POINTS, no overlap)")
+    parser.add_argument("--jobs", "-j", type=int, default=os.cpu_count(), help="Worker processes")
+    parser.add_argument("--no-cache", action="store_true", help="Recompute every song")
+    parser.add_argument("--output", "-o", help="Write per-song and corpus statistics as JSON")
+    parser.add_argument("--csv", help="Write the per-song summary table as CSV")
+    args = parser.parse_args()
+
+    wavs = find_wavs(args.songs)
+    if not wavs:
+        parser.error("no WAV files found")
+
+    start = time.perf_counter()
+    results, hits = {}, 0
+    with ProcessPoolExecutor(max_workers=args.jobs) as pool:
+        futures = {pool.submit(run_song, wav, args.thresholds, args.band_map, args.mag_mode, args.hop,
+                               not args.no_cache): wav for wav in wavs}
+        for future in as_completed(futures):
+            stats, cached = future.result()
+            results[str(futures[future])] = stats
+            hits += cached
+    results = {str(wav): results[str(wav)] for wav in wavs}
+    elapsed = time.perf_counter() - start
+
+    rows = summary_rows(results)
+    totals = corpus_totals(results)
+    print(format_table(rows))
+    print(f"\n{totals['songs']} songs, {totals['duration_s']:.1f}s of audio, "
+          f"{totals['changes_per_s']:.2f} face changes/s overall")
+    for name, share in totals["occupancy"].items():
+        print(f"  {name:<14}{100 * share:6.1f}%")
+    print(f"{len(wavs) - hits} analyzed, {hits} from cache, in {elapsed:.2f}s")
+
+    if args.output:
+        Path(args.output).write_text(json.dumps({"thresholds": args.thresholds, "band_map": args.band_map,
+                                                 "mag_mode": args.mag_mode, "hop": args.hop, "corpus": totals,
+                                                 "songs": results}, indent=2) + "\n")
+        print(f"wrote {args.output}")
+    if args.csv:
+        with open(args.csv, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+            writer.writeheader()
+            writer.writerows(rows)
+        print(f"wrote {args.csv}")
+
+
+if __name__ == "__main__":
+    main()
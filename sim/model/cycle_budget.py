@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+"""Cycle budget of the 98.304 MHz audio domain, per pipeline stage.
+
+Parameters come straight from the HDL: each module's parameter/localparam
+defaults, overridden by the values top_level instantiates it with.
+frame_buffer raises frame_ready every HOP samples, i.e. every
+HOP * CLOCK_HZ / SAMPLE_RATE cycles (1048576 for the default HOP = POINTS =
+512 at 48 kHz, 10.67 ms); everything the FFT side does per frame has to fit
+in that, or the next frame_ready arrives while fft_core is still busy.
+
+    python sim/model/cycle_budget.py
+    python sim/model/cycle_budget.py --set POINTS=2048 --json budget.json
+    python sim/model/cycle_budget.py --set HOP=128
+
+The cycle counts follow the RTL state machines edge by edge; sim/cycle_probe.py
+measures the same intervals in a top_level simulation and flags any drift.
+"""
+import argparse
+import ast
+import json
+import math
+import re
+from pathlib import Path
+
+proj_path = Path(__file__).resolve().parents[2]
+HDL = proj_path / "hdl"
+TOP_LEVEL = HDL / "top_level.sv"
+
+CLOCK_HZ = 98.304e6
+SAMPLE_RATE = 48000
+
+# top_level modules in the audio domain, by their file
+MODULES = {
+    "frame_buffer": HDL / "frame_buffer.sv",
+    "fft_core": HDL / "fft_core.sv",
+    "magnitude_smoother": HDL / "smoothing.sv",
+    "led_control": HDL / "led_control.sv",
+}
+
+# led_control bit timing is the same for a 0 and a 1
+BITS_PER_LED = 24
+
+PARAM_RE = re.compile(r"\b(?:parameter|localparam)\s+(?:integer\s+|int\s+)?(\w+)\s*=\s*([^,;\n]+)")
+OVERRIDE_RE = re.compile(r"\.(\w+)\s*\(([^()]*(?:\([^()]*\)[^()]*)*)\)")
+
+
+def clog2(value):
+    return max(0, math.ceil(math.log2(value))) if value > 0 else 0
+
+
+def evaluate(expr, names):
+    """Value of a constant Verilog expression (integers, names, + - * / % << >>, $clog2)."""
+    expr = expr.strip().replace("$clog2", "clog2")
+    expr = re.sub(r"\d+'[dD](\d+)", r"\1", expr)
+    tree = ast.parse(expr, mode="eval")
+
+    def walk(node):
+        if isinstance(node, ast.Expression):
+            return walk(node.body)
+        if isinstance(node, ast.Constant) and isinstance(node.value, int):
+            return node.value
+        if isinstance(node, ast.Name) and node.id in names:
+            return names[node.id]
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.USub):
+            return -walk(node.operand)
+        if isinstance(node, ast.BinOp):
+            a, b = walk(node.left), walk(node.right)
+            ops = {ast.Add: a + b, ast.Sub: a - b, ast.Mult: a * b, ast.Mod: a % b if b else 0,
+                   ast.LShift: a << b if b >= 0 else 0, ast.RShift: a >> b if b >= 0 else 0}
+            if isinstance(node.op, (ast.Div, ast.FloorDiv)):
+                return a // b
+            if type(node.op) in ops:
+                return ops[type(node.op)]
+        if isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id == "clog2":
+            return clog2(walk(node.args[0]))
+        raise ValueError(f"can't evaluate {ast.unparse(node)}")
+
+    return walk(tree)
+
+
+def strip_comments(text):
+    return re.sub(r"//[^\n]*|/\*.*?\*/", "", text, flags=re.S)
+
+
+def hdl_params(path, overrides=None):
+    """A module's parameters and localparams, in declaration order, with `overrides` applied.
+
+    Declarations that aren't plain integer expressions (strings, typed
+    parameters, forward references) are left out.
+    """
+    overrides = overrides or {}
+    params = {}
+    for name, expr in PARAM_RE.findall(strip_comments(Path(path).read_text())):
+        # the last parameter of a #( ... ) list runs into its closing parenthesis
+        while expr.count(")") > expr.count("("):
+            expr = expr[:expr.rindex(")")]
+        if name in overrides:
+            params[name] = overrides[name]
+            continue
+        try:
+            params[name] = evaluate(expr, params)
+        except (ValueError, SyntaxError, TypeError):
+            pass
+    return params
+
+
+def hdl_enum(path, type_name):
+    """{name: value} of the `typedef enum ... { ... } type_name;` in `path`, in declaration order."""
+    text = strip_comments(Path(path).read_text())
+    match = re.search(rf"typedef\s+enum\b[^{{]*\{{([^}}]*)\}}\s*{type_name}\s*;", text)
+    if not match:
+        raise ValueError(f"no enum {type_name} in {path}")
+    values, value = {}, 0
+    for item in match.group(1).split(","):
+        name, _, expr = item.partition("=")
+        if expr.strip():
+            value = evaluate(expr, {})
+        values[name.strip()] = value
+        value += 1
+    return values
+
+
+def instance_params(path, module, names):
+    """Parameter overrides of the first `module #(...)` instance in `path`, evaluated against `names`."""
+    text = strip_comments(Path(path).read_text())
+    match = re.search(rf"\b{module}\s*#\s*\(", text)
+    if not match:
+        return {}
+    # the #( ... ) list, up to its closing parenthesis
+    depth, i = 1, match.end()
+    while depth and i < len(text):
+        depth += {"(": 1, ")": -1}.get(text[i], 0)
+        i += 1
+    overrides = {}
+    for name, expr in OVERRIDE_RE.findall(text[match.end():i - 1]):
+        try:
+            overrides[name] = evaluate(expr, names)
+        except (ValueError, SyntaxError, TypeError):
+            pass
+    return overrides
+
+
+def read_params(top=TOP_LEVEL, modules=MODULES, overrides=None):
+    """{module: parameters} as top_level instantiates them; `overrides` ({name: value}) win everywhere."""
+    overrides = overrides or {}
+    top_params = hdl_params(top)
+    params = {"top_level": top_params}
+    for module, path in modules.items():
+        params[module] = hdl_params(path, {**instance_params(top, module, top_params), **overrides})
+    return params
+
+
+def fft_cycles(fft, frame_buffer):
+    """Cycles each fft_core phase takes, start_fft to fft_done.
+
+    start_fft (high the cycle frame_ready rises) moves IDLE to LOAD on the
+    next edge, which raises load_read_en; top_level turns that into a
+    one-cycle read_request, frame_buffer starts reading on the edge after,
+    and its first sample comes out BRAM_LATENCY cycles later. LOAD then takes
+    one cycle per sample. Each stage runs one butterfly per cycle and
+    FINISH_STAGE waits TOTAL_LATENCY + 1 cycles for the pipeline to drain.
+    DONE is one more cycle, on whose edge fft_done goes high. The band
+    accumulation rides along in the last stage and costs nothing extra,
+    except with TWO_REAL, where SPLIT reads SPLIT_BINS bin pairs back and
+    drains BRAM_LATENCY before DONE.
+    """
+    stages = clog2(fft["POINTS"])
+    load_latency = 2 + frame_buffer["BRAM_LATENCY"]
+    return {
+        "load_latency": load_latency,
+        "load": fft["POINTS"],
+        "butterflies": stages * fft["POINTS"] // 2,
+        "flush": stages * (fft["BRAM_LATENCY"] + fft["BUTTERFLY_LATENCY"] + 1),
+        "split": fft["SPLIT_BINS"] + fft["BRAM_LATENCY"] if fft.get("TWO_REAL") else 0,
+        "done": 1,
+    }
+
+
+def busy_cycles(fft, frame_buffer=None):
+    """fft_busy rise to fft_done rise with samples from the first LOAD cycle,
+    the way the fft_core testbenches drive it: every phase but load_latency."""
+    phases = fft_cycles(fft, frame_buffer or hdl_params(MODULES["frame_buffer"]))
+    return sum(cycles for phase, cycles in phases.items() if phase != "load_latency")
+
+
+def led_refresh_cycles(led):
+    # WAIT reset code, then per LED a RECEIVE_SAMPLE cycle (part of the first
+    # bit's high time), 24 bit periods and the bits_sent == 24 check. A face
+    # change can't happen until lit_all_led, which rises on the last pixel_lit.
+    bit = led["ZERO_CYCLES_HIGH"] + led["ZERO_CYCLES_LOW"]
+    return led["WAIT_CYCLES"] + (led["TOTAL_LEDS"] - 1) * (BITS_PER_LED * bit + 1)
+
+
+def budget(params, clock_hz=CLOCK_HZ, sample_rate=SAMPLE_RATE):
+    """Per-frame cycle budget from read_params() output.
+
+    Returns a dict with the frame period, the per-stage rows
+    (name, cycles, note), the totals and the headroom.
+    """
+    fft = params["fft_core"]
+    hop = params["frame_buffer"].get("HOP", fft["POINTS"])
+    cycles_per_sample = clock_hz / sample_rate
+    frame = hop * cycles_per_sample
+    phases = fft_cycles(fft, params["frame_buffer"])
+    # frame_ready -> start_fft: top_level's edge detect is combinational
+    handshake = 0
+    fft_total = sum(phases.values())
+    smoother = 1
+    rows = [
+        ("frame_ready -> start_fft", handshake, "edge detect on frame_buf_ready"),
+        ("start_fft -> first sample", phases["load_latency"],
+         f"IDLE->LOAD, read_request, frame_buffer BRAM_LATENCY {params['frame_buffer']['BRAM_LATENCY']}"),
+        ("LOAD", phases["load"], f"{fft['POINTS']} samples, one per cycle"),
+        ("butterflies", phases["butterflies"], f"{clog2(fft['POINTS'])} stages x {fft['POINTS'] // 2}"),
+        ("pipeline flush", phases["flush"],
+         f"FINISH_STAGE, TOTAL_LATENCY {fft['BRAM_LATENCY'] + fft['BUTTERFLY_LATENCY']} + 1 per stage"),
+        *([("SPLIT", phases["split"], f"TWO_REAL, {fft['SPLIT_BINS']} bin pairs + BRAM_LATENCY")]
+          if phases["split"] else []),
+        ("DONE", phases["done"], "band magnitudes registered, fft_done"),
+        ("magnitude_smoother", smoother, "mag_out registered on fft_done"),
+    ]
+    used = handshake + fft_total + smoother
+    led = params["led_control"]
+    refresh = led_refresh_cycles(led)
+    return {
+        "clock_hz": clock_hz,
+        "sample_rate": sample_rate,
+        "cycles_per_sample": cycles_per_sample,
+        "hop": hop,
+        "frame_cycles": frame,
+        "rows": rows,
+        "start_to_done": fft_total,
+        "ready_to_start": handshake,
+        "used": used,
+        "headroom": frame - used,
+        "led_refresh_cycles": refresh,
+        "frames_per_refresh": refresh / frame,
+    }
+
+
+def format_budget(result):
+    frame = result["frame_cycles"]
+    lines = [f"frame: {frame:.0f} cycles ({frame / result['clock_hz'] * 1e3:.2f} ms, "
+             f"every {result['hop']} samples, {result['cycles_per_sample']:.0f} cycles/sample)",
+             f"{'stage':<28}{'cycles':>10}{'% frame':>9}  note"]
+    for name, cycles, note in result["rows"]:
+        lines.append(f"{name:<28}{cycles:>10}{100 * cycles / frame:>8.2f}%  {note}")
+    lines.append(f"{'start_fft -> fft_done':<28}{result['start_to_done']:>10}"
+                 f"{100 * result['start_to_done'] / frame:>8.2f}%")
+    lines.append(f"{'headroom':<28}{result['headroom']:>10.0f}{100 * result['headroom'] / frame:>8.2f}%  "
+                 f"{frame / result['used']:.0f}x the FFT work would still fit")
+    lines.append(f"LED refresh: {result['led_refresh_cycles']} cycles "
+                 f"({result['led_refresh_cycles'] / result['clock_hz'] * 1e3:.2f} ms), "
+                 f"one face update per {result['frames_per_refresh']:.2f} frames")
+    return "\n".join(lines)
+
+
+def parse_override(text):
+    name, _, value = text.partition("=")
+    try:
+        return name.strip(), int(value, 0)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected NAME=INT, got {text!r}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-frame cycle budget of the audio domain, from the HDL parameters")
+    parser.add_argument("--set", type=parse_override, action="append", default=[], metavar="NAME=INT",
+                        help="override a parameter in every module that has it, e.g. POINTS=1024")
+    parser.add_argument("--clock", type=float, default=CLOCK_HZ, help="audio domain clock in Hz")
+    parser.add_argument("--sample-rate", type=float, default=SAMPLE_RATE, help="audio sample rate in Hz")
+    parser.add_argument("--json", help="also write the budget as JSON")
+    args = parser.parse_args()
+
+    params = read_params(overrides=dict(args.set))
+    result = budget(params, args.clock, args.sample_rate)
+    print(format_budget(result))
+    if args.json:
+        out = {**result, "rows": [dict(zip(("stage", "cycles", "note"), row)) for row in result["rows"]],
+               "params": {m: params[m] for m in MODULES}}
+        Path(args.json).write_text(json.dumps(out, indent=2))
+        print(f"wrote {args.json}")
+
+
+if __name__ == "__main__":
+    main()
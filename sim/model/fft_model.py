@@ -0,0 +1,306 @@
+"""Bit-exact NumPy model of hdl/fft_core.sv (and the butterfly.sv datapath).
+
+Everything works on raw two's complement integers (the values you would put
+on input_data_re / read off read_data_re), batched as (n_frames, POINTS).
+"""
+from pathlib import Path
+
+import numpy as np
+
+proj_path = Path(__file__).resolve().parents[2]
+TWIDDLE_ROM = proj_path / "data" / "twiddle_rom.mem"
+BAND_MAP = proj_path / "data" / "band_map.mem"
+
+POINTS = 512
+DATA_WIDTH = 24
+DATA_FRAC_BITS = 16
+TWIDDLE_WIDTH = 5
+TWIDDLE_FRAC_BITS = 3
+
+# (start, end) bin ranges, inclusive, matching the default data/band_map.mem
+BANDS = ((0, 5), (6, 40), (41, 100))
+ACC_WIDTH = 32
+
+# fft_core MAG_MODE values
+MAG_SUM = 0
+MAG_MAX_BLEND = 1
+
+
+def wrap(val, width):
+    # two's complement wrap of an int64 array to `width` bits
+    half = np.int64(1) << (width - 1)
+    return ((val + half) & ((half << 1) - 1)) - half
+
+
+def saturate(val, width):
+    # same clamp the butterfly output stage does (MAX_VALUE / MIN_VALUE)
+    return np.clip(val, -(1 << (width - 1)), (1 << (width - 1)) - 1)
+
+
+def to_unsigned(val, width):
+    # signed ints -> the packed bit pattern cocotb gives back from .value
+    return np.asarray(val, dtype=np.int64) & ((1 << width) - 1)
+
+
+def to_signed(val, width):
+    return wrap(np.asarray(val, dtype=np.int64), width)
+
+
+def bit_reverse_indices(points=POINTS):
+    stages = int(points).bit_length() - 1
+    idx = np.arange(points)
+    rev = np.zeros(points, dtype=np.int64)
+    for i in range(stages):
+        rev |= ((idx >> i) & 1) << (stages - 1 - i)
+    return rev
+
+
+def read_twiddle_rom(path=TWIDDLE_ROM, width=TWIDDLE_WIDTH):
+    # each line is {re, im} packed, re in the upper half, like $readmemh sees it
+    packed = np.array([int(line, 16) for line in Path(path).read_text().split()], dtype=np.int64)
+    re = to_signed(packed >> width, width)
+    im = to_signed(packed & ((1 << width) - 1), width)
+    return re, im
+
+
+def read_band_map(path=BAND_MAP):
+    """fft_core's BAND_MAP table: one entry per bin, 0 for no band, b + 1 for band b."""
+    return np.array([int(line, 16) for line in Path(path).read_text().split()], dtype=np.int64)
+
+
+def band_table(band_map, points=POINTS):
+    """(POINTS, n_bands) 0/1 matrix: row k selects the band bin k accumulates into."""
+    band_map = np.asarray(band_map, dtype=np.int64)
+    table = np.zeros((points, int(band_map.max())), dtype=np.int64)
+    bins = np.flatnonzero(band_map)
+    table[bins, band_map[bins] - 1] = 1
+    return table
+
+
+def bands_to_map(bands):
+    band_map = np.zeros(max(end for _, end in bands) + 1, dtype=np.int64)
+    for b, (start, end) in enumerate(bands):
+        band_map[start:end + 1] = b + 1
+    return band_map
+
+
+def expand_twiddles(re, im, points=POINTS, table="full", width=TWIDDLE_WIDTH):
+    """Unfold a quarter- or eighth-wave table (data/twiddle_gen.py --table) to the POINTS/2 entries fft_core uses.
+
+    quarter holds k = 0 .. N/4-1 and W[k + N/4] = -j W[k]; eighth holds
+    k = 0 .. N/8 and W[N/4 - k] = -j conj(W[k]). Only negations and swaps,
+    so the result matches a full table generated at the same width exactly.
+    """
+    re, im = np.asarray(re, dtype=np.int64), np.asarray(im, dtype=np.int64)
+    if table == "full":
+        return re, im
+    if table == "eighth":
+        k = np.arange(points // 8 + 1, points // 4)
+        mirror = points // 4 - k
+        re, im = (np.concatenate([re[:points // 8 + 1], wrap(-im[mirror], width)]),
+                  np.concatenate([im[:points // 8 + 1], wrap(-re[mirror], width)]))
+    elif table != "quarter":
+        raise ValueError(f"unknown twiddle table {table!r}")
+    quarter = slice(0, points // 4)
+    return np.concatenate([re[quarter], im[quarter]]), np.concatenate([im[quarter], wrap(-re[quarter], width)])
+
+
+def butterfly(in1_re, in1_im, in2_re, in2_im, tw_re, tw_im,
+              data_width=DATA_WIDTH, twiddle_width=TWIDDLE_WIDTH, twiddle_frac_bits=TWIDDLE_FRAC_BITS):
+    """Vectorized butterfly.sv: returns (out1_re, out1_im, out2_re, out2_im).
+
+    Mirrors the RTL widths exactly: the complex product is formed in
+    DATA_WIDTH + TWIDDLE_WIDTH bits and arithmetic-shifted (floor, no rounding),
+    the add/sub is kept in DATA_WIDTH + 3 bits and the result is saturated back
+    to DATA_WIDTH.
+    """
+    product_width = data_width + twiddle_width
+    sum_width = data_width + 3
+
+    mult_re = wrap(in2_re * tw_re - in2_im * tw_im, product_width) >> twiddle_frac_bits
+    mult_im = wrap(in2_re * tw_im + in2_im * tw_re, product_width) >> twiddle_frac_bits
+
+    out1_re = saturate(wrap(in1_re + mult_re, sum_width), data_width)
+    out1_im = saturate(wrap(in1_im + mult_im, sum_width), data_width)
+    out2_re = saturate(wrap(in1_re - mult_re, sum_width), data_width)
+    out2_im = saturate(wrap(in1_im - mult_im, sum_width), data_width)
+    return out1_re, out1_im, out2_re, out2_im
+
+
+def magnitude_approx(re, im, mode=MAG_SUM):
+    """fft_core's magnitude function, on DATA_WIDTH+2 bits.
+
+    MAG_SUM is |re| + |im| (up to 41% over |X|). MAG_MAX_BLEND is the
+    two-region alpha-max-beta-min max(L, L - L/8 + S/2), L and S the larger
+    and smaller of |re| and |im|, shifts flooring as in RTL: within 3% of
+    |X|. abs(MIN_VALUE) stays 2**(DATA_WIDTH-1) as in RTL.
+    """
+    abs_re, abs_im = np.abs(re), np.abs(im)
+    if mode == MAG_SUM:
+        return abs_re + abs_im
+    if mode == MAG_MAX_BLEND:
+        larger, smaller = np.maximum(abs_re, abs_im), np.minimum(abs_re, abs_im)
+        return np.maximum(larger, larger - (larger >> 3) + (smaller >> 1))
+    raise ValueError(f"unknown MAG_MODE {mode}")
+
+
+def headroom_shift(val, width=DATA_WIDTH):
+    """BLOCK_FLOAT: right shift (0-2) that leaves `val` two guard bits, elementwise."""
+    val = np.asarray(val, dtype=np.int64)
+    guard = (val >= -(1 << (width - 3))) & (val < (1 << (width - 3)))
+    one = (val >= -(1 << (width - 2))) & (val < (1 << (width - 2)))
+    return np.where(guard, 0, np.where(one, 1, 2))
+
+
+def block_shift(re, im, width=DATA_WIDTH):
+    # largest headroom_shift over each frame (the last axis)
+    return np.maximum(headroom_shift(re, width).max(axis=-1), headroom_shift(im, width).max(axis=-1))
+
+
+def scale_bands(bands, exponent):
+    """fft_core's DONE: 32-bit band sums shifted back up by the block exponent, saturating."""
+    scaled = np.asarray(bands, dtype=np.int64) << np.asarray(exponent, dtype=np.int64).reshape(-1, 1)
+    return np.minimum(scaled, (1 << ACC_WIDTH) - 1)
+
+
+def split_real_pair(out_re, out_im, data_width=DATA_WIDTH):
+    """TWO_REAL separation of Z = FFT(a + jb) into (a_re, a_im, b_re, b_im) spectra.
+
+    A[k] = (Z[k] + conj Z[N-k]) / 2 and B[k] = (Z[k] - conj Z[N-k]) / 2j,
+    halved with an arithmetic shift (floor) exactly like the SPLIT state.
+    """
+    z_re, z_im = np.atleast_2d(out_re), np.atleast_2d(out_im)
+    mirror = -np.arange(z_re.shape[-1]) % z_re.shape[-1]
+    m_re, m_im = z_re[:, mirror], z_im[:, mirror]
+    a_re = (z_re + m_re) >> 1
+    a_im = (z_im - m_im) >> 1
+    b_re = (z_im + m_im) >> 1
+    b_im = wrap(-((z_re - m_re) >> 1), data_width)
+    return a_re, a_im, b_re, b_im
+
+
+class FFTCoreModel:
+    """Batched fixed-point model of fft_core.
+
+    model = FFTCoreModel()
+    out_re, out_im = model.fft(frames_re)          # (n_frames, POINTS) each
+    low, mid, high = model.band_magnitudes(out_re, out_im).T
+
+    `band_map` (read_band_map() of a data/band_gen.py table) replaces the
+    (start, end) `bands` for cores built with a different BAND_MAP, and
+    `mag_mode` follows the MAG_MODE parameter.
+
+    With `block_float` (BLOCK_FLOAT=1) every stage's input block is
+    shifted right by block_shift() of what the previous stage (or LOAD)
+    wrote; fft(..., return_exponent=True) also returns the per-frame total,
+    block_exponent, and band_magnitudes() takes it to scale the sums back.
+    """
+
+    def __init__(self, points=POINTS, data_width=DATA_WIDTH, data_frac_bits=DATA_FRAC_BITS,
+                 twiddle_width=TWIDDLE_WIDTH, twiddle_frac_bits=TWIDDLE_FRAC_BITS,
+                 twiddle_rom=TWIDDLE_ROM, bands=BANDS, twiddle_table="full", band_map=None,
+                 mag_mode=MAG_SUM, block_float=False):
+        self.points = points
+        self.stages = int(points).bit_length() - 1
+        self.data_width = data_width
+        self.data_frac_bits = data_frac_bits
+        self.twiddle_width = twiddle_width
+        self.twiddle_frac_bits = twiddle_frac_bits
+        self.mag_mode = mag_mode
+        self.block_float = block_float
+        if band_map is None:
+            band_map = bands_to_map(bands)
+        self.band_map = np.asarray(band_map, dtype=np.int64)
+        self.band_table = band_table(self.band_map, points)
+        self.bands = tuple((int(np.flatnonzero(col)[0]), int(np.flatnonzero(col)[-1])) for col in self.band_table.T)
+        self.tw_re, self.tw_im = expand_twiddles(*read_twiddle_rom(twiddle_rom, twiddle_width), points,
+                                                 twiddle_table, twiddle_width)
+        self.bit_reverse = bit_reverse_indices(points)
+
+        if len(self.tw_re) < points // 2:
+            raise ValueError(f"twiddle ROM has {len(self.tw_re)} entries, need {points // 2}")
+
+    @classmethod
+    def from_params(cls, params, **overrides):
+        """Model of fft_core built with `params` (cycle_budget.hdl_params() output).
+
+        `overrides` go straight to __init__: twiddle_rom and band_map for
+        cores built against other tables, since hdl_params() skips strings.
+        """
+        kwargs = {
+            "points": params["POINTS"],
+            "data_width": params["DATA_WIDTH"],
+            "data_frac_bits": params["DATA_FRAC_BITS"],
+            "twiddle_width": params["TWIDDLE_WIDTH"],
+            "twiddle_frac_bits": params["TWIDDLE_FRAC_BITS"],
+            "mag_mode": params.get("MAG_MODE", MAG_SUM),
+            "block_float": bool(params.get("BLOCK_FLOAT", 0)),
+        }
+        return cls(**{**kwargs, **overrides})
+
+    def fft(self, frames_re, frames_im=None, return_exponent=False):
+        """Run the core on raw integer frames, returns the (re, im) read_data contents.
+
+        With return_exponent, returns (re, im, block_exponent); the exponent
+        is all zeros unless block_float.
+        """
+        re = wrap(np.atleast_2d(np.asarray(frames_re, dtype=np.int64)), self.data_width)
+        if frames_im is None:
+            im = np.zeros_like(re)
+        else:
+            im = wrap(np.atleast_2d(np.asarray(frames_im, dtype=np.int64)), self.data_width)
+
+        if re.shape[-1] != self.points:
+            raise ValueError(f"expected frames of {self.points} samples, got {re.shape[-1]}")
+
+        # LOAD writes sample n to bram address bit_reverse(n)
+        re = re[:, self.bit_reverse]
+        im = im[:, self.bit_reverse]
+
+        n_frames = re.shape[0]
+        exponent = np.zeros(n_frames, dtype=np.int64)
+        for stage in range(self.stages):
+            if self.block_float:
+                shift = block_shift(re, im, self.data_width)
+                re, im = re >> shift[:, None], im >> shift[:, None]
+                exponent += shift
+
+            half = 1 << stage
+            groups = self.points // (2 * half)
+
+            # addr1 = group_start | pos, addr2 = addr1 | half
+            re = re.reshape(n_frames, groups, 2, half)
+            im = im.reshape(n_frames, groups, 2, half)
+
+            tw_addr = np.arange(half) << (self.stages - 1 - stage)
+            out = butterfly(re[:, :, 0], im[:, :, 0], re[:, :, 1], im[:, :, 1],
+                            self.tw_re[tw_addr], self.tw_im[tw_addr],
+                            self.data_width, self.twiddle_width, self.twiddle_frac_bits)
+
+            re = np.stack((out[0], out[2]), axis=2).reshape(n_frames, self.points)
+            im = np.stack((out[1], out[3]), axis=2).reshape(n_frames, self.points)
+
+        if return_exponent:
+            return re, im, exponent
+        return re, im
+
+    def band_magnitudes(self, out_re, out_im, exponent=0):
+        """band_magnitudes for each frame, as (n_frames, n_bands) uint32-range ints."""
+        mag = magnitude_approx(np.atleast_2d(out_re), np.atleast_2d(out_im), self.mag_mode)
+        return scale_bands((mag @ self.band_table) & ((1 << ACC_WIDTH) - 1), exponent)
+
+    def process(self, frames_re, frames_im=None):
+        """fft() followed by band_magnitudes(): returns (out_re, out_im, bands)."""
+        out_re, out_im, exponent = self.fft(frames_re, frames_im, return_exponent=True)
+        return out_re, out_im, self.band_magnitudes(out_re, out_im, exponent)
+
+    def process_two_real(self, frames_a, frames_b):
+        """TWO_REAL=1: frames_a on input_data_re, frames_b on input_data_im.
+
+        Returns (out_re, out_im, bands_a, bands_b); out_* is the combined
+        spectrum read_data returns, bands_* the low/mid/high(_b) outputs.
+        """
+        out_re, out_im, exponent = self.fft(frames_a, frames_b, return_exponent=True)
+        a_re, a_im, b_re, b_im = split_real_pair(out_re, out_im, self.data_width)
+        return (out_re, out_im, self.band_magnitudes(a_re, a_im, exponent),
+                self.band_magnitudes(b_re, b_im, exponent))
@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+"""Accuracy and cost of magnitude approximations for fft_core's band sums.
+
+fft_core accumulates |re| + |im| per bin, which reads up to 41% high
+depending on the phase of each bin, so the band levels (and the
+thresholds tuned on them) shift with the material. This runs every WAV in
+a corpus through the bit-exact FFTCoreModel and scores each candidate
+against the exact |X| of the same fixed-point spectrum, over the bins the
+band table uses:
+
+    bin error   max / mean (bias) / peak-to-peak of approx / |X| - 1
+    band error  p99 over frames of |band sum / exact band sum - 1|
+    spread      max / min of the per-song, per-band level ratio, in dB:
+                how far the same threshold moves between songs and bands
+
+Candidates are |re| + |im|, alpha-max-beta-min with shift-add and with DSP
+coefficients, the two-region max(L, 7/8 L + S/2), and unrolled CORDIC
+vectoring with shift-add gain compensation. Cost is a rough 7-series
+estimate per magnitude unit at DATA_WIDTH: one LUT per bit for each
+conditional negate, add/sub, compare and 2:1 mux, plus DSP48s for real
+multiplies. fft_core has two units (four with TWO_REAL). Latency isn't
+costed: the CORDIC add/subs chain serially and would need pipelining at
+98 MHz. Candidates with a MAG_MODE are selectable in fft_core.
+
+    python sim/model/magnitude_explorer.py songs/ -j 8 --frames 2000 -o magnitude.json
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+import numpy as np
+
+sys.path.append(str(Path(__file__).resolve().parent))
+from fft_model import DATA_WIDTH, MAG_MAX_BLEND, MAG_SUM, FFTCoreModel, magnitude_approx
+from pipeline_model import to_mono
+from threshold_tuner import find_wavs
+from wav_stream import WavStream
+
+# bins with |X| under this many LSBs are rounding noise, not approximation error
+MIN_MAGNITUDE = 16
+CHUNK_FRAMES = 256
+
+# CORDIC works with this many guard bits below the LSB
+CORDIC_GUARD = 2
+
+
+def signed_shift_terms(value, shifts):
+    """sum of value >> |s|, subtracted where s is negative; s = 0 is value itself (never negative)."""
+    total = np.zeros_like(value)
+    for s in shifts:
+        term = value >> abs(s)
+        total = total - term if s < 0 else total + term
+    return total
+
+
+def shift_add(alpha_shifts, beta_shifts):
+    def approx(re, im):
+        larger, smaller = np.maximum(np.abs(re), np.abs(im)), np.minimum(np.abs(re), np.abs(im))
+        return signed_shift_terms(larger, alpha_shifts) + signed_shift_terms(smaller, beta_shifts)
+    return approx
+
+
+def dsp_amb(alpha, beta, bits=8):
+    # coefficients quantized to `bits` fraction bits, one DSP multiply each
+    a, b = round(alpha * (1 << bits)), round(beta * (1 << bits))
+
+    def approx(re, im):
+        larger, smaller = np.maximum(np.abs(re), np.abs(im)), np.minimum(np.abs(re), np.abs(im))
+        return (a * larger + b * smaller) >> bits
+    return approx
+
+
+# 1/K for the CORDIC gain K = 1.6468 as 1/2 + 1/8 - 1/64 - 1/512 (0.6074)
+CORDIC_GAIN_SHIFTS = (1, 3, -6, -9)
+
+
+def cordic(iterations):
+    """Unrolled CORDIC vectoring on (|re|, im): rotates onto the x axis, x ends at K |X|."""
+    def approx(re, im):
+        x = np.abs(re) << CORDIC_GUARD
+        y = np.asarray(im, dtype=np.int64) << CORDIC_GUARD
+        for i in range(iterations):
+            up = y < 0
+            x, y = np.where(up, x - (y >> i), x + (y >> i)), np.where(up, y + (x >> i), y - (x >> i))
+        return signed_shift_terms(x, CORDIC_GAIN_SHIFTS) >> CORDIC_GUARD
+    return approx
+
+
+def candidates():
+    """(name, approx(re, im), ops, MAG_MODE or None); ops counts the datapath pieces for cost()."""
+    # abs of both inputs, then L/S sort: one compare and two muxes
+    sort = {"abs": 2, "cmp": 1, "mux": 2}
+    rows = [
+        ("|re| + |im|", lambda re, im: magnitude_approx(re, im, MAG_SUM), {"abs": 2, "add": 1}, MAG_SUM),
+        ("L + S/2", shift_add((0,), (1,)), {**sort, "add": 1}, None),
+        ("L + S/4", shift_add((0,), (2,)), {**sort, "add": 1}, None),
+        ("L + 3/8 S", shift_add((0,), (2, 3)), {**sort, "add": 2}, None),
+        ("15/16 L + 15/32 S", shift_add((0, -4), (1, -5)), {**sort, "add": 3}, None),
+        ("max(L, 7/8 L + S/2)", lambda re, im: magnitude_approx(re, im, MAG_MAX_BLEND),
+         {**sort, "add": 2, "cmp": 2, "mux": 3}, MAG_MAX_BLEND),
+        ("0.960 L + 0.398 S (DSP)", dsp_amb(0.960, 0.398), {**sort, "add": 1, "dsp": 2}, None),
+    ]
+    for n in (3, 4, 5, 6):
+        # |re| once, two add/subs per iteration, three for the gain
+        rows.append((f"CORDIC x{n}", cordic(n), {"abs": 1, "add": 2 * n + len(CORDIC_GAIN_SHIFTS) - 1}, None))
+    return rows
+
+
+def cost(ops, width=DATA_WIDTH):
+    """(LUTs, DSPs) for one magnitude unit, adders on width + 2 bits."""
+    luts = width * (ops.get("abs", 0) + ops.get("cmp", 0) + ops.get("mux", 0)) + (width + 2) * ops.get("add", 0)
+    return luts, ops.get("dsp", 0)
+
+
+def frames_of(path, max_frames, points):
+    wav = WavStream(path)
+    count = None if max_frames is None else max_frames * points
+    mono = to_mono(wav.read(0, count))
+    return mono[:len(mono) // points * points].reshape(-1, points)
+
+
+def analyze_song(path, max_frames=None):
+    """Per-candidate error accumulators for one song; returns a JSON-able dict."""
+    start = time.perf_counter()
+    model = FFTCoreModel()
+    table = model.band_table
+    bins = np.flatnonzero(table.any(axis=1))
+    table = table[bins]
+    frames = frames_of(path, max_frames, model.points)
+    rows = candidates()
+
+    stats = {name: {"max": 0.0, "min": 0.0, "sum": 0.0, "count": 0,
+                    "band_approx": np.zeros(table.shape[1]), "band_exact": np.zeros(table.shape[1]), "band_err": []}
+             for name, *_ in rows}
+    for chunk in range(0, len(frames), CHUNK_FRAMES):
+        out_re, out_im = model.fft(frames[chunk:chunk + CHUNK_FRAMES])
+        re, im = out_re[:, bins], out_im[:, bins]
+        exact = np.hypot(re, im)
+        exact_bands = exact @ table
+        live = exact >= MIN_MAGNITUDE
+        for name, approx, _, _ in rows:
+            mag = approx(re, im)
+            s = stats[name]
+            if live.any():
+                err = mag[live] / exact[live] - 1
+                s["max"] = max(s["max"], float(err.max()))
+                s["min"] = min(s["min"], float(err.min()))
+                s["sum"] += float(err.sum())
+                s["count"] += int(err.size)
+            bands = mag @ table
+            s["band_approx"] += bands.sum(axis=0)
+            s["band_exact"] += exact_bands.sum(axis=0)
+            loud = exact_bands >= MIN_MAGNITUDE * table.sum(axis=0)
+            s["band_err"].extend(np.abs(bands[loud] / exact_bands[loud] - 1).tolist())
+
+    result = {}
+    for name, s in stats.items():
+        result[name] = {
+            "max": s["max"], "min": s["min"], "sum": s["sum"], "count": s["count"],
+            "band_ratio": (s["band_approx"] / np.maximum(s["band_exact"], 1)).tolist(),
+            "band_err_p99": float(np.percentile(s["band_err"], 99)) if s["band_err"] else 0.0,
+        }
+    return {"frames": len(frames), "candidates": result, "seconds": time.perf_counter() - start}
+
+
+def summarize(songs, width=DATA_WIDTH):
+    """Corpus-wide row per candidate, cheapest first, with the Pareto front marked."""
+    rows = []
+    for name, _, ops, mode in candidates():
+        per_song = [s["candidates"][name] for s in songs.values() if s["frames"]]
+        count = sum(c["count"] for c in per_song)
+        ratios = np.array([r for c in per_song for r in c["band_ratio"] if r > 0])
+        luts, dsps = cost(ops, width)
+        rows.append({
+            "name": name,
+            "mag_mode": mode,
+            "max_err_pct": 100 * max((max(c["max"], -c["min"]) for c in per_song), default=0.0),
+            "bias_pct": 100 * sum(c["sum"] for c in per_song) / max(count, 1),
+            "p2p_pct": 100 * (max((c["max"] for c in per_song), default=0.0)
+                              - min((c["min"] for c in per_song), default=0.0)),
+            "band_err_p99_pct": 100 * max((c["band_err_p99"] for c in per_song), default=0.0),
+            "spread_db": float(20 * np.log10(ratios.max() / ratios.min())) if len(ratios) else 0.0,
+            "luts": luts,
+            "dsps": dsps,
+        })
+    # Pareto on (cost, spread): nothing else is as cheap and more consistent
+    for row in rows:
+        row["pareto"] = not any(
+            (o["dsps"], o["luts"]) <= (row["dsps"], row["luts"]) and o["spread_db"] < row["spread_db"]
+            for o in rows if o is not row)
+    return sorted(rows, key=lambda r: (r["dsps"], r["luts"]))
+
+
+def format_table(rows):
+    lines = [f"{'candidate':<26}{'max %':>8}{'bias %':>8}{'p2p %':>8}{'band p99 %':>11}{'spread dB':>10}"
+             f"{'LUTs':>6}{'DSPs':>5}  MAG_MODE"]
+    for r in rows:
+        mode = "-" if r["mag_mode"] is None else str(r["mag_mode"])
+        mark = " *" if r["pareto"] else ""
+        lines.append(f"{r['name']:<26}{r['max_err_pct']:>8.2f}{r['bias_pct']:>8.2f}{r['p2p_pct']:>8.2f}"
+                     f"{r['band_err_p99_pct']:>11.2f}{r['spread_db']:>10.3f}{r['luts']:>6}{r['dsps']:>5}  {mode}{mark}")
+    lines.append("* Pareto front: no other candidate is as cheap with less spread")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Score magnitude approximations for fft_core over a WAV corpus")
+    parser.add_argument("songs", nargs="+", help="WAV files or directories of them")
+    parser.add_argument("--frames", type=int, help="Only the first FRAMES frames of each song")
+    parser.add_argument("--jobs", "-j", type=int, default=os.cpu_count(), help="Worker processes")
+    parser.add_argument("--output", "-o", help="Write the summary and per-song results as JSON")
+    args = parser.parse_args()
+
+    wavs = find_wavs(args.songs)
+    if not wavs:
+        parser.error("no WAV files found")
+
+    start = time.perf_counter()
+    songs = {}
+    with ProcessPoolExecutor(max_workers=args.jobs) as pool:
+        futures = {pool.submit(analyze_song, wav, args.frames): wav for wav in wavs}
+        for future in as_completed(futures):
+            songs[str(futures[future])] = future.result()
+    songs = {str(wav): songs[str(wav)] for wav in wavs}
+
+    rows = summarize(songs)
+    print(format_table(rows))
+    frames = sum(s["frames"] for s in songs.values())
+    print(f"{len(songs)} songs, {frames} frames in {time.perf_counter() - start:.2f}s")
+
+    if args.output:
+        Path(args.output).write_text(json.dumps({"summary": rows, "songs": songs}, indent=2) + "\n")
+        print(f"wrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,377 @@
+#!/usr/bin/env python3
+"""Offline model of the audio analysis chain in top_level.sv.
+
+    WAV -> mono (L + R) >> 2 -> frame_buffer (512-sample frames every HOP samples)
+        -> fft_core band magnitudes -> magnitude_smoother (x3)
+        -> face_selector -> led_choice image offset
+
+Everything up to the smoothers is bit-exact with the RTL. face_selector's
+update_face comes from the LED chain (lit_all_led), which is modelled at the
+timing level: a face change blocks further updates for one LED refresh.
+
+    python sim/model/pipeline_model.py song.wav -o timeline.csv --thresholds 40 60 30
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.append(str(Path(__file__).resolve().parent))
+from fft_model import FFTCoreModel, POINTS, ACC_WIDTH
+from wav_stream import WavStream
+
+CLOCK_HZ = 98.304e6
+
+# magnitude_smoother defaults
+SMOOTHER_SAMPLES = 8
+
+# top_level shifts the smoothed bands before face_selector (and display_bars)
+BAND_SHIFTS = (14, 15, 15)
+
+# led_control / led_choice timing
+TOTAL_LEDS = 1024
+LED_BIT_CYCLES = 123        # ZERO_CYCLES_HIGH + ZERO_CYCLES_LOW == ONE_CYCLES_HIGH + ONE_CYCLES_LOW
+LED_WAIT_CYCLES = 5000
+BITS_PER_LED = 24
+
+# face_selector states, named EYE_MOUTH, values are the face_state encoding
+OPEN_CLOSED = 0b000
+OPEN_OPEN = 0b001
+OPEN_MID = 0b010
+OPEN_WIDE = 0b011
+CLOSED_CLOSED = 0b100
+CLOSED_OPEN = 0b101
+CLOSED_MID = 0b110
+CLOSED_WIDE = 0b111
+
+FACE_NAMES = {
+    OPEN_CLOSED: "OPEN_CLOSED", OPEN_OPEN: "OPEN_OPEN", OPEN_MID: "OPEN_MID", OPEN_WIDE: "OPEN_WIDE",
+    CLOSED_CLOSED: "CLOSED_CLOSED", CLOSED_OPEN: "CLOSED_OPEN", CLOSED_MID: "CLOSED_MID", CLOSED_WIDE: "CLOSED_WIDE",
+}
+
+# one row per FFT frame; face_state is the face showing when the next frame lands
+TIMELINE_DTYPE = np.dtype([
+    ("frame", np.int64),
+    ("time", np.float64),
+    ("low", np.int64), ("mid", np.int64), ("high", np.int64),
+    ("low_smooth", np.int64), ("mid_smooth", np.int64), ("high_smooth", np.int64),
+    ("lmh", np.int64),
+    ("face_state", np.int64),
+    ("led_offset", np.int64),
+])
+
+
+def face_next(state, lmh):
+    """One update_face step of face_selector.sv (later assignments win, as in the always_ff)."""
+    nxt = state
+    if lmh == 0b000:
+        nxt = OPEN_CLOSED
+    if lmh == 0b100:
+        nxt = CLOSED_CLOSED
+
+    if state in (OPEN_CLOSED, CLOSED_CLOSED):
+        # both decode lmh straight into a face; CLOSED_CLOSED also handles 000
+        direct = {0b001: OPEN_OPEN, 0b010: OPEN_MID, 0b011: OPEN_WIDE, 0b101: CLOSED_OPEN,
+                  0b110: CLOSED_MID, 0b111: CLOSED_WIDE, 0b100: CLOSED_CLOSED}
+        if state == CLOSED_CLOSED:
+            direct[0b000] = OPEN_CLOSED
+        nxt = direct.get(lmh, nxt)
+    elif state == OPEN_MID:
+        if lmh == 0b110:
+            nxt = CLOSED_MID
+        if lmh in (0b011, 0b001):
+            nxt = OPEN_OPEN
+        if lmh in (0b111, 0b101):
+            nxt = CLOSED_OPEN
+    elif state in (OPEN_OPEN, CLOSED_OPEN):
+        if state == OPEN_OPEN and lmh == 0b101:
+            nxt = CLOSED_OPEN
+        if state == CLOSED_OPEN and lmh == 0b001:
+            nxt = OPEN_OPEN
+        if lmh in (0b010, 0b000):
+            nxt = OPEN_MID
+        if lmh in (0b110, 0b100):
+            nxt = CLOSED_MID
+        if lmh in (0b011, 0b111):
+            nxt = OPEN_WIDE
+    elif state == OPEN_WIDE:
+        if lmh == 0b111:
+            nxt = CLOSED_WIDE
+        if lmh in (0b000, 0b001, 0b010):
+            nxt = OPEN_MID
+        if lmh in (0b100, 0b101, 0b110):
+            nxt = CLOSED_MID
+    elif state == CLOSED_MID:
+        if lmh == 0b010:
+            nxt = OPEN_MID
+        if lmh in (0b011, 0b001):
+            nxt = OPEN_OPEN
+        if lmh in (0b111, 0b101):
+            nxt = CLOSED_OPEN
+    elif state == CLOSED_WIDE:
+        if lmh == 0b011:
+            nxt = OPEN_WIDE
+        if lmh in (0b000, 0b001, 0b010):
+            nxt = OPEN_MID
+        if lmh in (0b100, 0b101, 0b110):
+            nxt = CLOSED_MID
+    return nxt
+
+
+# FACE_NEXT[state, lmh]
+FACE_NEXT = np.array([[face_next(s, lmh) for lmh in range(8)] for s in range(8)], dtype=np.int64)
+
+
+def led_refresh_cycles(total_leds=TOTAL_LEDS):
+    # WAIT reset code, then every LED but the last: a RECEIVE_SAMPLE cycle
+    # plus 24 bit periods. lit_all_led rises as the last pixel_lit lands.
+    return LED_WAIT_CYCLES + (total_leds - 1) * (BITS_PER_LED * LED_BIT_CYCLES + 1)
+
+
+def band_levels(smooth, band_shifts=BAND_SHIFTS):
+    """The low/mid/high_data face_selector sees: smoothed bands shifted as in top_level."""
+    return (np.asarray(smooth, dtype=np.int64) >> np.asarray(band_shifts)) & ((1 << ACC_WIDTH) - 1)
+
+
+def lmh_codes(levels, thresholds):
+    """face_selector's {low_valid, mid_valid, high_valid} for (n, 3) band levels.
+
+    thresholds is (3,) for one setting, giving (n,), or (C, 3) for C
+    candidate settings at once, giving (n, C).
+    """
+    levels = np.asarray(levels, dtype=np.int64)
+    thresholds = np.asarray(thresholds, dtype=np.int64)
+    if thresholds.ndim == 1:
+        valid = (levels >= thresholds).astype(np.uint8)
+        return (valid[:, 0] << 2) | (valid[:, 1] << 1) | valid[:, 2]
+    code = np.zeros((len(levels), len(thresholds)), dtype=np.uint8)
+    for band, shift in enumerate((2, 1, 0)):
+        code |= (levels[:, None, band] >= thresholds[None, :, band]).astype(np.uint8) << shift
+    return code
+
+
+def run_faces(lmh, times, frame_period, refresh_time, state=OPEN_CLOSED, update_after=0.0):
+    """Step face_selector over a run of frames, for one or many candidates at once.
+
+    lmh is (n,) or (n, C); times are when each frame's smoothed values land.
+    update_face is high from the end of each LED refresh until the face
+    changes, and a change restarts the refresh. Within a frame lmh is
+    constant, so each update window either settles immediately or takes the
+    (up to) three steps the FSM gets before reset_led drops lit_all_led.
+
+    Returns (faces shaped like lmh, final state (C,), final update_after (C,)).
+    """
+    lmh = np.asarray(lmh)
+    single = lmh.ndim == 1
+    if single:
+        lmh = lmh[:, None]
+    count = lmh.shape[1]
+    state = np.broadcast_to(np.asarray(state, dtype=np.uint8), (count,)).copy()
+    update_after = np.broadcast_to(np.asarray(update_after, dtype=np.float64), (count,)).copy()
+    face_next_table = FACE_NEXT.astype(np.uint8)
+
+    faces = np.empty(lmh.shape, dtype=np.uint8)
+    for i in range(len(lmh)):
+        start, end = times[i], times[i] + frame_period
+        code = lmh[i]
+        pending = update_after < end
+        while pending.any():
+            nxt = face_next_table[state, code]
+            changed = pending & (nxt != state)
+            if not changed.any():
+                break
+            settled = face_next_table[face_next_table[nxt, code], code]
+            state = np.where(changed, settled, state)
+            update_after = np.where(changed, np.maximum(update_after, start) + refresh_time, update_after)
+            pending = changed & (update_after < end)
+        faces[i] = state
+
+    return (faces[:, 0] if single else faces), state, update_after
+
+
+def to_mono(samples):
+    """top_level's mono_data[24:1]: (left + right) >>> 2 on 24-bit samples."""
+    samples = np.asarray(samples, dtype=np.int64)
+    if samples.ndim == 1:
+        return (samples + samples) >> 2
+    if samples.shape[1] == 1:
+        return (samples[:, 0] + samples[:, 0]) >> 2
+    return (samples[:, 0] + samples[:, 1]) >> 2
+
+
+class FrameBuffer:
+    """frame_buffer.sv's circular history, streaming.
+
+    Once POINTS samples are in, every HOP-th sample completes a frame of
+    the last POINTS samples in arrival order. HOP == POINTS is the
+    back-to-back framing; smaller hops overlap.
+    """
+
+    def __init__(self, points=POINTS, hop=None):
+        self.points = points
+        self.hop = hop or points
+        if self.points % self.hop:
+            raise ValueError(f"HOP {self.hop} must divide POINTS {self.points}")
+        self.reset()
+
+    def reset(self):
+        self.history = np.zeros(0, dtype=np.int64)
+        self.written = 0
+
+    def process(self, samples):
+        """Push mono samples; returns (frames (n, POINTS), ends) with ends the sample count at frame_ready."""
+        samples = np.asarray(samples, dtype=np.int64)
+        stream = np.concatenate((self.history, samples))
+        first = self.written - len(self.history)
+        self.written += len(samples)
+
+        # a frame completes when the running sample count hits a multiple of HOP >= POINTS
+        lo = max(self.written - len(samples) + 1, self.points)
+        ends = np.arange(-(-lo // self.hop) * self.hop, self.written + 1, self.hop)
+        self.history = stream[max(len(stream) - self.points + 1, 0):]
+        if len(ends) == 0:
+            return np.zeros((0, self.points), dtype=np.int64), ends
+
+        windows = np.lib.stride_tricks.sliding_window_view(stream, self.points)
+        return windows[ends - self.points - first], ends
+
+
+class MagnitudeSmoother:
+    """smoothing.sv's magnitude_smoother, streaming, any number of channels.
+
+    mag_out is registered from the moving sum *before* the new input is
+    added, so output n averages inputs n-NUM_SAMPLES .. n-1.
+    """
+
+    def __init__(self, num_samples=SMOOTHER_SAMPLES, width=ACC_WIDTH, channels=3):
+        self.num_samples = num_samples
+        self.width = width
+        self.shift = max(int(num_samples - 1).bit_length(), 0)
+        self.channels = channels
+        self.reset()
+
+    def reset(self):
+        self.history = np.zeros((self.num_samples, self.channels), dtype=np.int64)
+
+    def process(self, mags):
+        """mags: (n, channels) inputs, one row per mag_in_valid. Returns mag_out after each."""
+        mags = np.asarray(mags, dtype=np.int64).reshape(-1, self.channels) & ((1 << self.width) - 1)
+        ext = np.concatenate((self.history, mags))
+        csum = np.concatenate((np.zeros((1, self.channels), dtype=np.int64), np.cumsum(ext, axis=0)))
+        n = len(mags)
+        # moving_sum seen by input i covers ext[i : i + num_samples]
+        sums = csum[self.num_samples:self.num_samples + n] - csum[:n]
+        self.history = ext[n:]
+        return (sums >> self.shift) & ((1 << self.width) - 1)
+
+
+class PipelineModel:
+    """Streaming model: feed 24-bit stereo (or mono) blocks, get timeline rows back."""
+
+    def __init__(self, thresholds=(0, 0, 0), sample_rate=48000, fft=None,
+                 smoother_samples=SMOOTHER_SAMPLES, band_shifts=BAND_SHIFTS, clock_hz=CLOCK_HZ, hop=None):
+        self.thresholds = np.asarray(thresholds, dtype=np.int64)
+        self.sample_rate = sample_rate
+        self.fft = fft or FFTCoreModel()
+        self.points = self.fft.points
+        self.frame_buffer = FrameBuffer(self.points, hop)
+        self.hop = self.frame_buffer.hop
+        self.smoother = MagnitudeSmoother(smoother_samples, ACC_WIDTH, len(self.fft.bands))
+        self.band_shifts = np.asarray(band_shifts, dtype=np.int64)
+        self.refresh_time = led_refresh_cycles() / clock_hz
+        self.reset()
+
+    def reset(self):
+        self.smoother.reset()
+        self.frame_buffer.reset()
+        self.frame = 0
+        self.face_state = OPEN_CLOSED
+        # the LEDs refresh once out of reset before update_face first goes high
+        self.update_after = self.refresh_time
+
+    def process(self, samples):
+        """Push a block of samples; returns timeline rows for every frame it completed."""
+        frames, ends = self.frame_buffer.process(to_mono(samples))
+        n_frames = len(frames)
+        if n_frames == 0:
+            return np.zeros(0, dtype=TIMELINE_DTYPE)
+
+        _, _, bands = self.fft.process(frames)
+        smooth = self.smoother.process(bands)
+
+        lmh = lmh_codes(band_levels(smooth, self.band_shifts), self.thresholds)
+
+        index = self.frame + np.arange(n_frames)
+        # smoothed values update at fft_done, right after each frame fills
+        times = ends / self.sample_rate
+
+        rows = np.zeros(n_frames, dtype=TIMELINE_DTYPE)
+        rows["frame"] = index
+        rows["time"] = times
+        for i, name in enumerate(("low", "mid", "high")):
+            rows[name] = bands[:, i]
+            rows[f"{name}_smooth"] = smooth[:, i]
+        rows["lmh"] = lmh
+        rows["face_state"] = self._run_faces(lmh, times)
+        rows["led_offset"] = rows["face_state"] * TOTAL_LEDS
+
+        self.frame += n_frames
+        return rows
+
+    def _run_faces(self, lmh, times):
+        faces, state, update_after = run_faces(lmh, times, self.hop / self.sample_rate, self.refresh_time,
+                                               self.face_state, self.update_after)
+        self.face_state = int(state[0])
+        self.update_after = float(update_after[0])
+        return faces
+
+    def run_wav(self, path, chunk_frames=POINTS * 256):
+        """Run a whole WAV file through the chain; returns the concatenated timeline."""
+        wav = WavStream(path)
+        self.sample_rate = wav.sample_rate
+        self.reset()
+        rows = [self.process(chunk) for chunk in wav.chunks(chunk_frames)]
+        return np.concatenate(rows) if rows else np.zeros(0, dtype=TIMELINE_DTYPE)
+
+
+def write_timeline(path, timeline):
+    fmt = ["%d", "%.6f"] + ["%d"] * (len(TIMELINE_DTYPE.names) - 2)
+    np.savetxt(path, timeline, fmt=fmt, delimiter=",", header=",".join(TIMELINE_DTYPE.names), comments="")
+
+
+def summarize(timeline):
+    lines = [f"{len(timeline)} frames, {timeline['time'][-1] if len(timeline) else 0.0:.2f}s of audio"]
+    if len(timeline):
+        faces = timeline["face_state"]
+        changes = int(np.count_nonzero(np.diff(faces)))
+        lines.append(f"{changes} face changes ({changes / timeline['time'][-1]:.2f}/s)")
+        counts = np.bincount(faces, minlength=8)
+        for state in range(8):
+            lines.append(f"  {FACE_NAMES[state]:<14}{100 * counts[state] / len(faces):6.1f}%")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a WAV through the modelled FFT -> face pipeline")
+    parser.add_argument("wav", help="Input WAV file")
+    parser.add_argument("--output", "-o", help="Write the per-frame timeline as CSV")
+    parser.add_argument("--thresholds", type=int, nargs=3, default=[0, 0, 0], metavar=("LOW", "MID", "HIGH"),
+                        help="threshold_control values (default: 0 0 0, the reset state)")
+    parser.add_argument("--hop", type=int, help="frame_buffer HOP in samples (default: POINTS, no overlap)")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    timeline = PipelineModel(args.thresholds, hop=args.hop).run_wav(args.wav)
+    elapsed = time.perf_counter() - start
+
+    print(summarize(timeline))
+    print(f"processed in {elapsed:.2f}s")
+    if args.output:
+        write_timeline(args.output, timeline)
+        print(f"wrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
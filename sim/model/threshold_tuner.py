@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""Search face_selector thresholds for a song or a playlist.
+
+Each song goes through the bit-exact fft_core + magnitude_smoother model once
+(pipeline_model.py); after that a threshold setting only changes the lmh
+codes, so thousands of candidate settings are stepped through face_selector
+side by side as columns of one array, and batches of candidates are spread
+over a process pool.
+
+The search is coarse-to-fine over multiples of MOVE_SPEED (the step the
+threshold_control buttons move in), scoring each setting against:
+
+    --mouth-open   fraction of time the mouth should be open (not *_CLOSED)
+    --eyes-closed  fraction of time the eyes should be closed (optional)
+    --max-changes  face changes per second not to exceed
+
+Scores are averaged over songs. The winner is printed as threshold_control
+parameter overrides (LOW_DEFAULT etc.) and optionally written as JSON.
+
+    python sim/model/threshold_tuner.py songs/ --mouth-open 0.4 --max-changes 3 -o thresholds.json
+"""
+import argparse
+import itertools
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from pathlib import Path
+
+import numpy as np
+
+sys.path.append(str(Path(__file__).resolve().parent))
+from pipeline_model import PipelineModel, band_levels, lmh_codes, run_faces
+
+# threshold_control parameters in top_level
+BAR_REGION_HEIGHT = 359
+MOVE_SPEED = 4
+
+# score added per face change/s over --max-changes
+CHANGE_PENALTY = 1.0
+
+BATCH_SIZE = 512
+
+# set in each worker by init_worker: [(levels, times, frame_period, refresh_time), ...]
+SONGS = []
+
+
+def analyze_song(path, hop=None):
+    """Run one song through the model; returns (levels, times, frame_period, refresh_time)."""
+    model = PipelineModel(hop=hop)
+    timeline = model.run_wav(path)
+    smooth = np.stack([timeline[f"{b}_smooth"] for b in ("low", "mid", "high")], axis=1)
+    # a frame comes out every HOP samples
+    return band_levels(smooth), timeline["time"], model.hop / model.sample_rate, model.refresh_time
+
+
+def init_worker(songs):
+    global SONGS
+    SONGS = songs
+
+
+def evaluate(candidates):
+    """(C, 3) thresholds -> (C, n_songs, 3) array of [mouth open, eyes closed, changes/s]."""
+    candidates = np.asarray(candidates, dtype=np.int64)
+    metrics = np.zeros((len(candidates), len(SONGS), 3))
+    for s, (levels, times, frame_period, refresh_time) in enumerate(SONGS):
+        if len(levels) == 0:
+            continue
+        lmh = lmh_codes(levels, candidates)
+        faces, _, _ = run_faces(lmh, times, frame_period, refresh_time, update_after=refresh_time)
+        duration = times[-1] + frame_period
+        metrics[:, s, 0] = np.mean((faces & 0b011) != 0, axis=0)
+        metrics[:, s, 1] = np.mean((faces & 0b100) != 0, axis=0)
+        metrics[:, s, 2] = np.count_nonzero(np.diff(faces, axis=0), axis=0) / duration
+    return metrics
+
+
+def score(metrics, mouth_open, eyes_closed, max_changes):
+    per_song = np.abs(metrics[..., 0] - mouth_open)
+    if eyes_closed is not None:
+        per_song = per_song + np.abs(metrics[..., 1] - eyes_closed)
+    per_song = per_song + CHANGE_PENALTY * np.maximum(metrics[..., 2] - max_changes, 0.0)
+    return per_song.mean(axis=1)
+
+
+def coarse_levels(values, grid, count):
+    # spread the first guesses over where the band actually sits
+    picks = np.percentile(values, np.linspace(0, 100, count))
+    idx = np.clip(np.searchsorted(grid, picks), 0, len(grid) - 1)
+    return np.unique(np.concatenate(([0], grid[idx])))
+
+
+def refine_levels(grid, best, radius, count):
+    idx = int(np.searchsorted(grid, best))
+    lo, hi = max(0, idx - radius), min(len(grid) - 1, idx + radius)
+    return grid[np.unique(np.linspace(lo, hi, count).round().astype(int))]
+
+
+def search(pool, songs, args):
+    values = np.concatenate([levels for levels, _, _, _ in songs])
+    grids = [np.arange(0, values[:, b].max() + 2 * args.move_speed, args.move_speed) for b in range(3)]
+    levels = [coarse_levels(values[:, b], grids[b], args.coarse) for b in range(3)]
+    # first refinement covers the widest gap between coarse picks
+    radius = max(int(np.diff(lv).max() // args.move_speed) if len(lv) > 1 else 1 for lv in levels)
+
+    best = None
+    for round_ in itertools.count(1):
+        candidates = np.array(list(itertools.product(*levels)), dtype=np.int64)
+        batches = [candidates[i:i + BATCH_SIZE] for i in range(0, len(candidates), BATCH_SIZE)]
+        metrics = np.concatenate(list(pool.map(evaluate, batches)))
+        scores = score(metrics, args.mouth_open, args.eyes_closed, args.max_changes)
+
+        i = int(np.argmin(scores))
+        if best is None or scores[i] < best[1]:
+            best = (candidates[i], scores[i], metrics[i])
+        print(f"  pass {round_}: {len(candidates):5d} candidates, best {best[0].tolist()} score {best[1]:.4f}")
+
+        if radius <= 1:
+            return best
+        radius = max(radius // 4, 1)
+        levels = [refine_levels(grids[b], best[0][b], 4 * radius, args.refine) for b in range(3)]
+
+
+def find_wavs(paths):
+    wavs = []
+    for path in map(Path, paths):
+        wavs.extend(sorted(path.rglob("*.wav")) if path.is_dir() else [path])
+    return wavs
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tune face_selector thresholds against face behaviour targets")
+    parser.add_argument("songs", nargs="+", help="WAV files or directories of them")
+    parser.add_argument("--mouth-open", type=float, default=0.5, help="Target fraction of time with the mouth open")
+    parser.add_argument("--eyes-closed", type=float, help="Target fraction of time with the eyes closed")
+    parser.add_argument("--max-changes", type=float, default=4.0, help="Max face changes per second")
+    parser.add_argument("--hop", type=int, help="frame_buffer HOP in samples (default: POINTS, no overlap)")
+    parser.add_argument("--move-speed", type=int, default=MOVE_SPEED, help="threshold_control MOVE_SPEED")
+    parser.add_argument("--coarse", type=int, default=12, help="Levels per band in the first pass")
+    parser.add_argument("--refine", type=int, default=9, help="Levels per band in each refinement pass")
+    parser.add_argument("--jobs", "-j", type=int, default=os.cpu_count(), help="Worker processes")
+    parser.add_argument("--output", "-o", help="Write the chosen thresholds and metrics as JSON")
+    args = parser.parse_args()
+
+    wavs = find_wavs(args.songs)
+    if not wavs:
+        parser.error("no WAV files found")
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=args.jobs) as pool:
+        songs = list(pool.map(partial(analyze_song, hop=args.hop), wavs))
+    print(f"Analyzed {len(wavs)} song(s) in {time.perf_counter() - start:.2f}s")
+
+    with ProcessPoolExecutor(max_workers=args.jobs, initializer=init_worker, initargs=(songs,)) as pool:
+        thresholds, best_score, metrics = search(pool, songs, args)
+    print(f"Search finished in {time.perf_counter() - start:.2f}s")
+
+    low, mid, high = (int(t) for t in thresholds)
+    print(f"\nThresholds: low {low}, mid {mid}, high {high} (score {best_score:.4f})")
+    for wav, (mouth, eyes, changes) in zip(wavs, metrics):
+        print(f"  {wav.name:<40} mouth open {100 * mouth:5.1f}%  eyes closed {100 * eyes:5.1f}%  "
+              f"{changes:5.2f} changes/s")
+    if max(low, mid, high) >= BAR_REGION_HEIGHT:
+        print(f"Note: thresholds above {BAR_REGION_HEIGHT - 1} are past the top of the HDMI bars "
+              f"and can't be reached with the up button")
+    print("\nthreshold_control parameters:")
+    print(f"    .BAR_REGION_HEIGHT({BAR_REGION_HEIGHT}), .MOVE_SPEED({args.move_speed}),")
+    print(f"    .LOW_DEFAULT({low}), .MIDDLE_DEFAULT({mid}), .HIGH_DEFAULT({high})")
+
+    if args.output:
+        result = {
+            "low_threshold": low,
+            "middle_threshold": mid,
+            "high_threshold": high,
+            "score": float(best_score),
+            "targets": {"mouth_open": args.mouth_open, "eyes_closed": args.eyes_closed,
+                        "max_changes": args.max_changes},
+            "songs": {str(wav): {"mouth_open": float(m[0]), "eyes_closed": float(m[1]),
+                                 "changes_per_s": float(m[2])} for wav, m in zip(wavs, metrics)},
+        }
+        Path(args.output).write_text(json.dumps(result, indent=2) + "\n")
+        print(f"wrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""Chunked, memory-mapped WAV reader.
+
+Only the RIFF header is parsed up front; sample data is mapped with
+np.memmap and converted a chunk at a time, so a whole song never has to sit
+in memory the way wavfile.read() leaves it.
+
+Samples come back as int64 arrays shaped (frames, channels), scaled to the
+24-bit words the I2S ADC delivers (full scale maps to full scale: 16-bit
+PCM is shifted up by 8, 32-bit down by 8, float is scaled by 2**23).
+"""
+import struct
+from pathlib import Path
+
+import numpy as np
+
+SAMPLE_WIDTH = 24
+
+WAVE_FORMAT_PCM = 0x0001
+WAVE_FORMAT_IEEE_FLOAT = 0x0003
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+
+class WavStream:
+    def __init__(self, path):
+        self.path = Path(path)
+        self._parse_header()
+
+    def _parse_header(self):
+        with open(self.path, "rb") as f:
+            riff, _, wave = struct.unpack("<4sI4s", f.read(12))
+            if riff != b"RIFF" or wave != b"WAVE":
+                raise ValueError(f"{self.path} is not a RIFF/WAVE file")
+
+            fmt = None
+            while True:
+                header = f.read(8)
+                if len(header) < 8:
+                    raise ValueError(f"{self.path} has no data chunk")
+                chunk_id, size = struct.unpack("<4sI", header)
+                if chunk_id == b"fmt ":
+                    fmt = f.read(size)
+                elif chunk_id == b"data":
+                    self.data_offset = f.tell()
+                    data_size = size
+                    break
+                else:
+                    f.seek(size, 1)
+                # chunks are word aligned
+                if size % 2:
+                    f.seek(1, 1)
+
+        if fmt is None:
+            raise ValueError(f"{self.path} has no fmt chunk before its data")
+
+        audio_format, self.channels, self.sample_rate, _, block_align, self.bits = struct.unpack("<HHIIHH", fmt[:16])
+        if audio_format == WAVE_FORMAT_EXTENSIBLE:
+            audio_format = struct.unpack("<H", fmt[24:26])[0]
+        if audio_format not in (WAVE_FORMAT_PCM, WAVE_FORMAT_IEEE_FLOAT):
+            raise ValueError(f"unsupported WAV format 0x{audio_format:04x}")
+        self.is_float = audio_format == WAVE_FORMAT_IEEE_FLOAT
+        if self.is_float and self.bits not in (32, 64):
+            raise ValueError(f"unsupported float sample width {self.bits}")
+        if not self.is_float and self.bits not in (8, 16, 24, 32):
+            raise ValueError(f"unsupported PCM sample width {self.bits}")
+
+        self.block_align = block_align
+        # a truncated file just has fewer frames than the header claims
+        file_size = self.path.stat().st_size
+        self.frames = min(data_size, file_size - self.data_offset) // block_align
+
+    @property
+    def duration(self):
+        return self.frames / self.sample_rate
+
+    def _map(self):
+        if self.frames == 0:
+            return np.zeros((0, self.channels), dtype=np.int64)
+        if self.bits == 24 and not self.is_float:
+            return np.memmap(self.path, dtype=np.uint8, mode="r", offset=self.data_offset,
+                             shape=(self.frames, self.channels, 3))
+        dtype = {8: "u1", 16: "<i2", 32: "<f4" if self.is_float else "<i4", 64: "<f8"}[self.bits]
+        return np.memmap(self.path, dtype=dtype, mode="r", offset=self.data_offset,
+                         shape=(self.frames, self.channels))
+
+    def _to_24bit(self, raw):
+        if self.is_float:
+            scaled = np.round(np.asarray(raw, dtype=np.float64) * (1 << (SAMPLE_WIDTH - 1)))
+            lo, hi = -(1 << (SAMPLE_WIDTH - 1)), (1 << (SAMPLE_WIDTH - 1)) - 1
+            return np.clip(scaled, lo, hi).astype(np.int64)
+        if self.bits == 24:
+            b = raw.astype(np.int64)
+            val = b[..., 0] | (b[..., 1] << 8) | (b[..., 2] << 16)
+            return val - ((val & 0x800000) << 1)
+        val = np.asarray(raw, dtype=np.int64)
+        if self.bits == 8:
+            return (val - 128) << 16
+        if self.bits == 16:
+            return val << 8
+        return val >> 8
+
+    def read(self, start=0, count=None):
+        """Frames [start, start + count) as (count, channels) 24-bit ints."""
+        end = self.frames if count is None else min(self.frames, start + count)
+        return self._to_24bit(self._map()[start:end])
+
+    def chunks(self, chunk_frames=1 << 16):
+        """Yield consecutive (n, channels) 24-bit blocks covering the whole file."""
+        data = self._map()
+        for start in range(0, self.frames, chunk_frames):
+            yield self._to_24bit(data[start:start + chunk_frames])
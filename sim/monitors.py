@@ -0,0 +1,286 @@
+"""Edge-triggered waits, monitors and drivers for the cocotb testbenches.
+
+A `while dut.x.value == 0: await RisingEdge(dut.clk)` loop costs one GPI
+callback (and one trip through the scheduler) per clock for as long as it
+waits. Everything here waits on the edges that matter instead:
+
+    await wait_for(dut.busy, 0)              # one callback, however long busy is
+    await wait_cycles(dut.clk, 5000)         # a Timer instead of 5000 edges
+    mon = StreamMonitor(dut.clk, dut.data_out_valid, dut.audio_data_out)
+    await mon.wait_count(512)                # mon.items holds the beats
+
+wait_for() resumes in the time step the signal changes, which for a
+registered signal is the clock edge that set it: up to one clock earlier
+than a polling loop (which only sees the new value at the following edge).
+
+Set MONITOR_POLLING=1 to fall back to clock-by-clock polling everywhere,
+and decorate a test with count_callbacks to see the difference in its log:
+
+    @cocotb.test()
+    @count_callbacks
+    async def test_frame_buffer(dut):
+        ...
+"""
+import functools
+import os
+
+import cocotb
+from cocotb.clock import Clock
+from cocotb.triggers import ClockCycles, Edge, Event, RisingEdge, Timer
+from cocotb.utils import get_sim_time
+
+POLLING = os.getenv("MONITOR_POLLING", "0") == "1"
+
+# wait_cycles() only swaps edges for a Timer when it saves at least this many
+TIMER_MIN_CYCLES = 8
+
+# clock handle name -> (period_ps, start_ps), filled in by start_clock()
+_clocks = {}
+
+
+def start_clock(clk, period_ns=10):
+    """Start a Clock on `clk` and remember its period and phase for wait_cycles()."""
+    _clocks[clk._path] = (int(period_ns * 1000), get_sim_time("ps"))
+    return cocotb.start_soon(Clock(clk, period_ns, units="ns").start())
+
+
+def _matches(signal, value):
+    current = signal.value
+    return current.is_resolvable and int(current) == value
+
+
+async def wait_for(signal, value=1, clk=None):
+    """Return once `signal` reads `value`, waking only when the signal changes.
+
+    `clk` is only used in MONITOR_POLLING mode.
+    """
+    if POLLING and clk is not None:
+        while not _matches(signal, value):
+            await RisingEdge(clk)
+        return
+    while not _matches(signal, value):
+        await Edge(signal)
+
+
+async def wait_cycles(clk, cycles):
+    """ClockCycles(clk, cycles), but with one Timer instead of a callback per edge.
+
+    Falls back to ClockCycles for clocks not started with start_clock() and
+    for short waits. Like ClockCycles it resumes on a rising edge of clk.
+    """
+    timing = _clocks.get(clk._path)
+    if POLLING or timing is None or cycles < TIMER_MIN_CYCLES:
+        await ClockCycles(clk, cycles)
+        return
+    period, start = timing
+    now = get_sim_time("ps")
+    # rising edges sit at start + k * period; aim half a period before the
+    # cycles-th one and let RisingEdge land on it exactly
+    target = start + ((now - start) // period + cycles) * period
+    await Timer(target - now - period // 2, units="ps")
+    await RisingEdge(clk)
+
+
+async def drive_stream(clk, valid, signals, values):
+    """Drive one beat per clock with `valid` high, then drop valid.
+
+    `signals` is a handle (values are ints) or a tuple of handles (values
+    are tuples of ints).
+    """
+    single = not isinstance(signals, (tuple, list))
+    valid.value = 1
+    for beat in values:
+        if single:
+            signals.value = beat
+        else:
+            for signal, value in zip(signals, beat):
+                signal.value = value
+        await RisingEdge(clk)
+    valid.value = 0
+
+
+class StreamMonitor:
+    """Collects the data on every clock where `valid` (and `ready`, if given) is high.
+
+    Idle time costs a single edge callback; only the cycles inside a burst
+    are sampled. Beats are ints, or tuples of ints for a tuple of signals.
+    """
+
+    def __init__(self, clk, valid, data, ready=None):
+        self.clk = clk
+        self.valid = valid
+        self.ready = ready
+        self.data = data
+        self.items = []
+        self._wanted = None
+        self._event = Event()
+        self._task = cocotb.start_soon(self._run())
+
+    def _sample(self):
+        if isinstance(self.data, (tuple, list)):
+            return tuple(int(d.value) for d in self.data)
+        return int(self.data.value)
+
+    async def _run(self):
+        while True:
+            await wait_for(self.valid, 1, self.clk)
+            # values read at the edge are the ones the edge samples
+            while True:
+                await RisingEdge(self.clk)
+                if not _matches(self.valid, 1):
+                    break
+                if self.ready is not None and not _matches(self.ready, 1):
+                    continue
+                self.items.append(self._sample())
+                if self._wanted is not None and len(self.items) >= self._wanted:
+                    self._event.set()
+
+    async def wait_count(self, count):
+        """Wait until at least `count` beats have been collected in total."""
+        if len(self.items) >= count:
+            return
+        self._wanted = count
+        self._event.clear()
+        await self._event.wait()
+        self._wanted = None
+
+    def clear(self):
+        self.items = []
+
+    def stop(self):
+        self._task.kill()
+
+
+class BusyMonitor:
+    """Records (start_ns, end_ns) for every high pulse of a busy flag, from its edges alone."""
+
+    def __init__(self, busy, clk=None):
+        self.busy = busy
+        self.clk = clk
+        self.transactions = []
+        self._done = Event()
+        self._task = cocotb.start_soon(self._run())
+
+    async def _run(self):
+        while True:
+            await wait_for(self.busy, 1, self.clk)
+            start = get_sim_time("ns")
+            await wait_for(self.busy, 0, self.clk)
+            self.transactions.append((start, get_sim_time("ns")))
+            self._done.set()
+
+    async def wait_idle(self):
+        await wait_for(self.busy, 0, self.clk)
+
+    async def wait_busy(self):
+        await wait_for(self.busy, 1, self.clk)
+
+    async def wait_transaction(self):
+        """Wait for the next busy pulse to finish; returns its (start_ns, end_ns)."""
+        self._done.clear()
+        await self._done.wait()
+        return self.transactions[-1]
+
+    def stop(self):
+        self._task.kill()
+
+
+class EdgeMonitor:
+    """Timestamps (ns) of every rising (or falling) edge of a 1-bit signal, e.g. frame_ready."""
+
+    def __init__(self, signal, rising=True, clk=None):
+        self.signal = signal
+        self.level = 1 if rising else 0
+        self.clk = clk
+        self.times = []
+        self._event = Event()
+        self._task = cocotb.start_soon(self._run())
+
+    async def _run(self):
+        while True:
+            await wait_for(self.signal, 1 - self.level, self.clk)
+            await wait_for(self.signal, self.level, self.clk)
+            self.times.append(get_sim_time("ns"))
+            self._event.set()
+
+    async def wait_next(self):
+        """Wait for the next edge; returns its time in ns."""
+        self._event.clear()
+        await self._event.wait()
+        return self.times[-1]
+
+    def stop(self):
+        self._task.kill()
+
+
+class CallbackCounter:
+    """Counts the simulator callbacks cocotb registers while active.
+
+    Each await on a trigger registers one GPI callback, so this is the
+    number of simulator round trips the test made. Counts are per kind
+    (value change, timer, ...) and logged on exit when a log is given.
+    """
+
+    KINDS = {
+        "register_value_change_callback": "edge",
+        "register_timed_callback": "timer",
+        "register_readonly_callback": "readonly",
+        "register_rwsynch_callback": "readwrite",
+        "register_nextstep_callback": "nextstep",
+    }
+
+    def __init__(self, log=None, label="test"):
+        self.log = log
+        self.label = label
+        self.counts = dict.fromkeys(self.KINDS.values(), 0)
+        self._originals = {}
+
+    @property
+    def total(self):
+        return sum(self.counts.values())
+
+    def start(self):
+        from cocotb import simulator
+
+        for name, kind in self.KINDS.items():
+            original = getattr(simulator, name)
+            self._originals[name] = original
+
+            def counted(*args, _original=original, _kind=kind):
+                self.counts[_kind] += 1
+                return _original(*args)
+
+            setattr(simulator, name, counted)
+        return self
+
+    def stop(self):
+        from cocotb import simulator
+
+        for name, original in self._originals.items():
+            setattr(simulator, name, original)
+        self._originals = {}
+
+    def report(self):
+        detail = ", ".join(f"{kind} {n}" for kind, n in self.counts.items() if n)
+        mode = "polling" if POLLING else "edge-triggered"
+        return f"{self.label}: {self.total} simulator callbacks ({detail}) [{mode}]"
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+        if self.log is not None:
+            self.log.info(self.report())
+        return False
+
+
+def count_callbacks(test):
+    """Decorator for a cocotb test: log the simulator callbacks it made when it finishes."""
+
+    @functools.wraps(test)
+    async def wrapper(dut, *args, **kwargs):
+        with CallbackCounter(dut._log, test.__name__):
+            return await test(dut, *args, **kwargs)
+
+    return wrapper
@@ -0,0 +1,15 @@
+//  Simulation stand-in for the Xilinx OBUFDS differential output buffer.
+`timescale 1ps/1ps
+
+module OBUFDS
+ #(parameter IOSTANDARD = "DEFAULT",
+   parameter SLEW = "SLOW")
+ (output wire O,
+  output wire OB,
+  input  wire I
+ );
+
+  assign O = I;
+  assign OB = ~I;
+
+endmodule
@@ -0,0 +1,81 @@
+//  Simulation stand-in for the Xilinx OSERDESE2, covering what
+//  tmds_serializer uses: DDR output, DATA_WIDTH 10 as a MASTER/SLAVE pair.
+//
+//  The SLAVE passes its D3/D4 through SHIFTOUT1/SHIFTOUT2; the MASTER loads
+//  {SHIFTIN2, SHIFTIN1, D8..D1} on each CLKDIV rising edge and sends it out
+//  of OQ LSB (D1) first, one bit per CLK edge. A new word starts on the
+//  first CLK edge that sees CLKDIV high, so words stay aligned to CLKDIV
+//  however RST is released. Latency is not the hardware's; the bit order
+//  and rate are.
+`timescale 1ps/1ps
+
+module OSERDESE2
+ #(parameter DATA_RATE_OQ = "DDR",
+   parameter DATA_RATE_TQ = "SDR",
+   parameter integer DATA_WIDTH = 10,
+   parameter SERDES_MODE = "MASTER",
+   parameter integer TRISTATE_WIDTH = 1,
+   parameter TBYTE_CTL = "FALSE",
+   parameter TBYTE_SRC = "FALSE")
+ (output reg  OQ,
+  output wire OFB,
+  output wire TQ,
+  output wire TFB,
+  output wire SHIFTOUT1,
+  output wire SHIFTOUT2,
+  output wire TBYTEOUT,
+  input  wire CLK,
+  input  wire CLKDIV,
+  input  wire D1, D2, D3, D4, D5, D6, D7, D8,
+  input  wire TCE,
+  input  wire OCE,
+  input  wire TBYTEIN,
+  input  wire RST,
+  input  wire SHIFTIN1,
+  input  wire SHIFTIN2,
+  input  wire T1, T2, T3, T4
+ );
+
+  reg [9:0] word;
+  reg [9:0] shift;
+  reg last_clkdiv;
+
+  initial begin
+    OQ = 1'b0;
+    word = 10'b0;
+    shift = 10'b0;
+    last_clkdiv = 1'b0;
+  end
+
+  assign SHIFTOUT1 = (SERDES_MODE == "SLAVE") ? D3 : 1'b0;
+  assign SHIFTOUT2 = (SERDES_MODE == "SLAVE") ? D4 : 1'b0;
+  assign OFB = OQ;
+  assign TQ = 1'b0;
+  assign TFB = 1'b0;
+  assign TBYTEOUT = 1'b0;
+
+  always @(posedge CLKDIV) begin
+    if (RST)
+      word <= 10'b0;
+    else
+      word <= {SHIFTIN2, SHIFTIN1, D8, D7, D6, D5, D4, D3, D2, D1};
+  end
+
+  // DDR: a bit on both edges of CLK
+  always @(CLK) begin
+    last_clkdiv <= CLKDIV;
+    if (RST) begin
+      OQ <= 1'b0;
+      shift <= 10'b0;
+    end else if (OCE) begin
+      if (CLKDIV && !last_clkdiv) begin
+        OQ <= word[0];
+        shift <= word >> 1;
+      end else begin
+        OQ <= shift[0];
+        shift <= shift >> 1;
+      end
+    end
+  end
+
+endmodule
@@ -0,0 +1,57 @@
+//  Simulation stand-in for the system clock wizard (hdl/i2s_clk_wiz.v).
+//  Same ports as the generated wrapper, but the MMCME2_ADV/BUFG/IBUF
+//  primitives are replaced by free-running behavioral clocks at the
+//  frequencies the MMCM settings produce from a 100 MHz input:
+//      clk_98  = 100 MHz * 36.125 / 6 / 6.125  (98.299 MHz)
+//      clk_100 = 100 MHz * 36.125 / 6 / 6      (100.347 MHz)
+//  locked rises LOCK_CYCLES input clocks after reset is released.
+//  Only for simulation: build top_level with sim/primitives instead of
+//  hdl/i2s_clk_wiz.v and hdl/hdmi_clk_wiz.v.
+`timescale 1ps/1ps
+
+module design_1_clk_wiz_0_0_clk_wiz
+ #(parameter LOCK_CYCLES = 16)
+ (// Clock out ports
+  output reg    clk_98,
+  output reg    clk_100,
+  // Status and control signals
+  input         reset,
+  output reg    locked,
+  input         clk_in1
+ );
+
+  // CLKIN1_PERIOD * DIVCLK_DIVIDE * CLKOUTn_DIVIDE / CLKFBOUT_MULT_F, in ps
+  localparam real CLK_98_PERIOD  = 10000.0 * 6 * 6.125 / 36.125;
+  localparam real CLK_100_PERIOD = 10000.0 * 6 * 6.000 / 36.125;
+
+  integer ref_cycles;
+
+  initial begin
+    clk_98 = 1'b0;
+    clk_100 = 1'b0;
+    locked = 1'b0;
+    ref_cycles = 0;
+  end
+
+  always begin
+    #(CLK_98_PERIOD / 2.0);
+    clk_98 = ~clk_98;
+  end
+
+  always begin
+    #(CLK_100_PERIOD / 2.0);
+    clk_100 = ~clk_100;
+  end
+
+  always @(posedge clk_in1 or posedge reset) begin
+    if (reset === 1'b1) begin
+      ref_cycles <= 0;
+      locked <= 1'b0;
+    end else if (ref_cycles < LOCK_CYCLES) begin
+      ref_cycles <= ref_cycles + 1;
+    end else begin
+      locked <= 1'b1;
+    end
+  end
+
+endmodule
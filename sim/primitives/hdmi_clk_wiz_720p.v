@@ -0,0 +1,59 @@
+//  Simulation stand-in for the 720p HDMI clock wizard (hdl/hdmi_clk_wiz.v).
+//  The MMCM runs off clk_100 from the system wizard (100.347 MHz):
+//      clk_pixel = clk_ref * 37.125 / 5 / 10  (74.508 MHz)
+//      clk_tmds  = clk_ref * 37.125 / 5 / 2   (5x clk_pixel)
+//  Both outputs of one MMCM are phase aligned, and tmds_serializer relies
+//  on that, so clk_pixel is derived from clk_tmds edges here rather than
+//  from a second delay loop that would drift against it.
+`timescale 1ps/1ps
+
+module hdmi_clk_wiz_720p
+ #(parameter LOCK_CYCLES = 16)
+ (// Clock out ports
+  output reg    clk_pixel,
+  output reg    clk_tmds,
+  // Status and control signals
+  input         reset,
+  output reg    locked,
+  input         clk_ref
+ );
+
+  // clk_ref period * DIVCLK_DIVIDE * CLKOUT1_DIVIDE / CLKFBOUT_MULT_F, in ps
+  localparam real CLK_REF_PERIOD  = 10000.0 * 6 * 6.000 / 36.125;
+  localparam real CLK_TMDS_PERIOD = CLK_REF_PERIOD * 5 * 2 / 37.125;
+
+  integer tmds_edges;
+  integer ref_cycles;
+
+  initial begin
+    clk_pixel = 1'b0;
+    clk_tmds = 1'b0;
+    locked = 1'b0;
+    tmds_edges = 0;
+    ref_cycles = 0;
+  end
+
+  // clk_pixel toggles on every 5th clk_tmds edge: one pixel is 5 tmds periods
+  always begin
+    #(CLK_TMDS_PERIOD / 2.0);
+    clk_tmds = ~clk_tmds;
+    if (tmds_edges == 4) begin
+      tmds_edges = 0;
+      clk_pixel = ~clk_pixel;
+    end else begin
+      tmds_edges = tmds_edges + 1;
+    end
+  end
+
+  always @(posedge clk_ref or posedge reset) begin
+    if (reset === 1'b1) begin
+      ref_cycles <= 0;
+      locked <= 1'b0;
+    end else if (ref_cycles < LOCK_CYCLES) begin
+      ref_cycles <= ref_cycles + 1;
+    end else begin
+      locked <= 1'b1;
+    end
+  end
+
+endmodule
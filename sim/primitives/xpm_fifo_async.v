@@ -0,0 +1,113 @@
+//  Simulation stand-in for the Xilinx XPM asynchronous FIFO.
+//
+//  Covers the configuration top_level uses for the threshold CDC: equal
+//  read/write widths, READ_MODE "std" with FIFO_READ_LATENCY 1. Gray-coded
+//  pointers cross through CDC_SYNC_STAGES flops each way, so empty/full
+//  lag the other side the way the real FIFO's do. The remaining parameters
+//  are accepted so the instantiation elaborates, and are ignored.
+`timescale 1ps/1ps
+
+module xpm_fifo_async
+ #(parameter integer CASCADE_HEIGHT = 0,
+   parameter integer CDC_SYNC_STAGES = 2,
+   parameter DOUT_RESET_VALUE = "0",
+   parameter ECC_MODE = "no_ecc",
+   parameter EN_SIM_ASSERT_ERR = "warning",
+   parameter FIFO_MEMORY_TYPE = "auto",
+   parameter integer FIFO_READ_LATENCY = 1,
+   parameter integer FIFO_WRITE_DEPTH = 2048,
+   parameter integer FULL_RESET_VALUE = 0,
+   parameter integer PROG_EMPTY_THRESH = 10,
+   parameter integer PROG_FULL_THRESH = 10,
+   parameter integer RD_DATA_COUNT_WIDTH = 1,
+   parameter integer READ_DATA_WIDTH = 32,
+   parameter READ_MODE = "std",
+   parameter integer RELATED_CLOCKS = 0,
+   parameter integer SIM_ASSERT_CHK = 0,
+   parameter USE_ADV_FEATURES = "0707",
+   parameter integer WAKEUP_TIME = 0,
+   parameter integer WRITE_DATA_WIDTH = 32,
+   parameter integer WR_DATA_COUNT_WIDTH = 1)
+ (input  wire                        rst,
+  input  wire                        wr_clk,
+  input  wire                        wr_en,
+  input  wire [WRITE_DATA_WIDTH-1:0] din,
+  output wire                        full,
+  input  wire                        rd_clk,
+  input  wire                        rd_en,
+  output reg  [READ_DATA_WIDTH-1:0]  dout,
+  output wire                        empty
+ );
+
+  localparam integer ADDR_WIDTH = $clog2(FIFO_WRITE_DEPTH);
+
+  reg [WRITE_DATA_WIDTH-1:0] mem [0:FIFO_WRITE_DEPTH-1];
+
+  // one extra pointer bit tells full from empty
+  reg [ADDR_WIDTH:0] wr_bin, rd_bin;
+  reg [ADDR_WIDTH:0] wr_gray, rd_gray;
+  reg [ADDR_WIDTH:0] wr_gray_sync [0:CDC_SYNC_STAGES-1];
+  reg [ADDR_WIDTH:0] rd_gray_sync [0:CDC_SYNC_STAGES-1];
+
+  // rst is optional in the instantiation; a floating one reads as released
+  wire reset = (rst === 1'b1);
+
+  wire [ADDR_WIDTH:0] wr_bin_next = wr_bin + 1'b1;
+  wire [ADDR_WIDTH:0] rd_bin_next = rd_bin + 1'b1;
+
+  assign full = (wr_gray == {~rd_gray_sync[CDC_SYNC_STAGES-1][ADDR_WIDTH:ADDR_WIDTH-1],
+                             rd_gray_sync[CDC_SYNC_STAGES-1][ADDR_WIDTH-2:0]});
+  assign empty = (rd_gray == wr_gray_sync[CDC_SYNC_STAGES-1]);
+
+  integer i, j;
+
+  initial begin
+    wr_bin = 0;
+    rd_bin = 0;
+    wr_gray = 0;
+    rd_gray = 0;
+    dout = 0;
+    for (i = 0; i < CDC_SYNC_STAGES; i = i + 1) begin
+      wr_gray_sync[i] = 0;
+      rd_gray_sync[i] = 0;
+    end
+  end
+
+  // write side
+  always @(posedge wr_clk) begin
+    if (reset) begin
+      wr_bin <= 0;
+      wr_gray <= 0;
+    end else if (wr_en && !full) begin
+      mem[wr_bin[ADDR_WIDTH-1:0]] <= din;
+      wr_bin <= wr_bin_next;
+      wr_gray <= wr_bin_next ^ (wr_bin_next >> 1);
+    end
+  end
+
+  always @(posedge wr_clk) begin
+    rd_gray_sync[0] <= reset ? 0 : rd_gray;
+    for (i = 1; i < CDC_SYNC_STAGES; i = i + 1)
+      rd_gray_sync[i] <= reset ? 0 : rd_gray_sync[i-1];
+  end
+
+  // read side: dout updates the cycle after rd_en, as in "std" mode
+  always @(posedge rd_clk) begin
+    if (reset) begin
+      rd_bin <= 0;
+      rd_gray <= 0;
+      dout <= 0;
+    end else if (rd_en && !empty) begin
+      dout <= mem[rd_bin[ADDR_WIDTH-1:0]];
+      rd_bin <= rd_bin_next;
+      rd_gray <= rd_bin_next ^ (rd_bin_next >> 1);
+    end
+  end
+
+  always @(posedge rd_clk) begin
+    wr_gray_sync[0] <= reset ? 0 : wr_gray;
+    for (j = 1; j < CDC_SYNC_STAGES; j = j + 1)
+      wr_gray_sync[j] <= reset ? 0 : wr_gray_sync[j-1];
+  end
+
+endmodule
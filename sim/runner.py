@@ -1,10 +1,199 @@
 #!/usr/bin/env python3
 import argparse
+import ast
 import importlib
-import os
 import sys
+import time
+import xml.etree.ElementTree as ET
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import nullcontext
 from pathlib import Path
 from cocotb.runner import get_runner
+from build_cache import BuildCache
+import hdl_deps
+from static_config import module_config, NotStatic
+
+sim_dir = Path(__file__).resolve().parent
+project_root = sim_dir.parent
+tests_dir = sim_dir / "tests"
+
+# $readmemh paths in the HDL are "../data/X", so simulations have to run one
+# level below a directory with data/ in it. Each job gets its own build dir
+# under here and runs in <build dir>/run next to a link to the project's data/.
+SIM_BUILD = project_root / "sim_build"
+BUILD_CACHE = SIM_BUILD / "cache"
+
+
+def setup_paths():
+    for path in (sim_dir, tests_dir, sim_dir / "model", project_root / "hdl"):
+        if str(path) not in sys.path:
+            sys.path.append(str(path))
+
+
+def find_testcases(test_name):
+    # names of the @cocotb.test() coroutines in a test module, in file order.
+    # Anything this interpreter can't parse just runs as a single job.
+    try:
+        tree = ast.parse((tests_dir / f"{test_name}.py").read_text())
+    except SyntaxError:
+        return []
+    testcases = []
+    for node in tree.body:
+        if not isinstance(node, (ast.AsyncFunctionDef, ast.FunctionDef)):
+            continue
+        for dec in node.decorator_list:
+            func = dec.func if isinstance(dec, ast.Call) else dec
+            if isinstance(func, ast.Attribute) and func.attr == "test" \
+                    and isinstance(func.value, ast.Name) and func.value.id == "cocotb":
+                testcases.append(node.name)
+                break
+    return testcases
+
+
+def is_system_test(test_name):
+    # modules that set SYSTEM = True simulate the whole chip and only run with --system
+    try:
+        tree = ast.parse((tests_dir / f"{test_name}.py").read_text())
+    except SyntaxError:
+        return False
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and any(isinstance(t, ast.Name) and t.id == "SYSTEM" for t in node.targets):
+            return isinstance(node.value, ast.Constant) and node.value.value is True
+    return False
+
+
+def parse_shard(text):
+    try:
+        index, count = (int(x) for x in text.split("/"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"shard must look like i/n, got {text!r}")
+    if count < 1 or not 1 <= index <= count:
+        raise argparse.ArgumentTypeError(f"shard index must be in 1..n, got {text!r}")
+    return index, count
+
+
+def read_results(results_file):
+    # per-testcase (name, passed, wall seconds) from the cocotb xunit file
+    cases = []
+    if not results_file.is_file():
+        return cases
+    for tc in ET.parse(results_file).iter("testcase"):
+        passed = tc.find("failure") is None and tc.find("error") is None
+        cases.append((tc.get("name"), passed, float(tc.get("time", 0.0))))
+    return cases
+
+
+def run_job(job):
+    """Build and run one test module (or one testcase of it). Safe to call in a worker process."""
+    setup_paths()
+    test_name = job["test"]
+    testcase = job["testcase"]
+    job_dir = Path(job["build_dir"])
+    log_dir = job_dir if job["quiet"] else None
+    start = time.perf_counter()
+    result = {"name": job["name"], "status": "PASS", "cases": [], "message": "", "log": None, "cached": False}
+
+    try:
+        # read the build constants from the source; only import modules that compute them
+        try:
+            config = module_config(tests_dir / f"{test_name}.py", job["extra_env"])
+        except NotStatic:
+            config = vars(importlib.import_module(test_name))
+
+        sources = config.get("SOURCES", [])
+        hdl_toplevel = config.get("TOPLEVEL")
+        params = config.get("PARAMS", {})
+        build_args = config.get("BUILD_ARGS", ["-Wall"])
+        timescale = config.get("TIMESCALE", ("1ns", "1ps"))
+        sim_args = config.get("SIM_ARGS", [])
+
+        if not sources or not hdl_toplevel:
+            result["status"] = "SKIP"
+            result["message"] = "missing SOURCES or TOPLEVEL definition"
+            return result
+
+        runner = get_runner(job["sim"])
+        job_dir.mkdir(parents=True, exist_ok=True)
+        # artifacts the tests write (fft_output.png, ...) land in the job's own run dir
+        run_dir = job_dir / "run"
+        run_dir.mkdir(exist_ok=True)
+        data_link = job_dir / "data"
+        if not data_link.exists():
+            data_link.symlink_to(project_root / "data", target_is_directory=True)
+
+        def build(build_dir):
+            runner.build(
+                sources=sources,
+                hdl_toplevel=hdl_toplevel,
+                parameters=params,
+                build_args=build_args,
+                timescale=timescale,
+                waves=job["waves"],
+                build_dir=build_dir,
+                log_file=log_dir / "build.log" if log_dir else None,
+                always=True
+            )
+
+        if job["cache_dir"]:
+            cache = BuildCache(job["cache_dir"], job["cache_bytes"])
+            key = cache.key(job["sim"], sources, hdl_toplevel, params, build_args, timescale, job["waves"])
+            checkout = cache.checkout(key, build)
+        else:
+            build(job_dir)
+            checkout = nullcontext((job_dir, False))
+
+        with checkout as (build_dir, hit):
+            result["cached"] = hit
+            results_file = runner.test(
+                hdl_toplevel=hdl_toplevel,
+                hdl_toplevel_lang="verilog",
+                test_module=test_name,
+                testcase=testcase,
+                test_args=sim_args,
+                extra_env=job["extra_env"],
+                parameters=params,
+                timescale=timescale,
+                waves=job["waves"],
+                build_dir=build_dir,
+                test_dir=run_dir,
+                results_xml=str(job_dir / "results.xml"),
+                log_file=log_dir / "test.log" if log_dir else None
+            )
+
+        result["cases"] = read_results(Path(results_file))
+        if not result["cases"]:
+            result["status"] = "ERROR"
+            result["message"] = "simulation produced no results"
+        elif not all(passed for _, passed, _ in result["cases"]):
+            result["status"] = "FAIL"
+    except (Exception, SystemExit) as e:
+        result["status"] = "ERROR"
+        result["message"] = str(e)
+    finally:
+        result["wall"] = time.perf_counter() - start
+        if log_dir and log_dir.is_dir():
+            result["log"] = str(log_dir)
+
+    return result
+
+
+def print_summary(results, wall):
+    print("\n" + "=" * 76)
+    print(f"{'TEST':<56}{'STATUS':>8}{'WALL (s)':>12}")
+    print("-" * 76)
+    for res in results:
+        name = res["name"] + (" (cached build)" if res["cached"] else "")
+        print(f"{name:<56}{res['status']:>8}{res['wall']:>12.2f}")
+        for case, passed, case_time in res["cases"]:
+            print(f"    {case:<52}{'PASS' if passed else 'FAIL':>8}{case_time:>12.2f}")
+        if res["message"]:
+            print(f"    {res['message']}")
+        if res["status"] != "PASS" and res["log"]:
+            print(f"    logs: {res['log']}")
+    print("-" * 76)
+    counts = {s: sum(r["status"] == s for r in results) for s in ("PASS", "FAIL", "ERROR", "SKIP")}
+    print(", ".join(f"{n} {s.lower()}" for s, n in counts.items() if n) + f" in {wall:.2f}s")
+
 
 def main():
     parser = argparse.ArgumentParser(description="Generic Cocotb Test Runner")
@@ -12,58 +201,107 @@ def main():
     parser.add_argument("--exclude", "-x", nargs="+", help="Test modules to exclude")
     parser.add_argument("--sim", default="icarus", help="Simulator: icarus, verilator, etc.")
     parser.add_argument("--waves", action="store_true", help="Enable waveform dumping")
+    parser.add_argument("--jobs", "-j", type=int, default=1, help="Number of tests to run in parallel")
+    parser.add_argument("--split-testcases", action="store_true",
+                        help="Schedule each @cocotb.test inside a module as its own job")
+    parser.add_argument("--shard", type=parse_shard, metavar="I/N",
+                        help="Only run the I-th of N round-robin slices of the jobs (1-based)")
+    parser.add_argument("--vectors", type=int,
+                        help="Number of random vectors for tests that read NUM_VECTORS (e.g. test_butterfly)")
+    parser.add_argument("--system", action="store_true",
+                        help="Run the full top_level system tests (built with the sim/primitives stand-ins) "
+                             "instead of the block tests")
+    parser.add_argument("--changed", action="store_true",
+                        help="Only run tests whose SOURCES, HDL dependencies or Python helpers changed "
+                             "since the last green run (see sim/hdl_deps.py)")
+    parser.add_argument("--since", metavar="REF", help="With --changed, diff against this git ref instead")
+    parser.add_argument("--no-cache", action="store_true", help="Always rebuild, bypassing the build cache")
+    parser.add_argument("--cache-size", type=int, default=1024, help="Build cache size cap in MB (LRU eviction)")
     args = parser.parse_args()
 
-    sim_dir = Path(__file__).resolve().parent
-    project_root = sim_dir.parent
-    tests_dir = sim_dir / "tests"
-    sys.path.append(str(tests_dir))
-    sys.path.append(str(project_root / "hdl"))
+    setup_paths()
 
-    all_tests = [
+    all_tests = sorted(
         f.stem for f in tests_dir.glob("test_*.py")
         if f.is_file() and not f.stem.startswith("__")
-    ]
+    )
 
-    selected = args.test or all_tests
+    if args.test:
+        selected = args.test
+    else:
+        selected = [t for t in all_tests if is_system_test(t) == args.system]
     if args.exclude:
         selected = [t for t in selected if t not in args.exclude]
 
-    print(f"Running tests: {selected}")
+    green_kind = "system" if args.system else "block"
+    if args.changed:
+        green = {"commit": args.since, "time": 0.0} if args.since else hdl_deps.load_green(green_kind)
+        changed = hdl_deps.changed_since(green)
+        deps = hdl_deps.dependency_map(tests_dir / f"{t}.py" for t in selected)
+        skipped = len(selected)
+        selected = hdl_deps.affected(selected, changed, deps)
+        skipped -= len(selected)
+        if changed is None:
+            print("No green run recorded yet, running everything")
+        else:
+            print(f"{len(changed)} changed file(s), {skipped} unaffected test module(s) skipped")
 
+    extra_env = {}
+    if args.vectors is not None:
+        extra_env["NUM_VECTORS"] = str(args.vectors)
+
+    jobs = []
     for test_name in selected:
-        mod = importlib.import_module(test_name)
-        print(f"\nRunning {test_name}...")
+        testcases = find_testcases(test_name) if args.split_testcases else []
+        for testcase in testcases or [None]:
+            name = f"{test_name}::{testcase}" if testcase else test_name
+            jobs.append({
+                "name": name,
+                "test": test_name,
+                "testcase": testcase,
+                "sim": args.sim,
+                "waves": args.waves,
+                "build_dir": str(SIM_BUILD / name.replace("::", "__")),
+                "quiet": args.jobs > 1,
+                "cache_dir": None if args.no_cache else str(BUILD_CACHE),
+                "cache_bytes": args.cache_size << 20,
+                "extra_env": extra_env,
+            })
 
-        sources = getattr(mod, "SOURCES", [])
-        hdl_toplevel = getattr(mod, "TOPLEVEL", None)
-        params = getattr(mod, "PARAMS", {})
-        build_args = getattr(mod, "BUILD_ARGS", ["-Wall"])
-        timescale = getattr(mod, "TIMESCALE", ("1ns", "1ps"))
-        test_module = test_name
-        sim_args = getattr(mod, "SIM_ARGS", [])
+    if args.shard:
+        index, count = args.shard
+        jobs = jobs[index - 1::count]
 
-        if not sources or not hdl_toplevel:
-            print(f"{test_name} missing SOURCES or TOPLEVEL definition.")
-            continue
+    print(f"Running tests: {[job['name'] for job in jobs]}")
+
+    start = time.perf_counter()
+    results = []
+    if args.jobs > 1:
+        with ProcessPoolExecutor(max_workers=args.jobs) as pool:
+            futures = {pool.submit(run_job, job): job for job in jobs}
+            for future in as_completed(futures):
+                res = future.result()
+                print(f"[{len(results) + 1}/{len(jobs)}] {res['name']}: {res['status']} ({res['wall']:.2f}s)")
+                results.append(res)
+        order = {job["name"]: i for i, job in enumerate(jobs)}
+        results.sort(key=lambda r: order[r["name"]])
+    else:
+        for job in jobs:
+            print(f"\nRunning {job['name']}...")
+            results.append(run_job(job))
+
+    print_summary(results, time.perf_counter() - start)
+
+    if not args.no_cache and BUILD_CACHE.is_dir():
+        evicted = BuildCache(BUILD_CACHE, args.cache_size << 20).evict()
+        if evicted:
+            print(f"Evicted {len(evicted)} cached build(s) to stay under {args.cache_size} MB")
 
-        runner = get_runner(args.sim)
-        runner.build(
-            sources=sources,
-            hdl_toplevel=hdl_toplevel,
-            parameters=params,
-            build_args=build_args,
-            timescale=timescale,
-            waves=args.waves,
-            always=True
-        )
-
-        runner.test(
-            hdl_toplevel=hdl_toplevel,
-            test_module=test_module,
-            test_args=sim_args,
-            waves=args.waves
-        )
+    if any(r["status"] in ("FAIL", "ERROR") for r in results):
+        sys.exit(1)
+    # only a run over the whole test set (or everything --changed picked) moves the marker
+    if not (args.test or args.exclude or args.shard or args.since):
+        hdl_deps.save_green(green_kind)
 
 if __name__ == "__main__":
     main()
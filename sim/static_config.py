@@ -0,0 +1,152 @@
+"""Reads a test module's build constants (SOURCES, TOPLEVEL, PARAMS, ...) without importing it.
+
+Importing a test module pulls in cocotb, matplotlib, the models and whatever
+stimulus it builds at module level, which runner.py paid for on every job
+just to learn what to compile. Instead the module-level assignments are
+evaluated from the AST, in order, with a small whitelist: literals, names
+assigned earlier, arithmetic and `/` on paths, Path(__file__) and its
+resolve/parent/parents/glob, sorted/int/float/str/len/range, os.getenv and
+os.path helpers, json.loads and dict.get. `import os`, `import json`,
+`from pathlib import Path` bind the real things; every other import binds
+nothing.
+
+An assignment that uses anything else just leaves its name unknown. Only
+asking for an unknown constant raises NotStatic; the caller then falls back
+to importing the module.
+
+    config = module_config(tests_dir / "test_fft.py")
+    config["SOURCES"], config["PARAMS"]
+"""
+import ast
+import json
+import operator
+import os
+from pathlib import Path, PurePath
+
+CONSTANTS = ("SOURCES", "TOPLEVEL", "PARAMS", "BUILD_ARGS", "TIMESCALE", "SIM_ARGS")
+
+MODULES = {"os": os, "json": json}
+FROM_IMPORTS = {("pathlib", "Path"): Path}
+
+BIN_OPS = {
+    ast.Add: operator.add, ast.Sub: operator.sub, ast.Mult: operator.mul, ast.Div: operator.truediv,
+    ast.FloorDiv: operator.floordiv, ast.Mod: operator.mod, ast.Pow: operator.pow,
+    ast.LShift: operator.lshift, ast.RShift: operator.rshift,
+}
+UNARY_OPS = {ast.USub: operator.neg, ast.UAdd: operator.pos, ast.Not: operator.not_}
+
+PATH_ATTRS = {"resolve", "parent", "parents", "name", "stem", "suffix", "glob", "with_suffix"}
+MODULE_ATTRS = {os: {"getenv", "environ", "path"}, os.path: {"join", "dirname", "abspath", "basename"},
+                json: {"loads"}}
+DICT_ATTRS = {"get"}
+BUILTINS = {"sorted": sorted, "int": int, "float": float, "str": str, "len": len, "range": range,
+            "list": list, "tuple": tuple, "dict": dict}
+
+
+class NotStatic(Exception):
+    pass
+
+
+class _Unknown:
+    pass
+
+
+UNKNOWN = _Unknown()
+
+
+class _Evaluator:
+    def __init__(self, path, env):
+        self.env = env
+        self.names = {"__file__": str(path), **BUILTINS}
+
+    def getenv(self, key, default=None):
+        return self.env.get(key, default)
+
+    def eval(self, node):
+        if isinstance(node, ast.Constant):
+            return node.value
+        if isinstance(node, ast.Name):
+            if self.names.get(node.id, UNKNOWN) is UNKNOWN:
+                raise NotStatic(node.id)
+            return self.names[node.id]
+        if isinstance(node, (ast.List, ast.Tuple)):
+            items = [self.eval(e) for e in node.elts]
+            return items if isinstance(node, ast.List) else tuple(items)
+        if isinstance(node, ast.Dict):
+            if any(k is None for k in node.keys):
+                raise NotStatic("dict unpacking")
+            return {self.eval(k): self.eval(v) for k, v in zip(node.keys, node.values)}
+        if isinstance(node, ast.BinOp) and type(node.op) in BIN_OPS:
+            return BIN_OPS[type(node.op)](self.eval(node.left), self.eval(node.right))
+        if isinstance(node, ast.UnaryOp) and type(node.op) in UNARY_OPS:
+            return UNARY_OPS[type(node.op)](self.eval(node.operand))
+        if isinstance(node, ast.Subscript):
+            return self.eval(node.value)[self.eval(node.slice)]
+        if isinstance(node, ast.Attribute):
+            return self.attribute(self.eval(node.value), node.attr)
+        if isinstance(node, ast.Call):
+            # only whitelisted callables are reachable through eval()
+            func = self.eval(node.func)
+            args = [self.eval(a) for a in node.args]
+            kwargs = {k.arg: self.eval(k.value) for k in node.keywords if k.arg}
+            return func(*args, **kwargs)
+        raise NotStatic(type(node).__name__)
+
+    def attribute(self, obj, attr):
+        if isinstance(obj, PurePath) and attr in PATH_ATTRS:
+            return getattr(obj, attr)
+        if isinstance(obj, dict) and attr in DICT_ATTRS:
+            return getattr(obj, attr)
+        if obj is os and attr == "getenv":
+            return self.getenv
+        if obj is os and attr == "environ":
+            return dict(self.env)
+        if any(obj is module for module in MODULE_ATTRS) and attr in MODULE_ATTRS[obj]:
+            return getattr(obj, attr)
+        raise NotStatic(f"{type(obj).__name__}.{attr}")
+
+    def run(self, tree):
+        for node in tree.body:
+            if isinstance(node, ast.Import):
+                for alias in node.names:
+                    name = alias.asname or alias.name.split(".")[0]
+                    self.names[name] = MODULES.get(alias.name, UNKNOWN)
+            elif isinstance(node, ast.ImportFrom):
+                for alias in node.names:
+                    self.names[alias.asname or alias.name] = FROM_IMPORTS.get((node.module, alias.name), UNKNOWN)
+            elif isinstance(node, (ast.Assign, ast.AnnAssign)) and node.value is not None:
+                targets = node.targets if isinstance(node, ast.Assign) else [node.target]
+                try:
+                    value = self.eval(node.value)
+                except (NotStatic, LookupError, TypeError, ValueError, AttributeError, OSError):
+                    value = UNKNOWN
+                for target in targets:
+                    if isinstance(target, ast.Name):
+                        self.names[target.id] = value
+            elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+                self.names[node.name] = UNKNOWN
+
+
+def module_config(path, extra_env=None, names=CONSTANTS):
+    """{name: value} for the constants in `names` the module assigns at top level.
+
+    Constants the module never assigns are left out (runner.py applies its
+    defaults); one that's assigned but can't be evaluated raises NotStatic.
+    `extra_env` is layered over os.environ for os.getenv, as the simulator
+    would see it.
+    """
+    path = Path(path)
+    try:
+        tree = ast.parse(path.read_text())
+    except SyntaxError as e:
+        raise NotStatic(str(e))
+    evaluator = _Evaluator(path.resolve(), {**os.environ, **(extra_env or {})})
+    evaluator.run(tree)
+    config = {}
+    for name in names:
+        if name not in evaluator.names:
+            continue
+        if evaluator.names[name] is UNKNOWN:
+            raise NotStatic(f"{path.name}: can't evaluate {name} statically")
+        config[name] = evaluator.names[name]
+    return config
@@ -0,0 +1,51 @@
+"""pytest checks for build_cache.py's locking (no simulator needed).
+
+    python -m pytest sim/test_build_cache.py
+"""
+import sys
+import time
+from multiprocessing import get_context
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent))
+from build_cache import BuildCache  # noqa: E402
+
+KEY = "fft_core-0123456789abcdef"
+SIM_SECONDS = 1.0
+
+
+def build(build_dir):
+    (build_dir / "builds").mkdir()
+    time.sleep(0.2)
+
+
+def checkout_job(root):
+    # one runner job: check the key out and "simulate" for SIM_SECONDS
+    with BuildCache(root, 1 << 30).checkout(KEY, build) as (path, hit):
+        start = time.monotonic()
+        time.sleep(SIM_SECONDS)
+        return start, time.monotonic(), hit, len(list(path.glob("builds")))
+
+
+def run_jobs(root, count):
+    with get_context("fork").Pool(count) as pool:
+        return pool.map(checkout_job, [root] * count)
+
+
+def test_same_key_hits_overlap(tmp_path):
+    """Jobs that share a built entry simulate at the same time, not one after another"""
+    with BuildCache(tmp_path, 1 << 30).checkout(KEY, build) as (_, hit):
+        assert not hit
+    results = run_jobs(tmp_path, 2)
+    (start_a, end_a, hit_a, _), (start_b, end_b, hit_b, _) = results
+    assert hit_a and hit_b
+    assert max(start_a, start_b) < min(end_a, end_b), f"checkouts ran serially: {results}"
+
+
+def test_same_key_miss_builds_once(tmp_path):
+    """Jobs racing on a missing entry build it once and then still run side by side"""
+    results = run_jobs(tmp_path, 3)
+    assert sum(not hit for _, _, hit, _ in results) == 1, results
+    assert all(builds == 1 for *_, builds in results)
+    starts, ends = [r[0] for r in results], [r[1] for r in results]
+    assert max(starts) < min(ends), f"checkouts ran serially: {results}"
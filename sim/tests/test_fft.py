@@ -1,10 +1,10 @@
 import cocotb
-from cocotb.clock import Clock
-from cocotb.triggers import ClockCycles, RisingEdge
 import numpy as np
 from pathlib import Path
-from fxpmath import Fxp
-import matplotlib.pyplot as plt
+from FixedPoint import FixedPoint
+from fft_driver import FFTCoreDriver
+from fft_model import FFTCoreModel
+from monitors import count_callbacks
 
 
 proj_path = Path(__file__).resolve().parents[1].parent
@@ -54,11 +54,7 @@ def generate_fxp_sine_wave_samples(frequency_hz, duration_s, sampling_rate_hz=44
     t = np.linspace(0., duration_s, POINTS, endpoint=False)
     val_floats = np.sin(2. * np.pi * frequency_hz * t) * amplitude
 
-    samples_fxp = [Fxp(val, True, DATA_WIDTH, DATA_FRAC_BITS) for val in val_floats]
-        
-    return samples_fxp
-
-samples = generate_fxp_sine_wave_samples(360, 1, 48000, 4)
+    return FixedPoint.from_float(val_floats, DATA_WIDTH, DATA_FRAC_BITS)
 
 # samples = []
 
@@ -86,57 +82,28 @@ samples = generate_fxp_sine_wave_samples(360, 1, 48000, 4)
 #     val_fxp = Fxp(val, True, DATA_WIDTH, DATA_FRAC_BITS)
 #     samples.append(val_fxp)
 
-def fixed_to_float(val, width=DATA_WIDTH, frac_bits=DATA_FRAC_BITS):
-    if (not val.is_resolvable):
-        return 0
-    # Mask to width bits first
-    val = int(val) & ((1 << width) - 1)
-    # Then sign extend
-    if (val & (1 << (width - 1))):
-        val -= (1 << width)
-    return val / (2**frac_bits)
-
 @cocotb.test()
+@count_callbacks
 async def basic_test(dut):
-    dut.input_data_im.value = 0
-    cocotb.start_soon(Clock(dut.clk, 10, units="ns").start())
-    dut.rst.value = 1
-    await ClockCycles(dut.clk, 5)
-    dut.rst.value = 0
-    await ClockCycles(dut.clk, 1)
-    dut.start_fft.value = 1
-    await ClockCycles(dut.clk, 1)
-    dut.start_fft.value = 0
-    await RisingEdge(dut.load_read_en)
-    await ClockCycles(dut.clk, 1)
-    current_sample = 0
-    while current_sample < POINTS:
-        await RisingEdge(dut.clk)
-        if dut.load_read_en.value == 1:
-            dut.input_data_re.value = int(samples[current_sample].val.item())
-            dut.input_data_valid.value = 1
-            current_sample += 1
-        else:
-            dut.input_data_valid.value = 0
-    await RisingEdge(dut.clk)
-    dut.input_data_valid.value = 0
-    # await ClockCycles(dut.clk, 100)
-    await RisingEdge(dut.fft_done)
-    await ClockCycles(dut.clk, 5)
-
-    low_mag = int(dut.low_magnitude.value) / (2**DATA_FRAC_BITS)
-    mid_mag = int(dut.mid_magnitude.value) / (2**DATA_FRAC_BITS)
-    high_mag = int(dut.high_magnitude.value) / (2**DATA_FRAC_BITS)
-
-    out = []
-
-    for addr in range(POINTS):
-        dut.read_addr.value = addr
-        await ClockCycles(dut.clk, 5)
-        if (dut.read_data_re.value == "xxxxxxxxxxxxxxxxxxxxxxxx"):
-            dut._log.info(f"Addr: {addr}, out_re: {dut.read_data_re.value}, out_im: {dut.read_data_im.value}")
-        out.append(complex(fixed_to_float(dut.read_data_re.value), fixed_to_float(dut.read_data_im.value)))
-    input_signal = np.array([float(s) for s in samples], dtype=float)
+    # built here rather than at import, so discovery doesn't pay for it
+    samples = generate_fxp_sine_wave_samples(360, 1, 48000, 4)
+    fft = FFTCoreDriver(dut, POINTS, DATA_WIDTH, DATA_FRAC_BITS)
+    await fft.reset()
+    out_re, out_im = await fft.run(samples[:POINTS])
+    rec_bands = fft.bands()
+
+    low_mag = rec_bands[0] / (2**DATA_FRAC_BITS)
+    mid_mag = rec_bands[1] / (2**DATA_FRAC_BITS)
+    high_mag = rec_bands[2] / (2**DATA_FRAC_BITS)
+    out = out_re.to_float() + 1j * out_im.to_float()
+
+    # bit-exact check against the fixed-point model of fft_core
+    exp_re, exp_im, exp_bands = FFTCoreModel().process(samples.raw[:POINTS])
+    mismatches = np.flatnonzero((out_re.raw != exp_re[0]) | (out_im.raw != exp_im[0]))
+    assert len(mismatches) == 0, f"{len(mismatches)} bins differ from the model, first: {mismatches[:8]}"
+    assert rec_bands == exp_bands[0].tolist(), f"Band magnitudes {rec_bands} != model {exp_bands[0].tolist()}"
+
+    input_signal = samples.to_float()
     expected_fft = np.fft.fft(input_signal, 512)
     dut._log.info(f"{out}")
     dut._log.info(f"===================================")
@@ -162,6 +129,7 @@ async def basic_test(dut):
     dut._log.info(f"Expected LOW: {expected_low}, MID: {expected_mid}, HIGH: {expected_high}")
     dut._log.info(f"Received LOW: {low_mag}, MID: {mid_mag}, HIGH: {high_mag}")
 
+    import matplotlib.pyplot as plt
     plt.figure(figsize=(12, 5))
 
     plt.subplot(1, 2, 1)
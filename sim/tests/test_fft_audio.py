@@ -1,12 +1,11 @@
 import cocotb
-from cocotb.clock import Clock
-from cocotb.triggers import ClockCycles, RisingEdge
 import numpy as np
 from pathlib import Path
-from fxpmath import Fxp
-import matplotlib.pyplot as plt
-from scipy.io import wavfile
+from FixedPoint import FixedPoint
+from fft_driver import FFTCoreDriver
+from fft_model import FFTCoreModel
 import os
+from monitors import count_callbacks
 
 
 proj_path = Path(__file__).resolve().parents[1].parent
@@ -29,69 +28,46 @@ DATA_FRAC_BITS = 16
 
 script_dir = os.path.dirname(os.path.abspath(__file__))
 data_path = os.path.join(script_dir,  'data', 'christmas.wav')
-sample_rate, data = wavfile.read(data_path)
-if len(data.shape) > 1:
-    data = data[:, 0]
 
-samples = data[3000:3512]
 
-samples_scaled = samples / 256.0
+def load_samples():
+    # read at test time, so discovering this module doesn't load scipy or the WAV
+    from scipy.io import wavfile
+    sample_rate, data = wavfile.read(data_path)
+    if len(data.shape) > 1:
+        data = data[:, 0]
 
-samples = Fxp(samples_scaled, signed=True, n_word=24, n_frac=16)
+    samples = data[3000:3512]
+
+    samples_scaled = samples / 256.0
+
+    return FixedPoint.from_float(samples_scaled, DATA_WIDTH, DATA_FRAC_BITS)
 
-def fixed_to_float(val, width=24, frac_bits=16):
-    if (not val.is_resolvable):
-        return 0
-    # Mask to width bits first
-    val = int(val) & ((1 << width) - 1)
-    # Then sign extend
-    if (val & (1 << (width - 1))):
-        val -= (1 << width)
-    return val / (2**frac_bits)
 
 @cocotb.test()
+@count_callbacks
 async def basic_test(dut):
+    samples = load_samples()
     dut._log.info(f"Samples: {samples}")
-    dut.input_data_im.value = 0
-    cocotb.start_soon(Clock(dut.clk, 10, units="ns").start())
-    dut.rst.value = 1
-    await ClockCycles(dut.clk, 5)
-    dut.rst.value = 0
-    await ClockCycles(dut.clk, 1)
-    dut.start_fft.value = 1
-    await ClockCycles(dut.clk, 1)
-    dut.start_fft.value = 0
-    await RisingEdge(dut.load_read_en)
-    await ClockCycles(dut.clk, 1)
-    current_sample = 0
-    while current_sample < POINTS:
-        await RisingEdge(dut.clk)
-        if dut.load_read_en.value == 1:
-            dut.input_data_re.value = int(samples[current_sample].val.item())
-            dut.input_data_valid.value = 1
-            current_sample += 1
-        else:
-            dut.input_data_valid.value = 0
-    await RisingEdge(dut.clk)
-    dut.input_data_valid.value = 0
-    # await ClockCycles(dut.clk, 100)
-    await RisingEdge(dut.fft_done)
-    await ClockCycles(dut.clk, 5)
-    out = []
-
-    for addr in range(POINTS):
-        dut.read_addr.value = addr
-        await ClockCycles(dut.clk, 3)
-        if (dut.read_data_re.value == "xxxxxxxxxxxxxxxxxxxxxxxx"):
-            dut._log.info(f"Addr: {addr}, out_re: {dut.read_data_re.value}, out_im: {dut.read_data_im.value}")
-        out.append(complex(fixed_to_float(dut.read_data_re.value), fixed_to_float(dut.read_data_im.value)))
-    input_signal = np.array([float(s) for s in samples], dtype=float)
+    fft = FFTCoreDriver(dut, POINTS, DATA_WIDTH, DATA_FRAC_BITS)
+    await fft.reset()
+    out_re, out_im = await fft.run(samples[:POINTS])
+    rec_bands = fft.bands()
+    out = out_re.to_float() + 1j * out_im.to_float()
+
+    exp_re, exp_im, exp_bands = FFTCoreModel().process(samples.raw[:POINTS])
+    mismatches = np.flatnonzero((out_re.raw != exp_re[0]) | (out_im.raw != exp_im[0]))
+    assert len(mismatches) == 0, f"{len(mismatches)} bins differ from the model, first: {mismatches[:8]}"
+    assert rec_bands == exp_bands[0].tolist(), f"Band magnitudes {rec_bands} != model {exp_bands[0].tolist()}"
+
+    input_signal = samples.to_float()
     expected_fft = np.fft.fft(input_signal, 512)
     dut._log.info(f"{out}")
 
     magnitudes_rec = np.abs(out)
     magnitudes_exp = np.abs(expected_fft)
 
+    import matplotlib.pyplot as plt
     plt.figure(figsize=(12, 5))
 
     plt.subplot(1, 2, 1)
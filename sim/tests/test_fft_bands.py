@@ -0,0 +1,57 @@
+import cocotb
+import numpy as np
+from pathlib import Path
+from cycle_budget import hdl_params
+from fft_driver import FFTCoreDriver, random_tone_frames
+from fft_model import FFTCoreModel, magnitude_approx, read_band_map
+from monitors import count_callbacks
+
+proj_path = Path(__file__).resolve().parents[1].parent
+SOURCES = [
+    proj_path / "hdl" / "butterfly.sv",
+    proj_path / "hdl" / "fft_core.sv",
+    proj_path / "hdl" / "xilinx_single_port_ram_read_first.v",
+    proj_path / "hdl" / "xilinx_true_dual_port_read_first_2_clock_ram.v"
+]
+
+# eight bands from 0 to 16 kHz, see the header of data/band_gen.py;
+# fft_core reads BAND_MAP relative to the simulation directory
+TOPLEVEL = "fft_core"
+PARAMS = {"NUM_BANDS": 8, "BAND_BINS": 171, "BAND_MAP": '"../data/band_map_8.mem"', "DATA_FRAC_BITS": 8}
+BUILD_ARGS = ["-Wall"]
+TIMESCALE = ("1ns", "1ps")
+SIM_ARGS = []
+
+FFT = hdl_params(SOURCES[1], PARAMS)
+BAND_MAP = proj_path / "data" / "band_map_8.mem"
+FRAMES = 3
+
+
+@cocotb.test()
+@count_callbacks
+async def test_band_table(dut):
+    """Every band accumulator holds the sum of the bins the table assigns it"""
+    band_map = read_band_map(BAND_MAP)
+    assert len(band_map) == FFT["BAND_BINS"] and band_map.max() == FFT["NUM_BANDS"], \
+        f"{BAND_MAP.name} has {len(band_map)} entries / {band_map.max()} bands, PARAMS say {PARAMS}"
+
+    fft = FFTCoreDriver(dut, FFT["POINTS"], FFT["DATA_WIDTH"], FFT["DATA_FRAC_BITS"], num_bands=FFT["NUM_BANDS"])
+    await fft.reset()
+    model = FFTCoreModel.from_params(FFT, band_map=band_map)
+
+    # six tones over the mapped bins and a little past them
+    frames = random_tone_frames(FFT, FRAMES, np.random.default_rng(23), FFT["BAND_BINS"] + 20, tones=6, min_bin=0)
+    _, _, exp_bands = model.process(frames)
+
+    for i, frame in enumerate(frames):
+        out_re, out_im = await fft.run(frame)
+        rec = fft.bands()
+
+        # the table applied to the spectrum the core itself produced
+        from_table = (magnitude_approx(out_re.raw, out_im.raw) @ model.band_table) & 0xFFFFFFFF
+        assert rec == from_table.tolist(), f"Frame {i}: bands {rec} != table sums {from_table.tolist()}"
+        assert rec == exp_bands[i].tolist(), f"Frame {i}: bands {rec} != model {exp_bands[i].tolist()}"
+
+        named = [int(dut.low_magnitude.value), int(dut.mid_magnitude.value), int(dut.high_magnitude.value)]
+        assert named == rec[:3], f"Frame {i}: low/mid/high {named} != bands 0-2 {rec[:3]}"
+        dut._log.info(f"Frame {i}: {rec}")
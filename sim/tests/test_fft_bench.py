@@ -0,0 +1,209 @@
+import cocotb
+from cocotb.triggers import ClockCycles, Edge, RisingEdge
+from cocotb.utils import get_sim_time
+import json
+import numpy as np
+import os
+import subprocess
+import time
+from pathlib import Path
+from cycle_budget import busy_cycles, hdl_enum, hdl_params
+from fft_model import FFTCoreModel
+from i2s_stimulus import wav_samples
+from monitors import count_callbacks, EdgeMonitor, StreamMonitor, start_clock, wait_for
+from pipeline_model import to_mono
+
+proj_path = Path(__file__).resolve().parents[1].parent
+SOURCES = [
+    proj_path / "hdl" / "butterfly.sv",
+    proj_path / "hdl" / "fft_core.sv",
+    proj_path / "hdl" / "xilinx_single_port_ram_read_first.v",
+    proj_path / "hdl" / "xilinx_true_dual_port_read_first_2_clock_ram.v"
+]
+
+TOPLEVEL = "fft_core"
+# as top_level instantiates it
+PARAMS = {"DATA_FRAC_BITS": 8}
+BUILD_ARGS = ["-Wall"]
+TIMESCALE = ("1ns", "1ps")
+SIM_ARGS = []
+
+POINTS = 512
+CLK_PERIOD_NS = 10
+
+# FFT_BENCH_FRAMES back-to-back frames, from FFT_BENCH_WAV (mono mix, as
+# top_level feeds it) or synthetic tones
+FFT_BENCH_FRAMES = int(os.getenv("FFT_BENCH_FRAMES", 8))
+FFT_BENCH_WAV = os.getenv("FFT_BENCH_WAV")
+# cycles from load_read_en to the first sample; frame_buffer takes 3
+FFT_BENCH_LOAD_DELAY = int(os.getenv("FFT_BENCH_LOAD_DELAY", 3))
+# chance of a one-cycle gap in input_data_valid before each sample
+FFT_BENCH_STALL = float(os.getenv("FFT_BENCH_STALL", 0.0))
+
+BENCH_OUTPUT = proj_path / "bench_output.txt"
+BENCH_JSON = proj_path / "bench_output.json"
+
+FFT = hdl_params(SOURCES[1], PARAMS)
+# fft_state encoding, read from fft_core.sv so new states can't go stale here
+STATES = hdl_enum(SOURCES[1], "fft_state")
+# everything after LOAD up to fft_done
+COMPUTE_STATES = ("RUN_STAGE", "FINISH_STAGE", "SPLIT", "DONE")
+
+
+def synthetic_frames(frames, rng):
+    """A tone in each band (bins 3, 20, 70) at drifting levels, plus a little noise."""
+    n = np.arange(frames * POINTS)
+    levels = rng.uniform(0.05, 0.3, size=(frames, 3)).repeat(POINTS, axis=0)
+    tones = sum(levels[:, i] * np.sin(2 * np.pi * b * n / POINTS) for i, b in enumerate((3, 20, 70)))
+    audio = tones + rng.normal(0, 0.01, size=n.shape)
+    return np.round(audio * (1 << 22)).astype(np.int64).reshape(frames, POINTS)
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=proj_path, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+class StateLog:
+    """(time ns, state) for every change of fft_core's current_state: a few dozen edges per frame."""
+
+    def __init__(self, dut):
+        self.dut = dut
+        self.changes = []
+        self._task = cocotb.start_soon(self._run())
+
+    async def _run(self):
+        while True:
+            await Edge(self.dut.current_state)
+            self.changes.append((get_sim_time("ns"), int(self.dut.current_state.value)))
+
+    def cycles(self, start_ns, end_ns):
+        """Cycles spent in each state between two times."""
+        spent = np.zeros(max(STATES.values()) + 1, dtype=np.int64)
+        for (t, state), (t_next, _) in zip(self.changes, self.changes[1:]):
+            if start_ns <= t < end_ns:
+                spent[state] += round((min(t_next, end_ns) - t) / CLK_PERIOD_NS)
+        return spent
+
+    def stop(self):
+        self._task.kill()
+
+
+async def feed_frame(dut, frame, rng):
+    """Deliver one frame against load_read_en the way frame_buffer does, with optional stalls."""
+    await wait_for(dut.load_read_en, 1, dut.clk)
+    if FFT_BENCH_LOAD_DELAY:
+        await ClockCycles(dut.clk, FFT_BENCH_LOAD_DELAY)
+    stalls = rng.random(len(frame)) < FFT_BENCH_STALL
+    for sample, stall in zip(frame.tolist(), stalls.tolist()):
+        if stall:
+            dut.input_data_valid.value = 0
+            await RisingEdge(dut.clk)
+        dut.input_data_re.value = sample & 0xFFFFFF
+        dut.input_data_valid.value = 1
+        await RisingEdge(dut.clk)
+    dut.input_data_valid.value = 0
+
+
+def write_report(report):
+    BENCH_JSON.write_text(json.dumps(report, indent=2))
+    summary = report["summary"]
+    lines = [f"revision={report['revision']}"]
+    lines += [f"{key}={value}" for key, value in report["config"].items()]
+    lines += [f"{key}={value}" for key, value in summary.items()]
+    BENCH_OUTPUT.write_text("\n".join(lines) + "\n")
+
+
+@cocotb.test()
+@count_callbacks
+async def test_back_to_back(dut):
+    """N frames through fft_core, each started as soon as the last one is done"""
+    start_clock(dut.clk, CLK_PERIOD_NS)
+    dut.start_fft.value = 0
+    dut.input_data_valid.value = 0
+    dut.input_data_re.value = 0
+    dut.input_data_im.value = 0
+    dut.read_addr.value = 0
+    dut.rst.value = 1
+    await ClockCycles(dut.clk, 5)
+    dut.rst.value = 0
+    await ClockCycles(dut.clk, 1)
+
+    rng = np.random.default_rng(15)
+    if FFT_BENCH_WAV:
+        mono = to_mono(wav_samples(FFT_BENCH_WAV, seconds=FFT_BENCH_FRAMES * POINTS / 48000))
+        frames = mono[:FFT_BENCH_FRAMES * POINTS].reshape(-1, POINTS)
+    else:
+        frames = synthetic_frames(FFT_BENCH_FRAMES, rng)
+    _, _, model_bands = FFTCoreModel.from_params(FFT).process(frames)
+
+    states = StateLog(dut)
+    busy = EdgeMonitor(dut.fft_busy)
+    done = EdgeMonitor(dut.fft_done)
+    outputs = StreamMonitor(dut.clk, dut.fft_done,
+                            (dut.low_magnitude, dut.mid_magnitude, dut.high_magnitude))
+    wall = time.perf_counter()
+    for frame in frames:
+        dut.start_fft.value = 1
+        await RisingEdge(dut.clk)
+        dut.start_fft.value = 0
+        await feed_frame(dut, frame, rng)
+        await wait_for(dut.fft_done, 1, dut.clk)
+    await outputs.wait_count(len(frames))
+    await ClockCycles(dut.clk, 2)
+    wall = time.perf_counter() - wall
+    states.stop()
+    outputs.stop()
+    bands = [list(beat) for beat in outputs.items]
+
+    starts, ends = np.array(busy.times), np.array(done.times)
+    per_frame = []
+    for i in range(len(frames)):
+        spent = states.cycles(starts[i], ends[i])
+        per_frame.append({
+            "frame": i,
+            "cycles": int(round((ends[i] - starts[i]) / CLK_PERIOD_NS)),
+            "load_cycles": int(spent[STATES["LOAD"]]),
+            "load_stall_cycles": int(spent[STATES["LOAD"]]) - POINTS,
+            "compute_cycles": int(sum(spent[STATES[state]] for state in COMPUTE_STATES)),
+            "idle_gap_cycles": int(round((starts[i] - ends[i - 1]) / CLK_PERIOD_NS)) if i else None,
+            "bands": bands[i],
+        })
+
+    analytic_compute = busy_cycles(FFT) - FFT["POINTS"]
+    cycles = np.array([f["cycles"] for f in per_frame])
+    stalls = np.array([f["load_stall_cycles"] for f in per_frame])
+    gaps = np.array([f["idle_gap_cycles"] for f in per_frame[1:]])
+    total = (ends[-1] - starts[0]) / CLK_PERIOD_NS
+    summary = {
+        "frames": len(frames),
+        "cycles_per_frame_mean": float(cycles.mean()),
+        "cycles_per_frame_max": int(cycles.max()),
+        "load_stall_cycles_mean": float(stalls.mean()),
+        "load_stall_cycles_max": int(stalls.max()),
+        "idle_gap_cycles_mean": float(gaps.mean()) if len(gaps) else None,
+        "compute_cycles": int(per_frame[0]["compute_cycles"]),
+        "analytic_compute_cycles": analytic_compute,
+        "throughput_frames_per_mcycle": len(frames) / total * 1e6,
+        "bands_match_model": bool(np.array_equal(np.array(bands), model_bands)),
+        "wall_seconds": round(wall, 3),
+    }
+    report = {
+        "revision": git_revision(),
+        "config": {"points": POINTS, "source": FFT_BENCH_WAV or "synthetic", "load_delay": FFT_BENCH_LOAD_DELAY,
+                   "stall": FFT_BENCH_STALL, "params": json.dumps(PARAMS)},
+        "summary": summary,
+        "frames": per_frame,
+    }
+    write_report(report)
+    dut._log.info(f"{summary['frames']} frames: {summary['cycles_per_frame_mean']:.1f} cycles/frame, "
+                  f"load stalls {summary['load_stall_cycles_mean']:.1f} (max {summary['load_stall_cycles_max']}), "
+                  f"idle gap {summary['idle_gap_cycles_mean']} cycles; wrote {BENCH_OUTPUT.name}, {BENCH_JSON.name}")
+
+    assert summary["bands_match_model"], "Band magnitudes differ from the model"
+    assert all(f["compute_cycles"] == analytic_compute for f in per_frame), \
+        f"compute cycles {sorted(set(f['compute_cycles'] for f in per_frame))}, cycle_budget.py says {analytic_compute}"
+    assert stalls.min() >= FFT_BENCH_LOAD_DELAY, "LOAD finished faster than the samples arrived"
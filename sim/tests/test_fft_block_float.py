@@ -0,0 +1,68 @@
+import cocotb
+import numpy as np
+from pathlib import Path
+from cycle_budget import hdl_params
+from fft_driver import FFTCoreDriver, random_tone_frames
+from fft_model import FFTCoreModel
+from monitors import count_callbacks
+
+proj_path = Path(__file__).resolve().parents[1].parent
+SOURCES = [
+    proj_path / "hdl" / "butterfly.sv",
+    proj_path / "hdl" / "fft_core.sv",
+    proj_path / "hdl" / "xilinx_single_port_ram_read_first.v",
+    proj_path / "hdl" / "xilinx_true_dual_port_read_first_2_clock_ram.v"
+]
+
+# a 16-bit datapath fed full-scale audio, no rescaling by hand
+TOPLEVEL = "fft_core"
+PARAMS = {"BLOCK_FLOAT": 1, "DATA_WIDTH": 16, "DATA_FRAC_BITS": 8}
+BUILD_ARGS = ["-Wall"]
+TIMESCALE = ("1ns", "1ps")
+SIM_ARGS = []
+
+FFT = hdl_params(SOURCES[1], PARAMS)
+# loud, 40 dB down, loud
+LEVELS = (0.9, 0.01, 0.9)
+
+
+def snr_db(re, im, exponent, ref):
+    out = (re + 1j * im) * 2.0 ** exponent
+    return 10 * np.log10(np.sum(np.abs(ref) ** 2) / np.sum(np.abs(out - ref) ** 2))
+
+
+@cocotb.test()
+@count_callbacks
+async def test_block_float(dut):
+    """Full-scale and quiet frames match the model bit for bit, never saturate, and keep their SNR"""
+    fft = FFTCoreDriver(dut, FFT["POINTS"], FFT["DATA_WIDTH"], FFT["DATA_FRAC_BITS"], backdoor=False)
+    await fft.reset()
+    model = FFTCoreModel.from_params(FFT)
+    unscaled = FFTCoreModel.from_params(FFT, block_float=False)
+
+    frames = random_tone_frames(FFT, len(LEVELS), np.random.default_rng(25), FFT["BAND_BINS"] + 10, level=LEVELS)
+    exp_re, exp_im, exponent = model.fft(frames, return_exponent=True)
+    exp_bands = model.band_magnitudes(exp_re, exp_im, exponent)
+    ref = np.fft.fft(frames.astype(np.float64), axis=1)
+    rail = (1 << (FFT["DATA_WIDTH"] - 1)) - 1
+
+    rec_exponent = []
+    for i, frame in enumerate(frames):
+        # the first frame through LOAD, the rest through the back door
+        fft.backdoor_load = i > 0
+        out_re, out_im = await fft.run(frame)
+        mismatches = np.flatnonzero((out_re.raw != exp_re[i]) | (out_im.raw != exp_im[i]))
+        assert len(mismatches) == 0, f"Frame {i}: {len(mismatches)} bins differ from the model"
+        assert fft.exponent() == exponent[i], f"Frame {i}: block_exponent {fft.exponent()} != model {exponent[i]}"
+        assert fft.bands() == exp_bands[i].tolist(), f"Frame {i}: bands {fft.bands()} != model {exp_bands[i].tolist()}"
+        assert np.abs(out_re.raw).max() < rail and np.abs(out_im.raw).max() < rail, f"Frame {i} hit the rails"
+
+        snr = snr_db(out_re.raw, out_im.raw, fft.exponent(), ref[i])
+        re, im = unscaled.fft(frame)
+        dut._log.info(f"Frame {i} at {LEVELS[i]} of full scale: exponent {fft.exponent()}, SNR {snr:.1f} dB "
+                      f"(unscaled core {snr_db(re[0], im[0], 0, ref[i]):.1f} dB)")
+        assert snr > 15, f"Frame {i}: SNR {snr:.1f} dB"
+        rec_exponent.append(fft.exponent())
+
+    assert rec_exponent[1] < min(rec_exponent[0], rec_exponent[2]), \
+        f"Quiet frame should shift less than the loud ones, exponents {rec_exponent}"
@@ -0,0 +1,70 @@
+import cocotb
+import json
+import numpy as np
+import os
+from pathlib import Path
+from cycle_budget import busy_cycles, hdl_params
+from fft_driver import FFTCoreDriver, random_tone_frames
+from fft_model import FFTCoreModel, read_band_map
+from monitors import count_callbacks, EdgeMonitor
+
+proj_path = Path(__file__).resolve().parents[1].parent
+SOURCES = [
+    proj_path / "hdl" / "butterfly.sv",
+    proj_path / "hdl" / "fft_core.sv",
+    proj_path / "hdl" / "xilinx_single_port_ram_read_first.v",
+    proj_path / "hdl" / "xilinx_true_dual_port_read_first_2_clock_ram.v"
+]
+
+# sim/fft_sweep.py runs this module once per grid point with FFT_CONFIG set
+# to {"params": {...}, "rom": path, "band_map": path, "frames": n, "result": path}.
+# Without it the core is built the way top_level instantiates it, with
+# data/twiddle_rom.mem and data/band_map.mem.
+CONFIG = json.loads(os.getenv("FFT_CONFIG", "{}"))
+
+TOPLEVEL = "fft_core"
+PARAMS = CONFIG.get("params", {"DATA_FRAC_BITS": 8})
+BUILD_ARGS = ["-Wall"]
+TIMESCALE = ("1ns", "1ps")
+SIM_ARGS = []
+
+FFT = hdl_params(SOURCES[1], PARAMS)
+# fft_core reads ../data/twiddle_rom.mem relative to the simulation directory
+TWIDDLE_ROM = Path(CONFIG.get("rom", proj_path / "data" / "twiddle_rom.mem"))
+BAND_MAP = Path(CONFIG.get("band_map", proj_path / "data" / "band_map.mem"))
+FRAMES = CONFIG.get("frames", 2)
+
+
+@cocotb.test()
+@count_callbacks
+async def test_config(dut):
+    """fft_core at this configuration matches the model bit for bit, in the analytic cycle count"""
+    fft = FFTCoreDriver(dut, FFT["POINTS"], FFT["DATA_WIDTH"], FFT["DATA_FRAC_BITS"],
+                        backdoor=False, backdoor_read=True, num_bands=FFT["NUM_BANDS"])
+    await fft.reset()
+    model = FFTCoreModel.from_params(FFT, twiddle_rom=TWIDDLE_ROM, band_map=read_band_map(BAND_MAP))
+
+    frames = random_tone_frames(FFT, FRAMES, np.random.default_rng(16), FFT["POINTS"] // 2)
+    exp_re, exp_im, exp_bands = model.process(frames)
+    _, _, exp_exponent = model.fft(frames, return_exponent=True)
+
+    busy = EdgeMonitor(dut.fft_busy)
+    done = EdgeMonitor(dut.fft_done)
+    mismatched = 0
+    for i, frame in enumerate(frames):
+        out_re, out_im = await fft.run(frame)
+        mismatched += int(np.count_nonzero((out_re.raw != exp_re[i]) | (out_im.raw != exp_im[i])))
+        assert fft.bands() == exp_bands[i].tolist(), f"Frame {i} bands {fft.bands()} != model {exp_bands[i].tolist()}"
+        assert fft.exponent() == exp_exponent[i], f"Frame {i} block_exponent {fft.exponent()} != model {exp_exponent[i]}"
+
+    # front-door load: samples start the cycle after LOAD is entered
+    analytic = busy_cycles(FFT)
+    cycles = np.round((np.array(done.times) - np.array(busy.times[:len(done.times)])) / 10).astype(int).tolist()
+    dut._log.info(f"{PARAMS}: {cycles} cycles/frame (analytic {analytic}), {mismatched} bins off the model")
+
+    if "result" in CONFIG:
+        Path(CONFIG["result"]).write_text(json.dumps({
+            "cycles": cycles, "analytic_cycles": analytic, "mismatched_bins": mismatched,
+        }))
+    assert mismatched == 0, f"{mismatched} bins differ from the model"
+    assert all(c == analytic for c in cycles), f"Cycles per frame {cycles}, cycle_budget.py says {analytic}"
@@ -1,10 +1,11 @@
 import cocotb
-from cocotb.clock import Clock
-from cocotb.triggers import ClockCycles, RisingEdge, FallingEdge, with_timeout
+from cocotb.triggers import ClockCycles
 import random
 from pathlib import Path
 import math
 import struct
+from fft_driver import FFTCoreDriver
+from monitors import count_callbacks
 
 proj_path = Path(__file__).resolve().parents[1].parent
 SOURCES = [
@@ -34,43 +35,29 @@ def reverse_bits(n, length):
     return int(reverse, 2)
 
 @cocotb.test()
+@count_callbacks
 async def basic_test(dut):
-    cocotb.start_soon(Clock(dut.clk, 10, units="ns").start())
-
-    dut.rst.value = 1
-    await ClockCycles(dut.clk, 5)
-    dut.rst.value = 0
-    await ClockCycles(dut.clk, 1)
-
-    dut.start_fft.value = 1
-    await RisingEdge(dut.clk)
-    dut.start_fft.value = 0
-
-    while dut.load_read_en.value == 0:
-        await RisingEdge(dut.clk)
-
-
-    for i in range(POINTS):
-        sample_val = reverse_bits(i, STAGES)
-        dut.input_data_re.value = sample_val
-        dut.input_data_im.value = sample_val
-        dut.input_data_valid.value = 1
-        await RisingEdge(dut.clk)
-
-    dut.input_data_valid.value = 0
-    
+    # load goes through the ports (that's what this test covers); the loaded
+    # BRAM is dumped through the hierarchy, then read again through read_addr
+    # so the DEBUG_LOAD readout path is covered too
+    fft = FFTCoreDriver(dut, POINTS, DATA_WIDTH, DATA_FRAC_BITS, debug_load=True,
+                        backdoor=False, backdoor_read=True)
+    await fft.reset()
+
+    samples = [reverse_bits(i, STAGES) for i in range(POINTS)]
+    await fft.load(samples, samples)
     await ClockCycles(dut.clk, 5)
 
     errors = 0
-    for addr in range(POINTS-200):
-        dut.read_addr.value = addr
-        await ClockCycles(dut.clk, 3)
-
-        read_re = dut.read_data_re.value
-        
-        expected = addr
-        if read_re != expected:
-            cocotb.log.error(f"Addr {addr}: got {read_re}, expected {expected}")
-            errors += 1
-    
-    assert errors == 0, f"{errors} Errors"
\ No newline at end of file
+    for backdoor_read in (True, False):
+        fft.backdoor_read = backdoor_read
+        read_re, read_im = await fft.read()
+        path = "backdoor" if backdoor_read else "read_addr"
+        for addr in range(POINTS):
+            expected = addr
+            if read_re.raw[addr] != expected or read_im.raw[addr] != expected:
+                cocotb.log.error(f"Addr {addr} ({path}): got {read_re.raw[addr]}/{read_im.raw[addr]}, "
+                                 f"expected {expected}")
+                errors += 1
+
+    assert errors == 0, f"{errors} Errors"
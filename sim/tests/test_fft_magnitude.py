@@ -0,0 +1,49 @@
+import cocotb
+import numpy as np
+from pathlib import Path
+from cycle_budget import hdl_params
+from fft_driver import FFTCoreDriver, random_tone_frames
+from fft_model import FFTCoreModel
+from monitors import count_callbacks
+
+proj_path = Path(__file__).resolve().parents[1].parent
+SOURCES = [
+    proj_path / "hdl" / "butterfly.sv",
+    proj_path / "hdl" / "fft_core.sv",
+    proj_path / "hdl" / "xilinx_single_port_ram_read_first.v",
+    proj_path / "hdl" / "xilinx_true_dual_port_read_first_2_clock_ram.v"
+]
+
+# MAG_MODE 1: max(L, L - L/8 + S/2), picked with sim/model/magnitude_explorer.py
+TOPLEVEL = "fft_core"
+PARAMS = {"MAG_MODE": 1, "DATA_FRAC_BITS": 8}
+BUILD_ARGS = ["-Wall"]
+TIMESCALE = ("1ns", "1ps")
+SIM_ARGS = []
+
+FFT = hdl_params(SOURCES[1], PARAMS)
+FRAMES = 3
+
+
+@cocotb.test()
+@count_callbacks
+async def test_max_blend(dut):
+    """Band sums with MAG_MODE=1 match the model bit for bit and stay within 3% of exact |X| sums"""
+    fft = FFTCoreDriver(dut, FFT["POINTS"], FFT["DATA_WIDTH"], FFT["DATA_FRAC_BITS"])
+    await fft.reset()
+    model = FFTCoreModel.from_params(FFT)
+
+    frames = random_tone_frames(FFT, FRAMES, np.random.default_rng(24), FFT["BAND_BINS"] + 10)
+    _, _, exp_bands = model.process(frames)
+
+    for i, frame in enumerate(frames):
+        out_re, out_im = await fft.run(frame)
+        rec = fft.bands()
+        assert rec == exp_bands[i].tolist(), f"Frame {i}: bands {rec} != model {exp_bands[i].tolist()}"
+
+        # against the exact magnitude of the spectrum the core produced
+        exact = np.hypot(out_re.raw.astype(np.float64), out_im.raw.astype(np.float64)) @ model.band_table
+        err = np.abs(np.array(rec) / exact - 1)
+        dut._log.info(f"Frame {i}: bands {rec}, exact {np.round(exact).astype(np.int64).tolist()}, "
+                      f"error {np.round(100 * err, 2).tolist()}%")
+        assert np.all(err < 0.03), f"Frame {i}: band error {err} over 3%"
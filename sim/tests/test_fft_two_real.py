@@ -0,0 +1,66 @@
+import cocotb
+import numpy as np
+from pathlib import Path
+from cycle_budget import busy_cycles, hdl_params
+from fft_driver import FFTCoreDriver, random_tone_frames
+from fft_model import FFTCoreModel
+from monitors import count_callbacks, EdgeMonitor
+
+proj_path = Path(__file__).resolve().parents[1].parent
+SOURCES = [
+    proj_path / "hdl" / "butterfly.sv",
+    proj_path / "hdl" / "fft_core.sv",
+    proj_path / "hdl" / "xilinx_single_port_ram_read_first.v",
+    proj_path / "hdl" / "xilinx_true_dual_port_read_first_2_clock_ram.v"
+]
+
+TOPLEVEL = "fft_core"
+PARAMS = {"TWO_REAL": 1, "DATA_FRAC_BITS": 8}
+BUILD_ARGS = ["-Wall"]
+TIMESCALE = ("1ns", "1ps")
+SIM_ARGS = []
+
+FFT = hdl_params(SOURCES[1], PARAMS)
+FRAMES = 2
+
+
+@cocotb.test()
+@count_callbacks
+async def test_two_real(dut):
+    """Two real frames through one transform: both band sets match the model bit for bit"""
+    fft = FFTCoreDriver(dut, FFT["POINTS"], FFT["DATA_WIDTH"], FFT["DATA_FRAC_BITS"],
+                        backdoor=False, backdoor_read=True)
+    await fft.reset()
+    model = FFTCoreModel.from_params(FFT)
+
+    rng = np.random.default_rng(21)
+    # tones in and just past the band bins
+    left = random_tone_frames(FFT, FRAMES, rng, FFT["BAND_BINS"] + 10)
+    right = random_tone_frames(FFT, FRAMES, rng, FFT["BAND_BINS"] + 10)
+    exp_re, exp_im, exp_a, exp_b = model.process_two_real(left, right)
+
+    busy = EdgeMonitor(dut.fft_busy)
+    done = EdgeMonitor(dut.fft_done)
+    rec_a, rec_b = [], []
+    for i in range(FRAMES):
+        out_re, out_im = await fft.run(left[i], right[i])
+        mismatches = np.flatnonzero((out_re.raw != exp_re[i]) | (out_im.raw != exp_im[i]))
+        assert len(mismatches) == 0, f"Frame {i}: {len(mismatches)} bins differ from the model"
+        assert fft.bands() == exp_a[i].tolist(), f"Frame {i} bands {fft.bands()} != model {exp_a[i].tolist()}"
+        assert fft.bands_b() == exp_b[i].tolist(), f"Frame {i} bands_b {fft.bands_b()} != model {exp_b[i].tolist()}"
+        rec_a.append(fft.bands())
+        rec_b.append(fft.bands_b())
+
+    # the separated bands track what two separate transforms would give; the
+    # difference is rounding in the shared pass and the >>> 1 in SPLIT
+    _, _, single_a = model.process(left)
+    _, _, single_b = model.process(right)
+    for name, rec, single in (("left", rec_a, single_a), ("right", rec_b, single_b)):
+        deviation = np.abs(np.array(rec) - single).sum() / single.sum()
+        dut._log.info(f"{name}: two-real {rec}, single {single.tolist()}, deviation {deviation:.3f}")
+        assert deviation < 0.15, f"{name} bands deviate {deviation:.3f} from a single-frame transform"
+
+    analytic = busy_cycles(FFT)
+    cycles = np.round((np.array(done.times) - np.array(busy.times[:len(done.times)])) / 10).astype(int).tolist()
+    dut._log.info(f"{cycles} cycles/frame pair (analytic {analytic})")
+    assert all(c == analytic for c in cycles), f"Cycles per frame {cycles}, cycle_budget.py says {analytic}"
@@ -10,7 +10,7 @@ from cocotb.triggers import Timer, ClockCycles, RisingEdge, FallingEdge, ReadOnl
 from cocotb.utils import get_sim_time as gst
 from vicoco.vivado_runner import get_runner
 from pathlib import Path
-from fxpmath import Fxp
+from FixedPoint import FixedPoint
 import matplotlib.pyplot as plt
 import numpy as np
 
@@ -29,9 +29,7 @@ def generate_fxp_sine_wave_samples(frequency_hz, duration_s, sampling_rate_hz=44
     t = np.linspace(0., duration_s, POINTS, endpoint=False)
     val_floats = np.sin(2. * np.pi * frequency_hz * t) * amplitude
 
-    samples_fxp = [Fxp(val, True, DATA_WIDTH, DATA_FRAC_BITS) for val in val_floats]
-        
-    return samples_fxp
+    return FixedPoint.from_float(val_floats, DATA_WIDTH, DATA_FRAC_BITS)
 
 samples = generate_fxp_sine_wave_samples(360, 1, 48000, 4)
 
@@ -39,6 +37,7 @@ samples = generate_fxp_sine_wave_samples(360, 1, 48000, 4)
 
 @cocotb.test()
 async def basic_test(dut):
+    stimulus = samples.packed()
     dut.input_data_im.value = 0
     cocotb.start_soon(Clock(dut.clk, 10, units="ns").start())
     dut.rst.value = 1
@@ -54,7 +53,7 @@ async def basic_test(dut):
     while current_sample < POINTS:
         await RisingEdge(dut.clk)
         if dut.load_read_en.value == 1:
-            dut.input_data_re.value = int(samples[current_sample].val.item())
+            dut.input_data_re.value = int(stimulus[current_sample])
             dut.input_data_valid.value = 1
             current_sample += 1
         else:
@@ -69,15 +68,20 @@ async def basic_test(dut):
     mid_mag = int(dut.mid_magnitude.value) / (2**DATA_FRAC_BITS)
     high_mag = int(dut.high_magnitude.value) / (2**DATA_FRAC_BITS)
 
-    out = []
+    out_re = []
+    out_im = []
 
     for addr in range(POINTS):
         dut.read_addr.value = addr
         await ClockCycles(dut.clk, 5)
         if (dut.read_data_re.value == "xxxxxxxxxxxxxxxxxxxxxxxx"):
             dut._log.info(f"Addr: {addr}, out_re: {dut.read_data_re.value}, out_im: {dut.read_data_im.value}")
-        out.append(complex(fixed_to_float(dut.read_data_re.value), fixed_to_float(dut.read_data_im.value)))
-    input_signal = np.array([float(s) for s in samples], dtype=float)
+        out_re.append(dut.read_data_re.value)
+        out_im.append(dut.read_data_im.value)
+
+    out = FixedPoint.from_signals(out_re, DATA_WIDTH, DATA_FRAC_BITS).to_float() \
+        + 1j * FixedPoint.from_signals(out_im, DATA_WIDTH, DATA_FRAC_BITS).to_float()
+    input_signal = samples.to_float()
     expected_fft = np.fft.fft(input_signal, 512)
     dut._log.info(f"{out}")
     dut._log.info(f"===================================")
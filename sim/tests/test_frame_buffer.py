@@ -1,10 +1,8 @@
 import cocotb
-from cocotb.clock import Clock
 from cocotb.triggers import ClockCycles, RisingEdge
 import numpy as np
 from pathlib import Path
-from fxpmath import Fxp
-import matplotlib.pyplot as plt
+from monitors import count_callbacks, StreamMonitor, drive_stream, start_clock, wait_for
 
 proj_path = Path(__file__).resolve().parents[1].parent
 SOURCES = [
@@ -18,9 +16,25 @@ BUILD_ARGS = ["-Wall"]
 TIMESCALE = ("1ns", "1ps")
 SIM_ARGS = []
 
+async def read_frame(dut, monitor):
+    """Ask for the buffered frame and collect it; returns the samples read out."""
+    await wait_for(dut.frame_ready, 1, dut.clk)
+
+    monitor.clear()
+    dut.read_request.value = 1
+    await RisingEdge(dut.clk)
+    dut.read_request.value = 0
+
+    await monitor.wait_count(512)
+    # let the read latency drain so a stray extra beat would show up
+    await ClockCycles(dut.clk, 5)
+    return list(monitor.items)
+
+
 @cocotb.test()
+@count_callbacks
 async def test_frame_buffer(dut):
-    cocotb.start_soon(Clock(dut.clk, 10, units="ns").start())
+    start_clock(dut.clk, 10)
 
     # Reset
     dut.rst.value = 1
@@ -31,71 +45,24 @@ async def test_frame_buffer(dut):
     dut.rst.value = 0
     await ClockCycles(dut.clk, 5)
 
-    for i in range(512):
-        dut.input_valid.value = 1
-        dut.input_data.value = i
-        await RisingEdge(dut.clk)
-
-    dut.input_valid.value = 0
-
-    # Wait for frame_ready
-    while dut.frame_ready.value == 0:
-        await RisingEdge(dut.clk)
-
-    received_1 = []
-
-    for _ in range(512):
-        dut.read_request.value = 1
-        await RisingEdge(dut.clk)
-
-        if dut.data_out_valid.value == 1:
-            received_1.append(int(dut.audio_data_out.value))
-
-    dut.read_request.value = 0
-
-    # Drain pipeline
-    for _ in range(5):
-        await RisingEdge(dut.clk)
-        if dut.data_out_valid.value == 1:
-            received_1.append(int(dut.audio_data_out.value))
+    monitor = StreamMonitor(dut.clk, dut.data_out_valid, dut.audio_data_out)
 
+    await drive_stream(dut.clk, dut.input_valid, dut.input_data, range(512))
+    received_1 = await read_frame(dut, monitor)
 
     assert len(received_1) == 512, f"Expected 512 outputs, got {len(received_1)}"
     assert received_1[:10] == list(range(0, 10)), "First samples incorrect"
     assert received_1[-10:] == list(range(502, 512)), "Last samples incorrect"
 
-    for i in range(1000, 1000 + 512):
-        dut.input_valid.value = 1
-        dut.input_data.value = i
-        await RisingEdge(dut.clk)
-
-    dut.input_valid.value = 0
-
-    # Wait for next frame_ready
-    while dut.frame_ready.value == 0:
-        await RisingEdge(dut.clk)
-
-    received_2 = []
-
-    for _ in range(512):
-        dut.read_request.value = 1
-        await RisingEdge(dut.clk)
-
-        if dut.data_out_valid.value == 1:
-            received_2.append(int(dut.audio_data_out.value))
-
-    dut.read_request.value = 0
-
-    # Drain latency
-    for _ in range(5):
-        await RisingEdge(dut.clk)
-        if dut.data_out_valid.value == 1:
-            received_2.append(int(dut.audio_data_out.value))
+    await drive_stream(dut.clk, dut.input_valid, dut.input_data, range(1000, 1000 + 512))
+    received_2 = await read_frame(dut, monitor)
 
     assert len(received_2) == 512, f"Expected 512 outputs in frame 2, got {len(received_2)}"
     assert received_2[:10] == list(range(1000, 1010)), "Second frame first samples wrong"
     assert received_2[-10:] == list(range(1000 + 502, 1000 + 512)), "Second frame last samples wrong"
 
+    monitor.stop()
+
     print("FIRST FRAME OK:")
     print(received_1[:10], "...", received_1[-10:])
     print("SECOND FRAME OK:")
@@ -0,0 +1,81 @@
+import cocotb
+from cocotb.triggers import ClockCycles, RisingEdge
+from pathlib import Path
+from monitors import count_callbacks, StreamMonitor, drive_stream, start_clock, wait_for
+from pipeline_model import FrameBuffer
+
+proj_path = Path(__file__).resolve().parents[1].parent
+SOURCES = [
+    proj_path / "hdl" / "frame_buffer.sv",
+    proj_path / "hdl" / "xilinx_true_dual_port_read_first_1_clock_ram.v"
+]
+
+TOPLEVEL = "frame_buffer"
+PARAMS = {"HOP": 128}
+BUILD_ARGS = ["-Wall"]
+TIMESCALE = ("1ns", "1ps")
+SIM_ARGS = []
+
+POINTS = 512
+HOP = PARAMS["HOP"]
+# enough hops to wrap the 2 * POINTS circular buffer twice
+HOPS = 4 * POINTS // HOP
+
+
+async def read_frame(dut, monitor):
+    """Ask for the buffered frame and collect it; returns the samples read out."""
+    await wait_for(dut.frame_ready, 1, dut.clk)
+
+    monitor.clear()
+    dut.read_request.value = 1
+    await RisingEdge(dut.clk)
+    dut.read_request.value = 0
+
+    await monitor.wait_count(POINTS)
+    await ClockCycles(dut.clk, 5)
+    return list(monitor.items)
+
+
+@cocotb.test()
+@count_callbacks
+async def test_frame_buffer_hop(dut):
+    """A frame of the last POINTS samples every HOP samples, in order across wraparound"""
+    start_clock(dut.clk, 10)
+
+    dut.rst.value = 1
+    dut.input_valid.value = 0
+    dut.input_data.value = 0
+    dut.read_request.value = 0
+    await ClockCycles(dut.clk, 5)
+    dut.rst.value = 0
+    await ClockCycles(dut.clk, 5)
+
+    monitor = StreamMonitor(dut.clk, dut.data_out_valid, dut.audio_data_out)
+    samples = list(range(POINTS + HOPS * HOP))
+    expected, ends = FrameBuffer(POINTS, HOP).process(samples)
+    assert len(expected) == HOPS + 1
+
+    # no frame until the first POINTS samples are in, even though HOP have arrived
+    await drive_stream(dut.clk, dut.input_valid, dut.input_data, samples[:POINTS - 1])
+    await ClockCycles(dut.clk, 5)
+    assert dut.frame_ready.value == 0, "frame_ready before POINTS samples were written"
+    await drive_stream(dut.clk, dut.input_valid, dut.input_data, samples[POINTS - 1:POINTS])
+
+    for i, end in enumerate(ends):
+        # the next hop streams in while this frame is read out, like audio would
+        writer = None
+        if end < len(samples):
+            writer = cocotb.start_soon(drive_stream(dut.clk, dut.input_valid, dut.input_data,
+                                                   samples[end:end + HOP]))
+        received = await read_frame(dut, monitor)
+        if writer:
+            await writer
+
+        assert len(received) == POINTS, f"Frame {i}: expected {POINTS} outputs, got {len(received)}"
+        first_bad = next((n for n, (r, e) in enumerate(zip(received, expected[i])) if r != e), None)
+        assert first_bad is None, \
+            f"Frame {i} (samples {end - POINTS}..{end - 1}): index {first_bad} is {received[first_bad]}, " \
+            f"expected {expected[i][first_bad]}"
+
+    monitor.stop()
+    dut._log.info(f"{len(ends)} overlapping frames of {POINTS} every {HOP} samples read in order")
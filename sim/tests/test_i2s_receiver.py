@@ -9,8 +9,26 @@ from cocotb.clock import Clock
 from cocotb.triggers import Timer, ClockCycles, RisingEdge, FallingEdge, ReadOnly,with_timeout
 from cocotb.utils import get_sim_time as gst
 from cocotb.runner import get_runner
+import numpy as np
+from i2s_stimulus import I2SCapture, I2SDriver, wav_samples
+from monitors import count_callbacks, start_clock
 test_file = os.path.basename(__file__).replace(".py","")
 
+proj_path = Path(__file__).resolve().parents[1].parent
+SOURCES = [
+    proj_path / "hdl" / "i2s_receiver.sv",
+]
+TOPLEVEL = "i2s_receiver"
+PARAMS = {"DATA_WIDTH": 24}
+BUILD_ARGS = ["-Wall"]
+TIMESCALE = ("1ns", "1ps")
+SIM_ARGS = []
+
+# I2S_WAV=path/to/song.wav streams a real recording instead of the synthetic tone
+I2S_WAV = os.getenv("I2S_WAV")
+I2S_SECONDS = float(os.getenv("I2S_SECONDS", 0.02))
+SAMPLE_RATE = 48000
+
 # utility function to reverse bits:
 def reverse_bits(n,size):
     reversed_n = 0
@@ -218,6 +236,60 @@ async def test_sending_left_and_right_twice(dut):
 
 
 
+def synthetic_audio(frames, rng):
+    """Stereo tone plus noise over the full 24-bit range, with both rails in it."""
+    t = np.arange(frames) / SAMPLE_RATE
+    tone = np.stack((np.sin(2 * np.pi * 440 * t), np.sin(2 * np.pi * 1000 * t + 1)), axis=1)
+    audio = np.round(tone * 0.9 * (1 << 23)) + rng.integers(-(1 << 19), 1 << 19, size=(frames, 2))
+    audio = np.clip(audio, -(1 << 23), (1 << 23) - 1).astype(np.int64)
+    audio[:2] = [[-(1 << 23), (1 << 23) - 1], [(1 << 23) - 1, -(1 << 23)]]
+    return audio
+
+
+async def stream_and_check(dut, samples, **driver_args):
+    start_clock(dut.clk, 10)
+    driver = I2SDriver(dut, clk_period_ns=10, **driver_args)
+    driver.idle()
+    dut.rst.value = 1
+    await ClockCycles(dut.clk, 3)
+    dut.rst.value = 0
+    await ClockCycles(dut.clk, 3)
+
+    capture = I2SCapture(dut)
+    await driver.play(samples)
+    await ClockCycles(dut.clk, 4)
+    capture.stop()
+
+    received = capture.samples()
+    expected = capture.expected(samples)
+    dut._log.info(f"Received {len(received)}/{len(expected)} stereo frames")
+    assert received.shape == expected.shape, f"Expected {len(expected)} frames, got {len(received)}"
+    bad = np.flatnonzero((received != expected).any(axis=1))
+    for i in bad[:10]:
+        dut._log.error(f"Frame {i}: expected {expected[i].tolist()}, got {received[i].tolist()}")
+    assert len(bad) == 0, f"{len(bad)} of {len(expected)} frames differ from the source"
+
+
+@cocotb.test()
+@count_callbacks
+async def test_audio_stream(dut):
+    """Stream I2S_SECONDS of audio (a WAV if I2S_WAV is set) and check every sample"""
+    if I2S_WAV:
+        samples = wav_samples(I2S_WAV, seconds=I2S_SECONDS)
+    else:
+        samples = synthetic_audio(int(I2S_SECONDS * SAMPLE_RATE), np.random.default_rng(cocotb.RANDOM_SEED))
+    await stream_and_check(dut, samples)
+
+
+@cocotb.test()
+@count_callbacks
+async def test_jittery_sck(dut):
+    """Random words with a non-integer sck/clk ratio and edge jitter"""
+    rng = np.random.default_rng(cocotb.RANDOM_SEED)
+    samples = rng.integers(-(1 << 23), 1 << 23, size=(200, 2))
+    await stream_and_check(dut, samples, sck_ratio=6.5, jitter_ns=3, rng=rng)
+
+
 def i2s_receiver_runner():
     """Simulate the counter using the Python runner."""
     hdl_toplevel_lang = os.getenv("HDL_TOPLEVEL_LANG", "verilog")
@@ -9,6 +9,7 @@ from cocotb.clock import Clock
 from cocotb.triggers import Timer, ClockCycles, RisingEdge, FallingEdge, ReadOnly,with_timeout
 from cocotb.utils import get_sim_time as gst
 from cocotb.runner import get_runner
+from monitors import count_callbacks, start_clock, wait_cycles
 test_file = os.path.basename(__file__).replace(".py","")
 
 # utility function to reverse bits:
@@ -31,10 +32,11 @@ async def low_sck(dut, half_cycle = 3):
 #tests receiving on rising edges, not falling
 
 @cocotb.test()
+@count_callbacks
 async def test_sending_info_works(dut):
     """Test to see if can transmit 0x6D on left and 0xB5 on right, also make sure no data can be input when invalid data is put in or busy"""
     dut._log.info("Starting...")
-    cocotb.start_soon(Clock(dut.clk, 10, units="ns").start())
+    start_clock(dut.clk, 10)
     dut.sck.value = 0
     dut.ws.value = 0
     dut.rst.value = 1
@@ -58,8 +60,7 @@ async def test_sending_info_works(dut):
     dut.din_valid.value = 0
 
 
-    for i in range(1800):
-        await ClockCycles(dut.clk, 3)
+    await wait_cycles(dut.clk, 1800 * 3)
 
 
 # @cocotb.test()
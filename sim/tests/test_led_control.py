@@ -12,8 +12,25 @@ from cocotb.utils import get_sim_time as gst
 from cocotb.runner import get_runner
 from PIL import Image
 import numpy as np
+from led_monitor import LedWireMonitor, WAIT_CYCLES
+from monitors import count_callbacks, start_clock, wait_for
 test_file = os.path.basename(__file__).replace(".py","")
 
+proj_path = Path(__file__).resolve().parents[1].parent
+SOURCES = [
+    proj_path / "hdl" / "led_control.sv",
+]
+TOPLEVEL = "led_control"
+PARAMS = {"TOTAL_LEDS": 24}
+BUILD_ARGS = ["-Wall"]
+TIMESCALE = ("1ns", "1ps")
+SIM_ARGS = []
+
+CLK_PERIOD_NS = 10
+TOTAL_LEDS = PARAMS["TOTAL_LEDS"]
+# cycles all_led_lit stays up after a frame before the refresh is let go
+HOLD_CYCLES = 2000
+
 # utility function to reverse bits:
 def reverse_bits(n,size):
     reversed_n = 0
@@ -60,61 +77,40 @@ def grb_to_rgb(word):
 
 
 @cocotb.test()
+@count_callbacks
 async def test_sending_to_24_LED(dut):
     """Compare with preset rgb values"""
     dut._log.info("Starting...")
-    cocotb.start_soon(Clock(dut.clk, 10, units="ns").start())
+    start_clock(dut.clk, CLK_PERIOD_NS)
+    dut.all_led_lit.value = 0
+    dut.data_in_valid.value = 0
     dut.rst.value = 1
     await ClockCycles(dut.clk, 3) #wait three clock cycles
     dut.rst.value = 0
     await ClockCycles(dut.clk, 1) #wait three clock cycles
 
-
-
-    words_received = []
-
-
+    monitor = LedWireMonitor(dut.data_out, CLK_PERIOD_NS, total_leds=TOTAL_LEDS)
 
     for word in grb_words:
-
-        while dut.busy.value == 1:
-            await ClockCycles(dut.clk, 1)
+        await wait_for(dut.busy, 0, dut.clk)
 
         print(f'current word being transmitted: {word}')
-        bit_sent = 0
+        # hold valid until the controller picks the word up (it sits in
+        # WAIT for the reset code after rst)
         dut.data_in.value = word
-        dut.data_in_valid.value   = 1
-        await ClockCycles(dut.clk, 1)
-        dut.data_in_valid.value   = 0
-
-        while dut.busy.value == 0:
-            await ClockCycles(dut.clk, 1)
-
-        # print(dut.busy.value)
-        word_received = ""
-
-
-        while (dut.busy.value == 1):
-            await ClockCycles(dut.clk, 1)
-
-            if(dut.cycles.value==51 and dut.state.value !=3):
-                if(dut.data_out.value == 0):
-                    bit_sent=0
-                else:
-                    bit_sent = 1
+        dut.data_in_valid.value = 1
+        await wait_for(dut.busy, 1, dut.clk)
+        dut.data_in_valid.value = 0
+    await wait_for(dut.busy, 0, dut.clk)
 
-                word_received += f"{bit_sent}"
-
-        assert len(word_received) == 24, f"Expected 24 bits, got {len(word_received)}"
-
-        print(f'current word being received: {(word_received)}')
-
-
-        words_received.append(word_received)
-
-    for i in range(len(words_received)):
-        words_received[i] = int(words_received[i], 2)
+    # all_led_lit never rises, so there's no reset gap: one open frame
+    frames = monitor.frames(partial=True)
+    assert len(frames) == 1, f"Expected one frame, decoded {len(frames)}"
+    words_received = frames[0].words.tolist()
+    # symbols stretch when the testbench is slow to hand over the next word
+    dut._log.info(f"{frames[0].malformed} of {24 * len(grb_words)} symbols off the nominal timing")
 
+    assert words_received == grb_words, "Received words don't match the ones sent"
 
     colors = [grb_to_rgb(word) for word in words_received]
     width, height = len(colors), 1
@@ -126,6 +122,55 @@ async def test_sending_to_24_LED(dut):
     print(colors)
 
 
+async def feed_frames(dut, frames):
+    """Keep data_in one word ahead of the controller and end each frame with all_led_lit."""
+    dut.data_in_valid.value = 1
+    for words in frames:
+        dut.all_led_lit.value = 0
+        dut.data_in.value = words[0]
+        # pixel_lit pulses on the last cycle of each word, one cycle before
+        # the controller decides between RECEIVE_SAMPLE and WAIT
+        for i in range(1, len(words) + 1):
+            await RisingEdge(dut.pixel_lit)
+            if i < len(words):
+                dut.data_in.value = words[i]
+            else:
+                dut.all_led_lit.value = 1
+        # the line stays low in WAIT until all_led_lit drops, then the
+        # WAIT_CYCLES reset code runs before the next frame
+        await ClockCycles(dut.clk, HOLD_CYCLES)
+    dut.all_led_lit.value = 1
+
+
+@cocotb.test()
+@count_callbacks
+async def test_frames(dut):
+    """Back-to-back refreshes decode to the words sent, with a reset gap between each"""
+    start_clock(dut.clk, CLK_PERIOD_NS)
+    dut.all_led_lit.value = 0
+    dut.data_in_valid.value = 0
+    dut.data_in.value = 0
+    dut.rst.value = 1
+    await ClockCycles(dut.clk, 3)
+    dut.rst.value = 0
+
+    rng = np.random.default_rng(13)
+    sent = [rng.integers(0, 1 << 24, TOTAL_LEDS).tolist() for _ in range(3)]
+    monitor = LedWireMonitor(dut.data_out, CLK_PERIOD_NS, total_leds=TOTAL_LEDS)
+    await feed_frames(dut, sent)
+
+    frames = monitor.frames()
+    assert len(frames) == len(sent), f"Expected {len(sent)} frames, decoded {len(frames)}"
+    for i, (frame, words) in enumerate(zip(frames, sent)):
+        assert frame.words.tolist() == words, f"Frame {i} words don't match the ones sent"
+        # the data is always ready, so every symbol should be on time
+        assert frame.malformed == 0, f"Frame {i} has {frame.malformed} malformed symbols"
+        if frame.gap is not None:
+            assert frame.gap >= WAIT_CYCLES, f"Reset gap before frame {i} is only {frame.gap:.0f} cycles"
+    dut._log.info(f"{len(frames)} frames of {TOTAL_LEDS} LEDs at {monitor.refresh_rate():.1f} Hz")
+    monitor.stop()
+
+
 
 
 
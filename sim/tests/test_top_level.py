@@ -0,0 +1,272 @@
+import cocotb
+from cocotb.triggers import ClockCycles, Edge, RisingEdge
+from cocotb.utils import get_sim_time
+import numpy as np
+import os
+from pathlib import Path
+from cycle_probe import CycleProbe
+from fft_model import FFTCoreModel
+from pipeline_model import MagnitudeSmoother, LED_WAIT_CYCLES, to_mono
+from i2s_stimulus import I2SBusDriver, I2SCapture, wav_samples
+from led_monitor import GAP_MIN_CYCLES, LedWireMonitor, compare_frame, face_words
+from monitors import count_callbacks, EdgeMonitor, StreamMonitor, start_clock, wait_for
+
+proj_path = Path(__file__).resolve().parents[1].parent
+hdl = proj_path / "hdl"
+
+# Behavioral stand-ins for the clock wizards, XPM FIFO, OSERDESE2 and
+# OBUFDS, in place of hdl/i2s_clk_wiz.v and hdl/hdmi_clk_wiz.v
+PRIMITIVES = sorted((proj_path / "sim" / "primitives").glob("*.v"))
+
+SOURCES = [
+    hdl / "top_level.sv",
+    hdl / "seven_segment_controller.sv",
+    hdl / "i2s_receiver.sv",
+    hdl / "i2s_transmit.sv",
+    hdl / "frame_buffer.sv",
+    hdl / "fft_core.sv",
+    hdl / "butterfly.sv",
+    hdl / "smoothing.sv",
+    hdl / "evt_counter.sv",
+    hdl / "face_selector.sv",
+    hdl / "led_choice.sv",
+    hdl / "led_control.sv",
+    hdl / "threshold_control.sv",
+    hdl / "display_bars.sv",
+    hdl / "display_wave.sv",
+    hdl / "video_sig_gen.sv",
+    hdl / "tm_choice.sv",
+    hdl / "tmds_encoder.sv",
+    hdl / "tmds_serializer.sv",
+    hdl / "xilinx_single_port_ram_read_first.v",
+    hdl / "xilinx_true_dual_port_read_first_1_clock_ram.v",
+    hdl / "xilinx_true_dual_port_read_first_2_clock_ram.v",
+] + PRIMITIVES
+
+TOPLEVEL = "top_level"
+PARAMS = {}
+BUILD_ARGS = ["-Wall"]
+TIMESCALE = ("1ns", "1ps")
+SIM_ARGS = []
+
+# whole-chip simulation is slow; runner.py only picks this up with --system
+SYSTEM = True
+
+# TOP_WAV=path/to/song.wav streams a recording instead of the synthetic tones.
+# TOP_SIM_MS of audio is enough for the first LED refresh (~31 ms) to finish
+# and the face to change.
+TOP_WAV = os.getenv("TOP_WAV")
+TOP_SIM_MS = float(os.getenv("TOP_SIM_MS", 35))
+# CYCLE_BUDGET=1 checks the FFT intervals against sim/model/cycle_budget.py
+CYCLE_BUDGET = os.getenv("CYCLE_BUDGET", "0") != "0"
+
+# clk_98mhz from the clock wizard stand-in: 100 MHz * 36.125 / 6 / 6.125
+CLK_98_PERIOD_NS = 10 * 6 * 6.125 / 36.125
+# clk_98mhz cycles per sck period; 32 on the board, shorter here so more
+# FFT frames fit in the run
+SCK_RATIO = 8
+SAMPLE_PERIOD_NS = SCK_RATIO * 64 * CLK_98_PERIOD_NS
+
+# top_level pins: pmoda1[5:7] = {ws, sck, data}, btn[0] = reset
+WS_BIT, SCK_BIT, DATA_BIT = 2, 1, 0
+
+# 720p timing from video_sig_gen
+TOTAL_PIXELS = 1650
+H_SYNC_WIDTH = 40
+
+# TMDS control tokens (blue carries {v_sync, h_sync})
+CONTROL_TOKENS = {0b1101010100: 0b00, 0b0010101011: 0b01, 0b0101010100: 0b10, 0b1010101011: 0b11}
+
+
+def synthetic_audio(frames):
+    """Tones that hit each FFT band in turn, so the face has something to react to."""
+    t = np.arange(frames) * SAMPLE_PERIOD_NS * 1e-9
+    bins = np.array([3, 20, 70])        # one per band (0-5, 6-40, 41-100)
+    freq = bins / (512 * SAMPLE_PERIOD_NS * 1e-9)
+    which = (np.arange(frames) // 2048) % 3
+    mono = 0.5 * np.sin(2 * np.pi * freq[which] * t)
+    audio = np.round(mono * (1 << 23)).astype(np.int64)
+    return np.stack((audio, audio), axis=1)
+
+
+async def reset(dut):
+    start_clock(dut.clk_100mhz, 10)
+    dut.btn.value = 1
+    dut.sw.value = 0
+    dut.pmoda1.value = 0
+    await wait_for(dut.locked, 1)
+    await wait_for(dut.mhdmicw.locked, 1)
+    await ClockCycles(dut.clk_98mhz, 10)
+    dut.btn.value = 0
+    await ClockCycles(dut.clk_98mhz, 2)
+
+
+def ns_to_cycles(ns):
+    return ns / CLK_98_PERIOD_NS
+
+
+@cocotb.test()
+@count_callbacks
+async def test_audio_to_led(dut):
+    """I2S pins -> mono -> fft_core -> smoothers -> face -> led_wire, with latencies"""
+    await reset(dut)
+
+    frames = int(TOP_SIM_MS * 1e6 / SAMPLE_PERIOD_NS)
+    if TOP_WAV:
+        # played back faster than real time: one WAV frame per I2S frame
+        samples = wav_samples(TOP_WAV, seconds=frames / 48000)[:frames]
+    else:
+        samples = synthetic_audio(frames)
+
+    driver = I2SBusDriver(dut, dut.pmoda1, WS_BIT, SCK_BIT, DATA_BIT,
+                          clk_period_ns=CLK_98_PERIOD_NS, sck_ratio=SCK_RATIO)
+    received = I2SCapture(dut.i2s_receive)
+    mono = StreamMonitor(dut.clk_98mhz, dut.both_data_valid, dut.fb.input_data)
+    # smoothed values read at fft_done are the ones from the previous frame
+    bands = StreamMonitor(dut.clk_98mhz, dut.fft_done,
+                          (dut.fft_out_low, dut.fft_out_mid, dut.fft_out_high,
+                           dut.low_smooth, dut.mid_smooth, dut.high_smooth))
+    frame_ready = EdgeMonitor(dut.frame_buf_ready)
+    fft_start = EdgeMonitor(dut.fft_busy)
+    fft_done = EdgeMonitor(dut.fft_done)
+    face_change = EdgeMonitor(dut.change_pic)
+    led_start = EdgeMonitor(dut.led_wire)
+    probe = CycleProbe(dut, CLK_98_PERIOD_NS) if CYCLE_BUDGET else None
+
+    start = get_sim_time("ns")
+    await driver.play(samples)
+    await ClockCycles(dut.clk_98mhz, 16)
+    dut._log.info(f"Streamed {len(samples)} stereo frames in {(get_sim_time('ns') - start) / 1e6:.2f} ms")
+
+    # I2S receiver: every sample back, bit exact
+    got = received.samples()
+    assert np.array_equal(got, received.expected(samples)), "i2s_receiver output differs from the source"
+
+    # mono stream into frame_buffer: the lead-in slot shows up as one zero sample
+    mono_rtl = np.array(mono.items, dtype=np.int64)
+    mono_rtl = mono_rtl - ((mono_rtl >> 23) << 24)
+    assert mono_rtl[0] == 0, f"Expected a zero lead-in sample, got {mono_rtl[0]}"
+    assert np.array_equal(mono_rtl[1:], to_mono(samples)), "mono_data differs from (L + R) >> 2"
+
+    # band magnitudes and smoothed values against the model, frame by frame
+    rtl = np.array(bands.items, dtype=np.int64).reshape(-1, 6)
+    n_frames = len(rtl)
+    assert n_frames > 0, "fft_core never finished a frame"
+    frames_in = mono_rtl[:n_frames * 512].reshape(n_frames, 512)
+    _, _, model_bands = FFTCoreModel().process(frames_in)
+    smooth = MagnitudeSmoother().process(model_bands)
+    assert np.array_equal(rtl[:, :3], model_bands), "fft_core band magnitudes differ from the model"
+    assert not rtl[0, 3:].any(), "smoothers should read zero before the first frame"
+    assert np.array_equal(rtl[1:, 3:], smooth[:-1]), "magnitude_smoother outputs differ from the model"
+
+    # timing: every frame has to be through the FFT before the next one is ready
+    ready, starts, done = np.array(frame_ready.times), np.array(fft_start.times), np.array(fft_done.times)
+    compute = done[:n_frames] - starts[:n_frames]
+    from_ready = done[:n_frames] - ready[:n_frames]
+    frame_ns = 512 * SAMPLE_PERIOD_NS
+    dut._log.info(f"{n_frames} FFT frames: frame_ready -> fft_done {ns_to_cycles(from_ready.mean()):.0f} cycles "
+                  f"(fft_busy {ns_to_cycles(compute.mean()):.0f}), frame period {ns_to_cycles(frame_ns):.0f}")
+    assert from_ready.max() < frame_ns, "fft_core did not keep up with the frame rate"
+    if probe:
+        probe.check(dut._log)
+
+    # face change -> first LED bit of the refreshed image
+    if not face_change.times:
+        dut._log.warning(f"No face change within {TOP_SIM_MS} ms; raise TOP_SIM_MS for the LED latency")
+        return
+    change = face_change.times[0]
+    first_bit = next((t for t in led_start.times if t > change), None)
+    assert first_bit is not None, "led_wire stayed idle after the face changed"
+    # the face was picked from the smoothed bands of the last frame done before it
+    k = int(np.searchsorted(done, change)) - 1
+    dut._log.info(f"Face changed {ns_to_cycles(change - done[k]):.0f} cycles after fft_done of frame {k}; "
+                  f"first LED bit {ns_to_cycles(first_bit - change):.0f} cycles later")
+    dut._log.info(f"Audio to LED: frame {k} complete -> LED data out {(first_bit - ready[k]) / 1e6:.2f} ms")
+    assert ns_to_cycles(first_bit - change) < LED_WAIT_CYCLES + 16, "LED refresh started late after the face change"
+
+
+@cocotb.test()
+@count_callbacks
+async def test_tmds_output(dut):
+    """OSERDES stand-in sends each encoder word LSB first; h_sync shows up as control tokens"""
+    await reset(dut)
+
+    pixels = 2 * TOTAL_PIXELS + 2 * H_SYNC_WIDTH
+    words = []
+    bits = []
+
+    async def sample_words():
+        for _ in range(pixels):
+            await RisingEdge(dut.clk_pixel)
+            words.append(int(dut.tmds_blue.tmds.value))
+
+    async def sample_bits():
+        for _ in range(10 * (pixels + 2)):
+            await Edge(dut.clk_5x)
+            bits.append(int(dut.hdmi_tx_p.value) & 1)
+
+    word_task = cocotb.start_soon(sample_words())
+    await sample_bits()
+    await word_task
+
+    assert int(dut.hdmi_tx_n.value) == (~int(dut.hdmi_tx_p.value)) & 0b111, "OBUFDS outputs aren't complementary"
+
+    # find the bit phase and word lag that line the serial stream up with the encoder
+    bits = np.array(bits, dtype=np.int64)
+    words = np.array(words, dtype=np.int64)
+    weights = 1 << np.arange(10)
+    window = words[8:pixels - 8]
+    match = None
+    for phase in range(10):
+        serial = bits[phase:phase + 10 * ((len(bits) - phase) // 10)].reshape(-1, 10) @ weights
+        for lag in range(-4, 5):
+            if np.array_equal(serial[8 + lag:8 + lag + len(window)], window):
+                match = (phase, lag)
+                break
+        if match:
+            break
+    assert match is not None, "serial TMDS stream doesn't match the encoder output"
+    dut._log.info(f"TMDS words line up at bit phase {match[0]}, {match[1]} pixel(s) behind the encoder")
+
+    # h_sync: control tokens with c0 set, H_SYNC_WIDTH long, once per line
+    hsync = np.array([CONTROL_TOKENS.get(w, 0) & 1 for w in words.tolist()])
+    starts = np.flatnonzero(np.diff(hsync) == 1) + 1
+    ends = np.flatnonzero(np.diff(hsync) == -1) + 1
+    assert len(starts) >= 2, f"Expected two h_sync pulses in {pixels} pixels, saw {len(starts)}"
+    assert np.all(np.diff(starts) == TOTAL_PIXELS), f"h_sync period {np.diff(starts).tolist()}, expected {TOTAL_PIXELS}"
+    # TMDS data symbols never look like control tokens, so every run is a real pulse
+    widths = np.array([ends[ends > start][0] - start for start in starts if (ends > start).any()])
+    assert np.all(widths == H_SYNC_WIDTH), f"h_sync widths {widths.tolist()}, expected {H_SYNC_WIDTH}"
+
+
+@cocotb.test()
+@count_callbacks
+async def test_led_frames(dut):
+    """led_wire carries the selected face from image.mem/palette.mem, one refresh per face change"""
+    await reset(dut)
+    # no audio: the smoothed bands stay at zero, which clears every default
+    # (zero) threshold, so the first refresh moves the face to CLOSED_WIDE
+    # and the second one shows it
+    monitor = LedWireMonitor(dut.led_wire, CLK_98_PERIOD_NS, tag=dut.choose_pic)
+    await wait_for(dut.change_pic, 1)
+    await monitor.wait_frames(1)
+    # let the reset gap after the last frame show up
+    await ClockCycles(dut.clk_98mhz, GAP_MIN_CYCLES + 16)
+
+    frames = monitor.frames()
+    assert len(frames) == 2, f"Expected two refreshes, decoded {len(frames)}"
+    for i, frame in enumerate(frames):
+        expected = face_words(frame.tag)
+        # a face change resets led_control straight away, so the refresh that
+        # triggered it is cut short in its last LED
+        cut = len(frame.words) < len(expected)
+        errors = compare_frame(frame.words, expected[:len(frame.words)])
+        dut._log.info(f"Frame {i}: face {frame.tag}, {len(frame.words)} LEDs, {frame.malformed} malformed "
+                      f"symbols, {(frame.end - frame.start) / 1e6:.2f} ms{' (cut short)' if cut else ''}")
+        assert not errors, f"Frame {i} differs from face {frame.tag} at (row, col, expected, got) {errors[:8]}"
+        assert frame.malformed <= int(cut), f"Frame {i} has {frame.malformed} malformed symbols"
+        assert len(frame.words) >= len(expected) - 1, f"Frame {i} only has {len(frame.words)} LEDs"
+    assert frames[1].tag != frames[0].tag, "The second refresh should show the new face"
+    assert len(frames[1].words) == len(expected), "The refresh after the face change should be complete"
+    dut._log.info(f"LED refresh rate {monitor.refresh_rate():.1f} Hz")
+    monitor.stop()
@@ -1,6 +1,9 @@
+import argparse
 import sys
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 from PIL import Image, ImageOps
+import numpy as np
 import os
 
 BRIGHTNESS = 0.25          # 30% max brightness (tweak this)
@@ -10,97 +13,91 @@ def scale_channel(c):
     # first map 0–255 → 0–63, then apply brightness
     return int((c / 4.0)*BRIGHTNESS)
 
-def fix_image(image_in):
+# scale_channel applied to every possible channel value, so whole frames can be
+# dimmed with one table lookup and still match the per-pixel version exactly
+SCALE_LUT = np.array([scale_channel(c) for c in range(256)], dtype=np.uint8)
+
+# "xx\n" for every byte value, for writing image.mem in one go
+HEX_LINES = np.frombuffer(b"".join(f"{i:02x}\n".encode() for i in range(256)), dtype=np.uint8).reshape(256, 3)
+
+def fit_image(image_in):
     #want to take in image, and compress it to 32x32 if it is not
     w, h = image_in.size
     if(w!=32 or h!=32):
-        image = ImageOps.fit(
+        return ImageOps.fit(
             image_in,
             (32, 32),
             method=Image.Resampling.LANCZOS,  # high-quality downsampling
             centering=(0.5, 0.5)              # crop equally from all sides if needed
         )
-    else:
-        image = image_in
-    
-    pixels = list(image.getdata())   #list of (r,g,b) tuples
-    
-    #clip pixel intensity for led board
-    for index, pixel in enumerate(pixels):
-        (r, g, b) = pixel
-        new_r, new_g, new_b = r, g, b
-        new_r = scale_channel(r)
-        new_g = scale_channel(g)
-        new_b = scale_channel(b)
-        pixels[index] = (new_r, new_g, new_b)
-    
-    # Mirror every other row
-    mirrored_pixels = []
-    for row in range(32):
-        row_start = row * 32
-        row_end = row_start + 32
-        row_pixels = pixels[row_start:row_end]
-        
-        if row % 2 == 1: 
-            row_pixels = row_pixels[::-1]
-        
-        mirrored_pixels.extend(row_pixels)
-    
-    return mirrored_pixels[::-1]
+    return image_in
+
+def fix_image_array(image_in):
+    # (1024, 3) uint8 in LED order: dimmed, every other row mirrored
+    # for the serpentine panel wiring, then the whole frame reversed
+    pixels = SCALE_LUT[np.asarray(fit_image(image_in), dtype=np.uint8)]
+    pixels[1::2] = pixels[1::2, ::-1]
+    return pixels.reshape(-1, 3)[::-1]
+
+def fix_image(image_in):
+    return [tuple(p) for p in fix_image_array(image_in).tolist()]
+
+def load_frame(img_path):
+    # runs in the worker processes: decode, resize and fix one frame
+    with Image.open(img_path) as image_in:
+        return fix_image_array(image_in.convert('RGB'))
+
+def write_image_mem(path, indices):
+    with open(path, 'wb') as f:
+        f.write(HEX_LINES[np.asarray(indices, dtype=np.uint8).ravel()].tobytes())
 
 if __name__ == "__main__":
-    if len(sys.argv) < 2:
-        print("Usage: {0} <image to convert>".format(sys.argv[0]))
+    parser = argparse.ArgumentParser(description="Convert a folder of frames to image.mem / palette.mem")
+    parser.add_argument("folder", help="folder of .jpg/.png/.jpeg frames, used in sorted order")
+    parser.add_argument("--jobs", "-j", type=int, default=os.cpu_count(), help="worker processes for decoding frames")
+    args = parser.parse_args()
+
+    extensions = ['*.jpg', '*.png', '*.jpeg']
+    folder = Path(args.folder)
+
+    if not folder.is_dir():
+        print(f"Error: {folder} is not a directory")
+        sys.exit(1)
+
+    image_paths = []
+    for ext in extensions:
+        image_paths.extend(folder.glob(ext))
+
+    image_paths = sorted(image_paths)
+    num_images = len(image_paths)
+
+    #gets you every image scaled to 32x32 and dimmed
+    if args.jobs > 1 and num_images > 1:
+        with ProcessPoolExecutor(max_workers=args.jobs) as pool:
+            frames = list(pool.map(load_frame, image_paths, chunksize=max(1, num_images // (4 * args.jobs))))
     else:
-        extensions = ['*.jpg', '*.png', '*.jpeg']
-        folder = Path(sys.argv[1])
-        
-        if not folder.is_dir():
-            print(f"Error: {folder} is not a directory")
-            sys.exit(1)
-        
-        image_paths = []
-        for ext in extensions:
-            image_paths.extend(folder.glob(ext))
-
-        image_paths = sorted(image_paths)
-        
-        all_image_pixels = []
-        num_images = len(image_paths)
-        
-        for img_path in image_paths:
-            image_in = Image.open(img_path)
-            image_in = image_in.convert('RGB')
-            #gets you image scaled to 32x32 and dimmed
-            pixels = fix_image(image_in)
-            all_image_pixels.extend(pixels)
-        
-        img = Image.new("RGB", (32, num_images*32))
-        img.putdata(all_image_pixels)
-        image_in = img
-        
-        num_colors_out = 256
-        w, h = image_in.size
-        
-        image_out = image_in.copy()
-        
-        # Palettize the image
-        image_out = image_out.convert(mode='P', palette=1, colors=num_colors_out)
-        image_out.save('preview.png')
-        print('Output image preview saved at preview.png')
-        
-        palette = image_out.getpalette() or []
-        it = iter(palette)
-        rgb_tuples = list(zip(it, it, it))[:256]  # cap at 256 colors
-        
-        # Save pallete
-        with open(f'palette.mem', 'w') as f:
-            f.write( '\n'.join( [f'{r:02x}{g:02x}{b:02x}' for r, g, b in rgb_tuples] ) )
-        print('Output image pallete saved at palette.mem')
-        
-        # Save the image itself
-        with open(f'image.mem', 'w') as f:
-            for y in range(h):
-                for x in range(w):
-                    f.write(f'{image_out.getpixel((x,y)):02x}\n')
-        print('Output image saved at image.mem')
\ No newline at end of file
+        frames = [load_frame(img_path) for img_path in image_paths]
+
+    all_image_pixels = np.concatenate(frames).reshape(num_images*32, 32, 3)
+    image_in = Image.fromarray(all_image_pixels, "RGB")
+
+    num_colors_out = 256
+
+    image_out = image_in.copy()
+
+    # Palettize the image
+    image_out = image_out.convert(mode='P', palette=1, colors=num_colors_out)
+    image_out.save('preview.png')
+    print('Output image preview saved at preview.png')
+
+    palette = image_out.getpalette() or []
+    it = iter(palette)
+    rgb_tuples = list(zip(it, it, it))[:256]  # cap at 256 colors
+
+    # Save pallete
+    with open(f'palette.mem', 'w') as f:
+        f.write( '\n'.join( [f'{r:02x}{g:02x}{b:02x}' for r, g, b in rgb_tuples] ) )
+    print('Output image pallete saved at palette.mem')
+
+    # Save the image itself, palette indices in row-major order
+    write_image_mem('image.mem', np.asarray(image_out))